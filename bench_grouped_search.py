@@ -0,0 +1,76 @@
+"""
+Latency benchmark: plain top-k chunk search vs document-grouped search
+
+Usage:
+    python bench_grouped_search.py [db_key] [runs]
+
+Runs each query through search_vectors with and without group_by_document
+against the database's Qdrant cluster and reports p50/p95 latency plus the
+number of distinct source documents returned.
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from main import (
+    get_qdrant_collection_for_db,
+    build_qdrant_filter,
+    get_query_embedding,
+    search_vectors,
+    DEFAULT_GROUP_SIZE,
+)
+
+TOP_K = 20
+
+QUERIES = [
+    "customer account details",
+    "transactions above 10000",
+    "gold tier benefits",
+    "products purchased in Texas",
+    "email address of account holder",
+]
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def main():
+    db_key = sys.argv[1] if len(sys.argv) > 1 else "primary"
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    qdrant_collection = get_qdrant_collection_for_db(db_key)
+    qdrant_filter = build_qdrant_filter(db_key=db_key)
+
+    print("\n" + "="*60)
+    print(f"Grouped search benchmark: {db_key} ({qdrant_collection})")
+    print(f"top_k={TOP_K}, group_size={DEFAULT_GROUP_SIZE}, runs={runs}")
+    print("="*60)
+
+    for grouped in (False, True):
+        latencies = []
+        distinct_docs = []
+        for query in QUERIES:
+            embedding = await get_query_embedding(query)
+            for _ in range(runs):
+                start = time.perf_counter()
+                hits = search_vectors(
+                    qdrant_collection,
+                    embedding,
+                    qdrant_filter,
+                    limit=TOP_K,
+                    group_by_document=grouped
+                )
+                latencies.append((time.perf_counter() - start) * 1000)
+            distinct_docs.append(len({hit.payload.get("source_doc_id") for hit in hits}))
+
+        label = "search_groups" if grouped else "search"
+        print(f"\n  {label}")
+        print(f"    p50 latency:      {percentile(latencies, 50):.1f} ms")
+        print(f"    p95 latency:      {percentile(latencies, 95):.1f} ms")
+        print(f"    distinct docs:    {statistics.mean(distinct_docs):.1f} avg per query")
+
+    print("\n" + "="*60 + "\n")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+"""
+Offline benchmark: compare retrieval of LLM keyword extraction vs the local MiniLM fast path
+
+Usage:
+    python bench_keyword_extraction.py [db_key] [queries.txt]
+
+For each query both keyword strings are embedded and searched against the
+database's Qdrant cluster. Reports keyword latency and overlap of the top-k
+source documents returned by the two paths.
+"""
+import asyncio
+import sys
+import time
+
+from main import (
+    databases,
+    get_qdrant_collection_for_db,
+    qdrant_metadata_cache,
+    qdrant_client,
+    build_qdrant_filter,
+    get_query_embedding,
+    extract_keywords_locally,
+    extract_llm_keywords_for_schema,
+)
+
+TOP_K = 20
+
+DEFAULT_QUERIES = [
+    "Which customers have the most accounts?",
+    "Show transactions above 10000 for account 371138",
+    "What products are most popular among customers in Texas?",
+    "List customers with a gold tier benefit",
+    "Who has the email fmiller@gmail.com?",
+]
+
+async def load_schema(db_key: str, qdrant_collection: str):
+    """Build the same schema context vector RAG gives the keyword stage"""
+    db_instance = databases[db_key]
+    collections = qdrant_metadata_cache.source_collections(qdrant_collection, db_key)
+    schema_parts = []
+    schema_fields = []
+    for coll_name in collections:
+        sample = await db_instance[coll_name].find_one()
+        if sample:
+            fields = [f for f in sample.keys() if f != '_id'][:15]
+            schema_fields.extend(fields)
+            schema_parts.append(f"{coll_name}: {', '.join(fields)}")
+    return "\n".join(schema_parts), schema_fields
+
+async def retrieve(keywords: str, db_key: str, qdrant_collection: str) -> list:
+    embedding = await get_query_embedding(keywords)
+    hits = qdrant_client.search(
+        collection_name=qdrant_collection,
+        query_vector=embedding,
+        query_filter=build_qdrant_filter(db_key=db_key),
+        limit=TOP_K,
+        with_payload=["source_doc_id"],
+        with_vectors=False
+    )
+    return [hit.payload.get("source_doc_id") for hit in hits]
+
+async def main():
+    db_key = sys.argv[1] if len(sys.argv) > 1 else "primary"
+    if len(sys.argv) > 2:
+        with open(sys.argv[2]) as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        queries = DEFAULT_QUERIES
+
+    qdrant_collection = get_qdrant_collection_for_db(db_key)
+    schema_info, schema_fields = await load_schema(db_key, qdrant_collection)
+
+    print("\n" + "="*60)
+    print(f"Keyword extraction benchmark: {db_key} ({qdrant_collection}), top_k={TOP_K}")
+    print("="*60)
+
+    totals = {"llm_ms": 0.0, "local_ms": 0.0, "overlap": 0.0, "jaccard": 0.0}
+    for query in queries:
+        start = time.perf_counter()
+        llm_keywords = await extract_llm_keywords_for_schema(query, schema_info)
+        llm_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        local_keywords = await extract_keywords_locally(query, schema_fields)
+        local_ms = (time.perf_counter() - start) * 1000
+
+        llm_docs = await retrieve(llm_keywords, db_key, qdrant_collection)
+        local_docs = await retrieve(local_keywords, db_key, qdrant_collection)
+
+        shared = set(llm_docs) & set(local_docs)
+        union = set(llm_docs) | set(local_docs)
+        overlap = len(shared) / max(len(set(llm_docs)), 1)
+        jaccard = len(shared) / max(len(union), 1)
+
+        totals["llm_ms"] += llm_ms
+        totals["local_ms"] += local_ms
+        totals["overlap"] += overlap
+        totals["jaccard"] += jaccard
+
+        print(f"\n  Query: {query}")
+        print(f"    LLM   ({llm_ms:7.1f} ms): {llm_keywords}")
+        print(f"    Local ({local_ms:7.1f} ms): {local_keywords}")
+        print(f"    Doc overlap: {overlap:.0%}  Jaccard: {jaccard:.2f}")
+
+    n = len(queries)
+    print("\n" + "="*60)
+    print(f"Average LLM keyword latency:   {totals['llm_ms'] / n:.1f} ms")
+    print(f"Average local keyword latency: {totals['local_ms'] / n:.1f} ms")
+    print(f"Average doc overlap:           {totals['overlap'] / n:.0%}")
+    print(f"Average Jaccard:               {totals['jaccard'] / n:.2f}")
+    print("="*60 + "\n")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,133 @@
+"""
+Serialization benchmark: legacy document walk + FastAPI encoding vs dumps_json
+
+Usage:
+    python bench_serialization.py [runs]
+
+Builds representative payloads (MongoDB documents with ObjectId, datetime and
+Decimal128 values, pandas records with NaN, a RAG response with many sources)
+and reports the time to turn each into response bytes through:
+    legacy     - recursive serialize_document, jsonable_encoder, json.dumps
+    dumps_json - the single-pass encoder behind FastJSONResponse
+Run with and without orjson installed to compare both backends.
+"""
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from bson import ObjectId, Decimal128
+from fastapi.encoders import jsonable_encoder
+
+from main import dumps_json, orjson
+
+def legacy_serialize_document(doc):
+    """serialize_document as it was before the single-pass encoder"""
+    if isinstance(doc, dict):
+        return {key: legacy_serialize_document(value) for key, value in doc.items()}
+    elif isinstance(doc, list):
+        return [legacy_serialize_document(item) for item in doc]
+    elif isinstance(doc, ObjectId):
+        return str(doc)
+    elif isinstance(doc, datetime):
+        return doc.isoformat()
+    else:
+        return doc
+
+def legacy_encode(payload) -> bytes:
+    # Decimal128 is not handled by jsonable_encoder, so the legacy path stringifies it first;
+    # allow_nan=True because the real JSONResponse (allow_nan=False) rejects pandas NaN outright
+    content = jsonable_encoder(legacy_serialize_document(payload), custom_encoder={Decimal128: str})
+    return json.dumps(content, ensure_ascii=False, allow_nan=True, separators=(",", ":")).encode("utf-8")
+
+def mongo_documents(count: int):
+    start = datetime(2020, 1, 1)
+    return [
+        {
+            "_id": ObjectId(),
+            "username": f"user{i}",
+            "name": f"Customer {i}",
+            "email": f"user{i}@example.com",
+            "birthdate": start - timedelta(days=random.randint(7000, 25000)),
+            "accounts": [random.randint(100000, 999999) for _ in range(random.randint(1, 6))],
+            "balance": Decimal128(f"{random.uniform(0, 100000):.2f}"),
+            "active": bool(i % 3),
+            "tier_and_details": {
+                str(ObjectId()): {
+                    "tier": random.choice(["Bronze", "Silver", "Gold", "Platinum"]),
+                    "benefits": ["sports tickets", "concierge services"],
+                    "active": True,
+                    "id": str(ObjectId())
+                }
+                for _ in range(random.randint(0, 3))
+            },
+            "created_at": start + timedelta(minutes=i)
+        }
+        for i in range(count)
+    ]
+
+def pandas_records(count: int):
+    frame = pd.DataFrame({
+        "account_id": np.arange(count),
+        "amount": np.where(np.random.rand(count) < 0.2, np.nan, np.random.rand(count) * 10000),
+        "symbol": np.random.choice(["amzn", "msft", "nvda", "goog", None], count),
+        "date": pd.date_range("2021-01-01", periods=count, freq="h")
+    })
+    return frame.to_dict("records")
+
+def rag_response(sources: int):
+    return {
+        "query": "Which customers have the most accounts?",
+        "answer": "Summary " * 200,
+        "sources": [
+            {
+                "id": str(ObjectId()),
+                "score": random.random(),
+                "text": "customer account transaction details " * 15,
+                "source_collection": "customers",
+                "source_doc_id": str(ObjectId()),
+                "chunk_index": i % 4,
+                "metadata": {"db_name": "sample_analytics", "fields": ["name", "email", "accounts"]}
+            }
+            for i in range(sources)
+        ],
+        "total_sources": sources,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+def time_encoder(encode, payload, runs: int):
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        encoded = encode(payload)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies), len(encoded)
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    payloads = {
+        "mongo documents (1000)": mongo_documents(1000),
+        "pandas records w/ NaN (5000)": pandas_records(5000),
+        "RAG response (100 sources)": rag_response(100),
+    }
+
+    print("\n" + "="*60)
+    print(f"Serialization benchmark: backend={'orjson' if orjson else 'json'}, runs={runs}")
+    print("="*60)
+
+    for label, payload in payloads.items():
+        legacy_ms, legacy_bytes = time_encoder(legacy_encode, payload, runs)
+        fast_ms, fast_bytes = time_encoder(dumps_json, payload, runs)
+        print(f"\n  {label}")
+        print(f"    legacy:      {legacy_ms:8.2f} ms  ({legacy_bytes / 1024:.0f} KB)")
+        print(f"    dumps_json:  {fast_ms:8.2f} ms  ({fast_bytes / 1024:.0f} KB)")
+        print(f"    speedup:     {legacy_ms / max(fast_ms, 1e-6):.1f}x")
+
+    print("\n" + "="*60 + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -145,6 +145,70 @@ const API = {
         });
     },
 
+    async vectorRagQueryStream(query, dbKey = 'primary', collectionName = null, topK = 20, onEvent = null) {
+        try {
+            const response = await fetch(`${API_BASE_URL}/query/vector-rag/stream`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({
+                    query: query,
+                    db_key: dbKey,
+                    collection_name: collectionName,
+                    top_k: topK
+                })
+            });
+
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            const result = { answer: '', sources: [], chart_data: null };
+
+            while (true) {
+                const { done, value } = await reader.read();
+
+                if (done) break;
+
+                buffer += decoder.decode(value, { stream: true });
+                const lines = buffer.split('\n');
+
+                // Keep the last incomplete line in the buffer
+                buffer = lines.pop();
+
+                for (const line of lines) {
+                    if (line.startsWith('data: ')) {
+                        const data = JSON.parse(line.slice(6));
+                        if (onEvent) {
+                            onEvent(data);
+                        }
+
+                        if (data.stage === 'sources') {
+                            Object.assign(result, data);
+                        } else if (data.stage === 'token') {
+                            result.answer += data.text;
+                        } else if (data.stage === 'chart') {
+                            result.chart_data = data.chart_data;
+                        } else if (data.stage === 'complete') {
+                            return Object.assign(result, data);
+                        } else if (data.error) {
+                            throw new Error(data.error);
+                        }
+                    }
+                }
+            }
+
+            return result;
+        } catch (error) {
+            console.error('Streaming RAG Query Error:', error);
+            throw error;
+        }
+    },
+
     async hybridSearch(query, dbKey = 'primary', filters = {}, topK = 10) {
         return await this.post('/query/hybrid-search', {
             query: query,
@@ -8,20 +8,41 @@ ENHANCED Synapse DB API with Multi-Database Support & Smart Vectorization
 
 from fastapi import FastAPI, HTTPException, UploadFile, File, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, JSONResponse, Response
+from fastapi.routing import APIRoute
+from fastapi.datastructures import DefaultPlaceholder
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterable, Tuple, Union
 import motor.motor_asyncio
 import google.generativeai as genai
-from datetime import datetime
+from datetime import datetime, date, timedelta, time as dt_time
 import json
 import io
+import decimal
+import csv
+import zlib
+import base64
+import codecs
+import asyncio
 import pandas as pd
-from bson import ObjectId
+import numpy as np
+from bson import ObjectId, Decimal128, json_util
+from pymongo.errors import BulkWriteError, OperationFailure
 import re
 import uuid
+from enum import Enum
 import hashlib
-from collections import defaultdict
+import time
+import math
+import heapq
+import shutil
+import tarfile
+import tempfile
+import threading
+from types import SimpleNamespace
+from collections import defaultdict, OrderedDict
+import functools
+import inspect
 import os
 from dotenv import load_dotenv
 
@@ -31,16 +52,132 @@ load_dotenv()
 # Sentence Transformers for embeddings
 from sentence_transformers import SentenceTransformer
 
+# Optional: Parquet/Arrow export and import (pip install pyarrow)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    import pyarrow.ipc as pa_ipc
+except ImportError:
+    pa = pq = pa_ipc = None
+
+# Optional: fast JSON encoding (pip install orjson); falls back to the json module
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Qdrant imports
 from qdrant_client import QdrantClient
 from qdrant_client.models import (
     Distance, VectorParams, PointStruct,
     Filter, FieldCondition, MatchValue, Range,
-    HnswConfigDiff, OptimizersConfigDiff
+    HnswConfigDiff, OptimizersConfigDiff, SearchRequest,
+    ScoredPoint, Record, GroupsResult, PointGroup,
+    CollectionsResponse, CollectionDescription, SnapshotDescription
 )
 
+# ============= JSON SERIALIZATION =============
+ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson is not None else 0
+
+def json_default(value: Any) -> Any:
+    """Encode the non-JSON values found in MongoDB documents and pandas frames"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal128):
+        return str(value.to_decimal())
+    if value is pd.NaT:
+        return None
+    if isinstance(value, (datetime, date, dt_time)):
+        return value.isoformat()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return json_default(value.item()) if isinstance(value, np.floating) else value.item()
+    if isinstance(value, float):
+        return None if math.isnan(value) or math.isinf(value) else value
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, bytes):
+        # Text stored as bytes stays readable; anything else (including bson Binary) as extended JSON
+        try:
+            return value.decode("utf-8")
+        except UnicodeDecodeError:
+            return {"$binary": {
+                "base64": base64.b64encode(value).decode("ascii"),
+                "subType": format(getattr(value, "subtype", 0), "02x")
+            }}
+    if type(value).__module__.split(".")[0] == "bson":
+        return str(value)  # Remaining BSON types (Regex, Timestamp, Code, ...) as text
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def to_jsonable(value: Any) -> Any:
+    """Pure-Python walk producing JSON-safe values (used when orjson is not installed)"""
+    if isinstance(value, dict):
+        return {key if isinstance(key, str) else str(key): to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    if isinstance(value, (str, int, bool)) or value is None:
+        return value
+    value = json_default(value)
+    return to_jsonable(value) if isinstance(value, (list, dict)) else value
+
+def dumps_json(value: Any) -> bytes:
+    """Encode a response or document as compact UTF-8 JSON in a single pass
+    
+    ObjectId and Decimal128 become strings, datetimes ISO strings, and NaN/inf
+    (e.g. from pandas) null.
+    """
+    if orjson is not None:
+        return orjson.dumps(value, default=json_default, option=ORJSON_OPTIONS)
+    return json.dumps(to_jsonable(value), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+def serialize_document(doc: Any) -> Any:
+    """JSON-safe copy of a MongoDB document (see dumps_json for the conversions)"""
+    if orjson is not None:
+        return orjson.loads(dumps_json(doc))
+    return to_jsonable(doc)
+
+class FastJSONResponse(JSONResponse):
+    """Default response class: renders with dumps_json instead of json.dumps"""
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+class FastJSONRoute(APIRoute):
+    """Route whose endpoint results skip FastAPI's jsonable_encoder pass
+    
+    Endpoints without a response_model return plain dicts; wrapping them in a
+    FastJSONResponse serializes the content once, in C when orjson is installed.
+    """
+    def __init__(self, path: str, endpoint, **kwargs):
+        response_model = kwargs.get("response_model")
+        if isinstance(response_model, DefaultPlaceholder):
+            response_model = response_model.value
+        if inspect.iscoroutinefunction(endpoint) and response_model is None:
+            original = endpoint
+            
+            @functools.wraps(original)
+            async def endpoint(*args, **params):
+                result = await original(*args, **params)
+                return result if isinstance(result, Response) else FastJSONResponse(result)
+        super().__init__(path, endpoint, **kwargs)
+
 # Initialize FastAPI
-app = FastAPI(title="Synapse DB API - Enhanced Multi-DB Edition", version="5.0.0")
+app = FastAPI(
+    title="Synapse DB API - Enhanced Multi-DB Edition",
+    version="5.0.0",
+    default_response_class=FastJSONResponse
+)
+app.router.route_class = FastJSONRoute
 
 # CORS Configuration
 app.add_middleware(
@@ -57,6 +194,8 @@ QDRANT_URL = os.getenv("QDRANT_URL")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
 QDRANT_COLLECTION_NAME = "synapse_vectors"
 QDRANT_TIMEOUT = 120
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "qdrant").lower()  # "qdrant" or "numpy" (embedded)
+VECTOR_STORE_PATH = os.getenv("VECTOR_STORE_PATH", "vector_store")  # Data directory for the numpy backend
 
 # Gemini Configuration (for LLM only)
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
@@ -64,9 +203,11 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 # Validate required environment variables
 if not GEMINI_API_KEY:
     raise ValueError("GEMINI_API_KEY not found in environment variables")
-if not QDRANT_URL:
+if VECTOR_STORE_BACKEND not in ("qdrant", "numpy"):
+    raise ValueError(f"Invalid VECTOR_STORE_BACKEND '{VECTOR_STORE_BACKEND}'. Must be 'qdrant' or 'numpy'")
+if VECTOR_STORE_BACKEND == "qdrant" and not QDRANT_URL:
     raise ValueError("QDRANT_URL not found in environment variables")
-if not QDRANT_API_KEY:
+if VECTOR_STORE_BACKEND == "qdrant" and not QDRANT_API_KEY:
     raise ValueError("QDRANT_API_KEY not found in environment variables")
 
 # Sentence Transformers Configuration
@@ -172,8 +313,9 @@ QDRANT_CLUSTERS = load_qdrant_clusters()
 print(f"✓ Loaded Qdrant cluster configuration for {len(QDRANT_CLUSTERS.get('clusters', {}))} database(s)")
 
 # Initialize Clients
+LLM_MODEL_NAME = 'gemini-2.0-flash-lite'
 genai.configure(api_key=GEMINI_API_KEY)
-llm_model = genai.GenerativeModel('gemini-2.0-flash-lite')
+llm_model = genai.GenerativeModel(LLM_MODEL_NAME)
 
 # Initialize Sentence Transformer model for embeddings
 print("Loading MiniLM-L6-v2 embedding model...")
@@ -191,13 +333,968 @@ for db_key, config in MONGO_DATABASES.items():
 # Default database
 db = databases["primary"]
 
-# Qdrant Client
-qdrant_client = QdrantClient(
-    url=QDRANT_URL,
-    api_key=QDRANT_API_KEY,
-    timeout=QDRANT_TIMEOUT,
-    prefer_grpc=False
-)
+# ============= EMBEDDED VECTOR STORE =============
+VECTOR_STORE_KEYWORD_FIELDS = ("db_key", "source_collection", "source_doc_id")  # Filtered as columns
+VECTOR_STORE_COMPACT_RATIO = 0.5  # Rewrite a collection when more than this share of rows is deleted
+
+def _payload_value(payload: Dict, key: str) -> Any:
+    """Resolve a dotted payload key (e.g. metadata.db_name)"""
+    value = payload
+    for part in key.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+def _condition_matches(payload: Dict, condition) -> bool:
+    """Evaluate a FieldCondition (match or range) against one payload"""
+    value = _payload_value(payload, condition.key)
+    if condition.match is not None:
+        return value == condition.match.value
+    if condition.range is not None:
+        if value is None:
+            return False
+        bounds = condition.range
+        return (
+            (bounds.gte is None or value >= bounds.gte) and
+            (bounds.gt is None or value > bounds.gt) and
+            (bounds.lte is None or value <= bounds.lte) and
+            (bounds.lt is None or value < bounds.lt)
+        )
+    return True
+
+def _project_payload(payload: Dict, with_payload: Union[bool, List[str]]) -> Optional[Dict]:
+    if with_payload is True:
+        return payload
+    if not with_payload:
+        return None
+    keys = getattr(with_payload, "include", with_payload)  # list or PayloadSelectorInclude
+    projected = {}
+    for key in keys:
+        value = _payload_value(payload, key)
+        if value is None:
+            continue
+        *parents, leaf = key.split(".")
+        target = projected
+        for part in parents:
+            target = target.setdefault(part, {})
+        target[leaf] = value
+    return projected
+
+class NumpyCollection:
+    """One embedded collection: a float32 memmap of unit vectors plus an append-only payload log
+    
+    Layout under the collection directory:
+        meta.json       dimension and row capacity
+        vectors*.f32    row-major float32 matrix (capacity x dimension)
+        points.jsonl    {"id", "row", "payload"} per upsert, {"delete": [ids]} per delete
+    Replaying points.jsonl rebuilds ids, payloads and tombstones, so every write is
+    a row write plus one appended line rather than a full rewrite. A compacted log
+    starts with {"vectors": file} naming the matrix its rows refer to (default
+    vectors.f32), so replacing the log atomically switches both files.
+    """
+    def __init__(self, path: str, dimension: Optional[int] = None):
+        self.path = path
+        self.lock = threading.RLock()
+        self.meta_path = os.path.join(path, "meta.json")
+        self.log_path = os.path.join(path, "points.jsonl")
+        self.vectors_path = os.path.join(path, "vectors.f32")
+        
+        if dimension is not None:
+            os.makedirs(path, exist_ok=True)
+            self.dimension = dimension
+            self.capacity = 1024
+            self._write_meta()
+            with open(self.vectors_path, "wb") as f:
+                f.truncate(self.capacity * self.dimension * 4)
+            open(self.log_path, "w").close()
+        else:
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+            self.dimension = meta["dimension"]
+            self.capacity = meta["capacity"]
+            self.vectors_path = os.path.join(path, self._logged_vectors_file())
+            self._remove_stale_files()
+        
+        self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(self.capacity, self.dimension))
+        self.ids = []  # row -> point id
+        self.payloads = []  # row -> payload
+        self.alive = np.zeros(self.capacity, dtype=bool)
+        self.columns = {field: np.empty(self.capacity, dtype=object) for field in VECTOR_STORE_KEYWORD_FIELDS}
+        self.rows = {}  # point id -> row
+        self._replay()
+        self.log = open(self.log_path, "a")
+    
+    def _write_meta(self):
+        with open(self.meta_path, "w") as f:
+            json.dump({"dimension": self.dimension, "capacity": self.capacity}, f)
+    
+    def _logged_vectors_file(self) -> str:
+        with open(self.log_path) as f:
+            first = f.readline()
+        header = json.loads(first) if first.strip() else {}
+        return header.get("vectors", "vectors.f32")
+    
+    def _remove_stale_files(self):
+        """Drop leftovers of a compaction that crashed before its log replaced the old one"""
+        for name in os.listdir(self.path):
+            path = os.path.join(self.path, name)
+            if name.endswith(".tmp") or (name.startswith("vectors") and name.endswith(".f32") and path != self.vectors_path):
+                os.remove(path)
+    
+    def _replay(self):
+        with open(self.log_path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if "vectors" in entry:
+                    continue
+                if "delete" in entry:
+                    self._forget(entry["delete"])
+                else:
+                    self._place(entry["id"], entry["row"], entry["payload"])
+    
+    def _place(self, point_id, row: int, payload: Dict):
+        old_row = self.rows.get(point_id)
+        if old_row is not None and old_row != row:
+            self.alive[old_row] = False
+        while len(self.ids) <= row:
+            self.ids.append(None)
+            self.payloads.append(None)
+        self.ids[row] = point_id
+        self.payloads[row] = payload
+        self.alive[row] = True
+        for field in VECTOR_STORE_KEYWORD_FIELDS:
+            self.columns[field][row] = payload.get(field)
+        self.rows[point_id] = row
+    
+    def _forget(self, point_ids: Iterable):
+        for point_id in point_ids:
+            row = self.rows.pop(point_id, None)
+            if row is not None:
+                self.alive[row] = False
+                self.payloads[row] = None
+    
+    def _grow(self, needed_rows: int):
+        """Double capacity until needed_rows fit, extending the memmap file in place"""
+        capacity = self.capacity
+        while capacity < needed_rows:
+            capacity *= 2
+        if capacity == self.capacity:
+            return
+        self.vectors.flush()
+        del self.vectors
+        with open(self.vectors_path, "r+b") as f:
+            f.truncate(capacity * self.dimension * 4)
+        self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dimension))
+        self.alive = np.concatenate([self.alive, np.zeros(capacity - self.capacity, dtype=bool)])
+        for field in VECTOR_STORE_KEYWORD_FIELDS:
+            column = np.empty(capacity, dtype=object)
+            column[:self.capacity] = self.columns[field]
+            self.columns[field] = column
+        self.capacity = capacity
+        self._write_meta()
+    
+    @property
+    def count(self) -> int:
+        return len(self.rows)
+    
+    def upsert(self, points: List[PointStruct]):
+        with self.lock:
+            new_points = sum(1 for point in points if point.id not in self.rows)
+            self._grow(len(self.ids) + new_points)
+            matrix = np.asarray([point.vector for point in points], dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix /= np.where(norms == 0, 1, norms)  # Cosine = dot product of unit vectors
+            
+            lines = []
+            for point, vector in zip(points, matrix):
+                row = self.rows.get(point.id)
+                if row is None:
+                    row = len(self.ids)
+                payload = point.payload or {}
+                self.vectors[row] = vector
+                self._place(point.id, row, payload)
+                lines.append(json.dumps({"id": point.id, "row": row, "payload": payload}, default=str))
+            self.vectors.flush()
+            self.log.write("\n".join(lines) + "\n")
+            self.log.flush()
+    
+    def delete(self, point_ids: List):
+        with self.lock:
+            point_ids = [point_id for point_id in point_ids if point_id in self.rows]
+            if not point_ids:
+                return
+            self._forget(point_ids)
+            self.log.write(json.dumps({"delete": point_ids}) + "\n")
+            self.log.flush()
+            if len(self.ids) - self.count > VECTOR_STORE_COMPACT_RATIO * len(self.ids):
+                self.compact()
+    
+    def compact(self):
+        """Rewrite vectors and log with only live rows
+        
+        Both are written to new files and fsynced; replacing the log is the single
+        commit point (its header names the new matrix), so a crash at any step
+        leaves either the old or the new pair intact.
+        """
+        with self.lock:
+            live_rows = np.flatnonzero(self.alive[:len(self.ids)])
+            points = [(self.ids[row], self.payloads[row]) for row in live_rows]
+            
+            vectors_name = f"vectors.{time.time_ns()}.f32"
+            vectors_path = os.path.join(self.path, vectors_name)
+            compacted = np.memmap(vectors_path, dtype=np.float32, mode="w+", shape=(self.capacity, self.dimension))
+            compacted[:len(live_rows)] = self.vectors[live_rows]
+            compacted.flush()
+            del compacted
+            with open(vectors_path, "r+b") as f:
+                os.fsync(f.fileno())
+            
+            log_tmp = self.log_path + ".tmp"
+            with open(log_tmp, "w") as f:
+                f.write(json.dumps({"vectors": vectors_name}) + "\n")
+                for row, (point_id, payload) in enumerate(points):
+                    f.write(json.dumps({"id": point_id, "row": row, "payload": payload}, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            
+            self.log.close()
+            os.replace(log_tmp, self.log_path)
+            dir_fd = os.open(self.path, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+            
+            old_vectors_path = self.vectors_path
+            del self.vectors
+            self.vectors_path = vectors_path
+            self.vectors = np.memmap(vectors_path, dtype=np.float32, mode="r+", shape=(self.capacity, self.dimension))
+            os.remove(old_vectors_path)
+            
+            self.ids, self.payloads, self.rows = [], [], {}
+            self.alive[:] = False
+            for row, (point_id, payload) in enumerate(points):
+                self._place(point_id, row, payload)
+            self.log = open(self.log_path, "a")
+    
+    def close(self):
+        with self.lock:
+            self.log.close()
+            self.vectors.flush()
+    
+    def filter_mask(self, query_filter: Optional[Filter]) -> np.ndarray:
+        """Boolean mask of live rows matching a Filter (must / must_not of FieldConditions)"""
+        n = len(self.ids)
+        mask = self.alive[:n].copy()
+        if query_filter is None:
+            return mask
+        for negate, conditions in ((False, query_filter.must or []), (True, query_filter.must_not or [])):
+            for condition in conditions:
+                if condition.key in self.columns and condition.match is not None:
+                    matches = self.columns[condition.key][:n] == condition.match.value
+                else:
+                    matches = np.fromiter(
+                        (
+                            self.payloads[row] is not None and _condition_matches(self.payloads[row], condition)
+                            for row in range(n)
+                        ),
+                        dtype=bool,
+                        count=n
+                    )
+                mask &= ~matches if negate else matches
+        return mask
+    
+    def scored_rows(self, query_vectors: np.ndarray, query_filter: Optional[Filter]) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact scores of every matching row for a batch of queries: (rows, scores[queries, rows])"""
+        rows = np.flatnonzero(self.filter_mask(query_filter))
+        if len(rows) == 0:
+            return rows, np.empty((len(query_vectors), 0), dtype=np.float32)
+        norms = np.linalg.norm(query_vectors, axis=1, keepdims=True)
+        query_vectors = query_vectors / np.where(norms == 0, 1, norms)
+        n = len(self.ids)
+        if len(rows) * 4 < n:
+            # Selective filter: gather the few matching rows
+            return rows, query_vectors @ self.vectors[rows].T
+        # Broad filter: scan the contiguous memmap slice without copying it
+        return rows, (query_vectors @ self.vectors[:n].T)[:, rows]
+    
+    def record(self, row: int, with_payload, with_vectors: bool, score: Optional[float] = None):
+        payload = _project_payload(self.payloads[row], with_payload)
+        vector = self.vectors[row].tolist() if with_vectors else None
+        if score is None:
+            return Record(id=self.ids[row], payload=payload, vector=vector)
+        return ScoredPoint(id=self.ids[row], version=0, score=score, payload=payload, vector=vector)
+
+class NumpyVectorStore:
+    """In-process vector store exposing the subset of the QdrantClient API used here
+    
+    Each collection is a NumpyCollection on disk; search is an exact, batched
+    dot product over unit vectors (cosine), restricted by payload filters.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.lock = threading.Lock()
+        self.collections = {}
+        for name in os.listdir(path):
+            if not name.startswith(".") and os.path.exists(os.path.join(path, name, "meta.json")):
+                self.collections[name] = NumpyCollection(os.path.join(path, name))
+        print(f"✓ Embedded vector store at '{path}' ({len(self.collections)} collection(s))")
+    
+    def _collection(self, collection_name: str) -> NumpyCollection:
+        collection = self.collections.get(collection_name)
+        if collection is None:
+            raise ValueError(f"Collection {collection_name} not found")
+        return collection
+    
+    def get_collections(self):
+        return CollectionsResponse(
+            collections=[CollectionDescription(name=name) for name in sorted(self.collections)]
+        )
+    
+    def get_collection(self, collection_name: str):
+        collection = self._collection(collection_name)
+        return SimpleNamespace(
+            status="green",
+            points_count=collection.count,
+            vectors_count=collection.count,
+            config=SimpleNamespace(params=SimpleNamespace(
+                vectors=VectorParams(size=collection.dimension, distance=Distance.COSINE)
+            ))
+        )
+    
+    def create_collection(self, collection_name: str, vectors_config: VectorParams, **kwargs):
+        with self.lock:
+            if collection_name in self.collections:
+                raise ValueError(f"Collection {collection_name} already exists")
+            self.collections[collection_name] = NumpyCollection(
+                os.path.join(self.path, collection_name),
+                dimension=vectors_config.size
+            )
+        return True
+    
+    def delete_collection(self, collection_name: str, **kwargs):
+        with self.lock:
+            collection = self.collections.pop(collection_name, None)
+            if collection is None:
+                return False
+            collection.close()
+            shutil.rmtree(collection.path, ignore_errors=True)
+        return True
+    
+    def create_payload_index(self, collection_name: str, field_name: str, field_schema=None, **kwargs):
+        """No-op: keyword fields are always held as columns, others are scanned"""
+        self._collection(collection_name)
+    
+    def upsert(self, collection_name: str, points: List[PointStruct], **kwargs):
+        if points:
+            self._collection(collection_name).upsert(points)
+    
+    def delete(self, collection_name: str, points_selector, **kwargs):
+        collection = self._collection(collection_name)
+        # Resolve the selector and delete under one lock hold: a concurrent upsert
+        # or compaction must not change rows between building the mask and deleting
+        with collection.lock:
+            if isinstance(points_selector, list):
+                point_ids = points_selector
+            elif getattr(points_selector, "points", None) is not None:
+                point_ids = points_selector.points
+            else:
+                mask = collection.filter_mask(getattr(points_selector, "filter", None))
+                point_ids = [collection.ids[row] for row in np.flatnonzero(mask)]
+            collection.delete(point_ids)
+    
+    def retrieve(self, collection_name: str, ids: List, with_payload=True, with_vectors: bool = False, **kwargs):
+        collection = self._collection(collection_name)
+        with collection.lock:
+            return [
+                collection.record(collection.rows[point_id], with_payload, with_vectors)
+                for point_id in ids
+                if point_id in collection.rows
+            ]
+    
+    def scroll(
+        self,
+        collection_name: str,
+        scroll_filter: Optional[Filter] = None,
+        limit: int = 10,
+        offset: Optional[int] = None,
+        with_payload=True,
+        with_vectors: bool = False,
+        **kwargs
+    ):
+        """Page through matching points in row order; the offset is an opaque row position"""
+        collection = self._collection(collection_name)
+        with collection.lock:
+            rows = np.flatnonzero(collection.filter_mask(scroll_filter))
+            rows = rows[rows >= (offset or 0)]
+            page = rows[:limit]
+            next_offset = int(rows[limit]) if len(rows) > limit else None
+            return [collection.record(row, with_payload, with_vectors) for row in page], next_offset
+    
+    def _top_hits(self, collection, rows, scores, limit, score_threshold, with_payload, with_vectors, offset=0):
+        if score_threshold is not None:
+            keep = scores >= score_threshold
+            rows, scores = rows[keep], scores[keep]
+        k = min(limit + offset, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")][offset:]
+        return [collection.record(rows[i], with_payload, with_vectors, float(scores[i])) for i in top]
+    
+    def search(
+        self,
+        collection_name: str,
+        query_vector: List[float],
+        query_filter: Optional[Filter] = None,
+        limit: int = 10,
+        offset: int = 0,
+        score_threshold: Optional[float] = None,
+        with_payload=True,
+        with_vectors: bool = False,
+        **kwargs
+    ):
+        return self.search_batch(collection_name, [SearchRequest(
+            vector=query_vector,
+            filter=query_filter,
+            limit=limit,
+            offset=offset,
+            score_threshold=score_threshold,
+            with_payload=with_payload,
+            with_vector=with_vectors
+        )])[0]
+    
+    def search_batch(self, collection_name: str, requests: List[SearchRequest], **kwargs):
+        """Score requests that share a filter with one matrix product"""
+        collection = self._collection(collection_name)
+        results = [None] * len(requests)
+        by_filter = defaultdict(list)
+        for i, search_request in enumerate(requests):
+            key = search_request.filter.model_dump_json() if search_request.filter is not None else None
+            by_filter[key].append(i)
+        
+        with collection.lock:
+            for indices in by_filter.values():
+                query_vectors = np.asarray([requests[i].vector for i in indices], dtype=np.float32)
+                rows, scores = collection.scored_rows(query_vectors, requests[indices[0]].filter)
+                for i, row_scores in zip(indices, scores):
+                    search_request = requests[i]
+                    results[i] = self._top_hits(
+                        collection,
+                        rows,
+                        row_scores,
+                        search_request.limit,
+                        search_request.score_threshold,
+                        search_request.with_payload if search_request.with_payload is not None else False,
+                        bool(search_request.with_vector),
+                        search_request.offset or 0
+                    )
+        return results
+    
+    def search_groups(
+        self,
+        collection_name: str,
+        query_vector: List[float],
+        group_by: str,
+        query_filter: Optional[Filter] = None,
+        limit: int = 10,
+        group_size: int = 1,
+        score_threshold: Optional[float] = None,
+        with_payload=True,
+        with_vectors: bool = False,
+        **kwargs
+    ):
+        collection = self._collection(collection_name)
+        with collection.lock:
+            rows, scores = collection.scored_rows(np.asarray([query_vector], dtype=np.float32), query_filter)
+            scores = scores[0]
+            groups = OrderedDict()
+            for i in np.argsort(-scores, kind="stable"):
+                if score_threshold is not None and scores[i] < score_threshold:
+                    break
+                group_id = _payload_value(collection.payloads[rows[i]], group_by)
+                if group_id is None:
+                    continue
+                hits = groups.get(group_id)
+                if hits is None:
+                    if len(groups) >= limit:
+                        continue
+                    hits = groups[group_id] = []
+                if len(hits) < group_size:
+                    hits.append(collection.record(rows[i], with_payload, with_vectors, float(scores[i])))
+                if len(groups) >= limit and all(len(h) >= group_size for h in groups.values()):
+                    break
+            return GroupsResult(groups=[PointGroup(id=group_id, hits=hits) for group_id, hits in groups.items()])
+    
+    def _snapshot_dir(self, collection_name: str) -> str:
+        return os.path.join(self.path, ".snapshots", collection_name)
+    
+    def _describe_snapshot(self, path: str) -> SnapshotDescription:
+        stat = os.stat(path)
+        return SnapshotDescription(
+            name=os.path.basename(path),
+            creation_time=datetime.fromtimestamp(stat.st_mtime).isoformat(timespec="seconds"),
+            size=stat.st_size
+        )
+    
+    def create_snapshot(self, collection_name: str, **kwargs) -> SnapshotDescription:
+        """Archive the collection directory (meta, vectors, log) under .snapshots/<collection>/"""
+        collection = self._collection(collection_name)
+        directory = self._snapshot_dir(collection_name)
+        os.makedirs(directory, exist_ok=True)
+        name = f"{collection_name}-{datetime.now().strftime('%Y-%m-%d-%H-%M-%S-%f')}.snapshot"
+        path = os.path.join(directory, name)
+        with collection.lock:
+            collection.vectors.flush()
+            collection.log.flush()
+            with tarfile.open(path + ".tmp", "w") as archive:
+                for file_path in (collection.meta_path, collection.vectors_path, collection.log_path):
+                    archive.add(file_path, arcname=os.path.basename(file_path))
+        os.replace(path + ".tmp", path)
+        return self._describe_snapshot(path)
+    
+    def list_snapshots(self, collection_name: str, **kwargs) -> List[SnapshotDescription]:
+        directory = self._snapshot_dir(collection_name)
+        if not os.path.isdir(directory):
+            return []
+        return [
+            self._describe_snapshot(os.path.join(directory, name))
+            for name in sorted(os.listdir(directory))
+            if name.endswith(".snapshot")
+        ]
+    
+    def delete_snapshot(self, collection_name: str, snapshot_name: str, **kwargs):
+        path = os.path.join(self._snapshot_dir(collection_name), os.path.basename(snapshot_name))
+        if not os.path.exists(path):
+            raise ValueError(f"Snapshot {snapshot_name} not found")
+        os.remove(path)
+        return True
+    
+    def recover_snapshot(self, collection_name: str, location: str, **kwargs):
+        """Replace (or create) a collection from a snapshot archive at a file:// location or path"""
+        path = location[len("file://"):] if location.startswith("file://") else location
+        if not os.path.exists(path):
+            raise ValueError(f"Snapshot {location} not found")
+        target = os.path.join(self.path, collection_name)
+        staging = tempfile.mkdtemp(dir=self.path, prefix=f".restore-{collection_name}-")
+        try:
+            with tarfile.open(path) as archive:
+                for member in archive.getmembers():
+                    if member.isfile() and re.fullmatch(r"meta\.json|points\.jsonl|vectors(\.\d+)?\.f32", member.name):
+                        archive.extract(member, staging)
+            with self.lock:
+                collection = self.collections.pop(collection_name, None)
+                if collection is not None:
+                    collection.close()
+                    shutil.rmtree(collection.path, ignore_errors=True)
+                os.replace(staging, target)
+                self.collections[collection_name] = NumpyCollection(target)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        return True
+
+# Vector store client: remote Qdrant or the embedded NumPy backend (same API subset)
+if VECTOR_STORE_BACKEND == "numpy":
+    qdrant_client = NumpyVectorStore(VECTOR_STORE_PATH)
+else:
+    qdrant_client = QdrantClient(
+        url=QDRANT_URL,
+        api_key=QDRANT_API_KEY,
+        timeout=QDRANT_TIMEOUT,
+        prefer_grpc=False
+    )
+
+# ============= QDRANT METADATA CACHE =============
+QDRANT_METADATA_TTL = int(os.getenv("QDRANT_METADATA_TTL", "300"))  # seconds
+
+class QdrantMetadataCache:
+    """Cache Qdrant collection metadata to avoid round trips on every request"""
+    def __init__(self, ttl_seconds: int = QDRANT_METADATA_TTL):
+        self.ttl_seconds = ttl_seconds
+        self._names = None  # (expires_at, set of collection names)
+        self._info = {}  # collection_name -> (expires_at, collection info)
+        self._sources = {}  # (collection_name, db_key) -> (expires_at, list of source collections)
+        self.hits = 0
+        self.misses = 0
+
+    def _fresh(self, entry) -> bool:
+        return entry is not None and entry[0] > time.monotonic()
+
+    def _expiry(self) -> float:
+        return time.monotonic() + self.ttl_seconds
+
+    def collection_names(self) -> set:
+        """Get names of all Qdrant collections"""
+        if self._fresh(self._names):
+            self.hits += 1
+            return self._names[1]
+        self.misses += 1
+        names = {c.name for c in qdrant_client.get_collections().collections}
+        self._names = (self._expiry(), names)
+        return names
+
+    def exists(self, collection_name: str) -> bool:
+        """Check if a Qdrant collection exists"""
+        return collection_name in self.collection_names()
+
+    def get_info(self, collection_name: str):
+        """Get collection info (config, points_count, status)"""
+        entry = self._info.get(collection_name)
+        if self._fresh(entry):
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        info = qdrant_client.get_collection(collection_name)
+        self._info[collection_name] = (self._expiry(), info)
+        return info
+
+    def points_count(self, collection_name: str) -> int:
+        """Get number of points in a collection (0 if it does not exist)"""
+        if not self.exists(collection_name):
+            return 0
+        return self.get_info(collection_name).points_count or 0
+
+    def source_collections(self, collection_name: str, db_key: str) -> List[str]:
+        """Get the MongoDB collections that have vectors in a Qdrant collection"""
+        key = (collection_name, db_key)
+        entry = self._sources.get(key)
+        if self._fresh(entry):
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+
+        found = set()
+        offset = None
+        while True:
+            points, offset = qdrant_client.scroll(
+                collection_name=collection_name,
+                scroll_filter=Filter(
+                    must=[FieldCondition(key="db_key", match=MatchValue(value=db_key))]
+                ),
+                limit=100,
+                offset=offset,
+                with_payload=["source_collection"],
+                with_vectors=False
+            )
+            for point in points:
+                coll_name = point.payload.get("source_collection")
+                if coll_name:
+                    found.add(coll_name)
+            if offset is None:
+                break
+
+        sources = sorted(found)
+        self._sources[key] = (self._expiry(), sources)
+        return sources
+
+    def mark_created(self, collection_name: str):
+        """Record that a collection was created"""
+        if self._fresh(self._names):
+            self._names[1].add(collection_name)
+        self.invalidate(collection_name)
+
+    def mark_deleted(self, collection_name: str):
+        """Record that a collection was deleted"""
+        if self._fresh(self._names):
+            self._names[1].discard(collection_name)
+        self.invalidate(collection_name)
+
+    def invalidate(self, collection_name: Optional[str] = None):
+        """Drop cached info for one collection (points changed) or everything"""
+        if collection_name is None:
+            self._names = None
+            self._info.clear()
+            self._sources.clear()
+            return
+        self._info.pop(collection_name, None)
+        for key in [k for k in self._sources if k[0] == collection_name]:
+            del self._sources[key]
+
+    def stats(self) -> Dict:
+        """Get cache statistics"""
+        total = self.hits + self.misses
+        hit_rate = (self.hits / total * 100) if total > 0 else 0
+        return {
+            "ttl_seconds": self.ttl_seconds,
+            "collections_cached": len(self._info),
+            "source_lists_cached": len(self._sources),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": f"{hit_rate:.1f}%"
+        }
+
+qdrant_metadata_cache = QdrantMetadataCache()
+
+# ============= LEXICAL INDEX (BM25) =============
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+def tokenize_for_lexical(text: str) -> List[str]:
+    """Lowercase tokens; emails, IDs and codes are kept whole and also split into parts"""
+    tokens = []
+    for token in re.findall(r"[\w@.\-]+", text.lower()):
+        token = token.strip(".-")
+        if not token:
+            continue
+        tokens.append(token)
+        parts = [p for p in re.split(r"[@.\-]+", token) if p]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+class LexicalIndex:
+    """In-memory BM25 inverted index over the chunk texts of one Qdrant collection"""
+    def __init__(self):
+        self.postings = defaultdict(dict)  # term -> {point_id: term frequency}
+        self.doc_lengths = {}  # point_id -> number of tokens
+        self.doc_collections = {}  # point_id -> source_collection
+        self.doc_ids = {}  # point_id -> source_doc_id
+        self.total_length = 0
+    
+    def add(
+        self,
+        point_id: str,
+        text: str,
+        source_collection: Optional[str],
+        source_doc_id: Optional[str] = None
+    ):
+        """Index one chunk"""
+        point_id = str(point_id)
+        if point_id in self.doc_lengths:
+            return
+        tokens = tokenize_for_lexical(text or "")
+        for token in tokens:
+            postings = self.postings[token]
+            postings[point_id] = postings.get(point_id, 0) + 1
+        self.doc_lengths[point_id] = len(tokens)
+        self.doc_collections[point_id] = source_collection
+        self.doc_ids[point_id] = source_doc_id
+        self.total_length += len(tokens)
+    
+    def remove_collection(self, source_collection: str):
+        """Drop all chunks that came from one MongoDB collection"""
+        removed = {pid for pid, coll in self.doc_collections.items() if coll == source_collection}
+        if not removed:
+            return
+        for term in list(self.postings):
+            postings = self.postings[term]
+            for pid in removed & postings.keys():
+                del postings[pid]
+            if not postings:
+                del self.postings[term]
+        for pid in removed:
+            self.total_length -= self.doc_lengths.pop(pid)
+            del self.doc_collections[pid]
+            del self.doc_ids[pid]
+    
+    def search(
+        self,
+        query: str,
+        limit: Optional[int],
+        collection_filter: Optional[str] = None
+    ) -> List[Tuple[str, float]]:
+        """Return (point_id, bm25_score) pairs, best first (every match when limit is None)"""
+        total_docs = len(self.doc_lengths)
+        if total_docs == 0:
+            return []
+        avg_length = self.total_length / total_docs
+        
+        scores = defaultdict(float)
+        for term in set(tokenize_for_lexical(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for pid, tf in postings.items():
+                if collection_filter and self.doc_collections.get(pid) != collection_filter:
+                    continue
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[pid] / avg_length)
+                scores[pid] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        
+        if limit is None:
+            return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+class LexicalIndexManager:
+    """Per-Qdrant-collection BM25 indexes
+    
+    Indexes are fed during vectorization and built lazily from the chunk texts
+    stored in Qdrant the first time a collection is searched (e.g. after restart).
+    Searches run in worker threads, so reads and writes go through self.lock.
+    """
+    def __init__(self):
+        self.indexes = {}  # qdrant collection -> LexicalIndex
+        self.lock = threading.RLock()
+    
+    def get(self, qdrant_collection: str) -> LexicalIndex:
+        """Get the index for a Qdrant collection, building it if needed
+        
+        The build is a full scroll of the collection: call this off the event loop.
+        """
+        with self.lock:
+            index = self.indexes.get(qdrant_collection)
+            if index is None:
+                index = self._build(qdrant_collection)
+                self.indexes[qdrant_collection] = index
+            return index
+    
+    def _build(self, qdrant_collection: str) -> LexicalIndex:
+        index = LexicalIndex()
+        if qdrant_metadata_cache.exists(qdrant_collection):
+            offset = None
+            while True:
+                points, offset = qdrant_client.scroll(
+                    collection_name=qdrant_collection,
+                    limit=500,
+                    offset=offset,
+                    with_payload=["text", "source_collection", "source_doc_id"],
+                    with_vectors=False
+                )
+                for point in points:
+                    index.add(
+                        point.id,
+                        point.payload.get("text", ""),
+                        point.payload.get("source_collection"),
+                        point.payload.get("source_doc_id")
+                    )
+                if offset is None:
+                    break
+            print(f"✓ Built lexical index for '{qdrant_collection}': {len(index.doc_lengths)} chunks, {len(index.postings)} terms")
+        return index
+    
+    def search(
+        self,
+        qdrant_collection: str,
+        query: str,
+        limit: Optional[int],
+        collection_filter: Optional[str] = None
+    ) -> List[Tuple[str, float]]:
+        """BM25 search of one collection's index (built on first use)"""
+        with self.lock:
+            return self.get(qdrant_collection).search(query, limit, collection_filter)
+    
+    def add_points(self, qdrant_collection: str, points: List[PointStruct]):
+        """Index freshly upserted points (only if the index is already loaded)"""
+        with self.lock:
+            index = self.indexes.get(qdrant_collection)
+            if index is None:
+                return
+            for point in points:
+                index.add(
+                    point.id,
+                    point.payload.get("text", ""),
+                    point.payload.get("source_collection"),
+                    point.payload.get("source_doc_id")
+                )
+    
+    def remove_collection(self, qdrant_collection: str, source_collection: str):
+        """Drop chunks of one MongoDB collection"""
+        with self.lock:
+            index = self.indexes.get(qdrant_collection)
+            if index is not None:
+                index.remove_collection(source_collection)
+    
+    def drop(self, qdrant_collection: str):
+        """Forget the whole index (Qdrant collection deleted)"""
+        with self.lock:
+            self.indexes.pop(qdrant_collection, None)
+    
+    def stats(self) -> Dict:
+        """Get index statistics"""
+        return {
+            name: {"chunks": len(index.doc_lengths), "terms": len(index.postings)}
+            for name, index in self.indexes.items()
+        }
+
+lexical_index_manager = LexicalIndexManager()
+
+def upsert_vector_points(qdrant_collection: str, points: List[PointStruct]):
+    """Upsert points into Qdrant and the collection's lexical index"""
+    qdrant_client.upsert(
+        collection_name=qdrant_collection,
+        points=points
+    )
+    lexical_index_manager.add_points(qdrant_collection, points)
+
+DEFAULT_GROUP_SIZE = 3  # Chunks kept per document in grouped search
+GROUP_SEARCH_MAX_CANDIDATES = 5000  # Upper bound on chunks scanned to fill grouped dense search
+
+# Payload fields each query path reads (Qdrant returns only these)
+POINT_ID_FIELDS = ["db_key", "source_collection", "source_doc_id"]
+RAG_PAYLOAD_FIELDS = POINT_ID_FIELDS + ["chunk_index", "chunk_overlap", "text", "metadata.db_name"]
+HYBRID_PAYLOAD_FIELDS = POINT_ID_FIELDS + ["text", "metadata", "created_at"]
+
+def document_key(payload: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """Identity of a source document within a cluster: doc ids are only unique per collection"""
+    return payload.get("source_collection"), payload.get("source_doc_id")
+
+def search_vectors(
+    qdrant_collection: str,
+    query_vector: List[float],
+    query_filter: Optional[Filter],
+    limit: int,
+    score_threshold: Optional[float] = None,
+    group_by_document: bool = False,
+    group_size: int = DEFAULT_GROUP_SIZE,
+    with_payload: Union[bool, List[str]] = True
+) -> List[Any]:
+    """Dense search; with group_by_document, limit is the number of distinct
+    source documents and each contributes at most group_size chunks
+    
+    Grouping is done client-side on (source_collection, source_doc_id), the same
+    key the lexical and hybrid paths use. Qdrant's search_groups can only group
+    on a single payload field, and source_doc_id alone merges documents from
+    different collections that share an id (e.g. numeric primary keys). The
+    chunk window widens until limit documents are filled or the cluster (or
+    GROUP_SEARCH_MAX_CANDIDATES) is exhausted.
+    """
+    if not group_by_document:
+        return qdrant_client.search(
+            collection_name=qdrant_collection,
+            query_vector=query_vector,
+            query_filter=query_filter,
+            limit=limit,
+            score_threshold=score_threshold,
+            with_payload=with_payload,
+            with_vectors=False
+        )
+    
+    if isinstance(with_payload, list):
+        with_payload = list(dict.fromkeys(with_payload + ["source_collection", "source_doc_id"]))
+    window = min(limit * group_size, GROUP_SEARCH_MAX_CANDIDATES)
+    while True:
+        hits = qdrant_client.search(
+            collection_name=qdrant_collection,
+            query_vector=query_vector,
+            query_filter=query_filter,
+            limit=window,
+            score_threshold=score_threshold,
+            with_payload=with_payload,
+            with_vectors=False
+        )
+        kept = limit_per_document(hits, lambda h: document_key(h.payload or {}), limit, group_size)
+        documents = len({document_key(h.payload or {}) for h in kept})
+        if documents >= limit or len(hits) < window or window >= GROUP_SEARCH_MAX_CANDIDATES:
+            return kept
+        window = min(window * 4, GROUP_SEARCH_MAX_CANDIDATES)
+
+def limit_per_document(items: List[Any], doc_key, max_documents: int, group_size: int) -> List[Any]:
+    """Keep ranked items from at most max_documents documents, group_size each"""
+    kept = []
+    per_document = defaultdict(int)
+    for item in items:
+        key = doc_key(item)
+        if key not in per_document and len(per_document) >= max_documents:
+            continue
+        if per_document[key] >= group_size:
+            continue
+        per_document[key] += 1
+        kept.append(item)
+    return kept
 
 # ============= QUOTA OPTIMIZATION =============
 class EmbeddingCache:
@@ -246,6 +1343,197 @@ class EmbeddingCache:
 
 embedding_cache = EmbeddingCache()
 
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "3600"))  # seconds
+LLM_CACHE_MAX_SIZE = int(os.getenv("LLM_CACHE_MAX_SIZE", "2000"))
+
+class LLMResponseCache:
+    """Cache LLM responses keyed by model, prompt and retrieved context"""
+    def __init__(self, max_size: int = LLM_CACHE_MAX_SIZE, ttl_seconds: int = LLM_CACHE_TTL):
+        self.cache = OrderedDict()  # key -> (expires_at, text, tags)
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def get_key(self, prompt: str, context_ids: Optional[Iterable[str]] = None) -> str:
+        """Fingerprint model, prompt and the IDs of the context it was built from"""
+        fingerprint = hashlib.sha256()
+        fingerprint.update(LLM_MODEL_NAME.encode())
+        fingerprint.update(b"\0" + prompt.encode())
+        for context_id in sorted(context_ids or []):
+            fingerprint.update(b"\0" + str(context_id).encode())
+        return fingerprint.hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """Get cached response"""
+        entry = self.cache.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        if entry is not None:
+            del self.cache[key]
+        self.misses += 1
+        return None
+    
+    def set(self, key: str, text: str, tags: Optional[Iterable[Tuple[str, str]]] = None):
+        """Cache response, tagged with the (db_key, collection) pairs it depends on"""
+        self.cache[key] = (time.monotonic() + self.ttl_seconds, text, frozenset(tags or ()))
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
+            self.evictions += 1
+    
+    def invalidate(self, db_key: Optional[str] = None, collection_name: Optional[str] = None):
+        """Drop responses that depend on a database or one of its collections"""
+        if db_key is None:
+            self.invalidations += len(self.cache)
+            self.cache.clear()
+            return
+        stale = [
+            key for key, (_, _, tags) in self.cache.items()
+            if any(
+                tag_db == db_key and (collection_name is None or tag_coll == collection_name)
+                for tag_db, tag_coll in tags
+            )
+        ]
+        for key in stale:
+            del self.cache[key]
+        self.invalidations += len(stale)
+    
+    def stats(self) -> Dict:
+        """Get cache statistics"""
+        total = self.hits + self.misses
+        hit_rate = (self.hits / total * 100) if total > 0 else 0
+        return {
+            "size": len(self.cache),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": f"{hit_rate:.1f}%"
+        }
+
+llm_response_cache = LLMResponseCache()
+
+SEMANTIC_CACHE_DISTANCE = float(os.getenv("SEMANTIC_CACHE_DISTANCE", "0.08"))  # Max cosine distance for a hit (0 = off)
+SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", "3600"))  # seconds
+SEMANTIC_CACHE_MAX_SIZE = int(os.getenv("SEMANTIC_CACHE_MAX_SIZE", "500"))
+
+class SemanticAnswerCache:
+    """Cache vector RAG answers by query embedding so paraphrased questions reuse an answer"""
+    def __init__(
+        self,
+        max_distance: float = SEMANTIC_CACHE_DISTANCE,
+        max_size: int = SEMANTIC_CACHE_MAX_SIZE,
+        ttl_seconds: int = SEMANTIC_CACHE_TTL
+    ):
+        self.entries = OrderedDict()  # entry_id -> entry dict
+        self.max_distance = max_distance
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.next_id = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+    
+    def scope_key(self, db_keys: List[str], collection_name: Optional[str], options: Dict, entities: List[str]) -> str:
+        """Fingerprint everything besides the question's wording that shapes the answer
+        
+        entities (numbers, IDs, names) are part of the scope, so "account 371138"
+        never matches a cached answer about "account 371139" however close the
+        embeddings are.
+        """
+        return hashlib.sha256(
+            json.dumps([sorted(db_keys), collection_name, options, entities], sort_keys=True, default=str).encode()
+        ).hexdigest()
+    
+    def _unit(self, embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+    
+    def lookup(self, embedding: List[float], scope: str) -> Optional[Tuple[Dict, float, str]]:
+        """Get (response, similarity, cached query) of the closest entry within max_distance"""
+        vector = self._unit(embedding)
+        now = time.monotonic()
+        best_id, best_similarity = None, -1.0
+        for entry_id, entry in list(self.entries.items()):
+            if entry["expires_at"] <= now:
+                del self.entries[entry_id]
+                continue
+            if entry["scope"] != scope:
+                continue
+            similarity = float(vector @ entry["embedding"])
+            if similarity > best_similarity:
+                best_id, best_similarity = entry_id, similarity
+        
+        if best_id is None or 1.0 - best_similarity > self.max_distance:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(best_id)
+        entry = self.entries[best_id]
+        return entry["response"], best_similarity, entry["query"]
+    
+    def store(
+        self,
+        embedding: List[float],
+        scope: str,
+        db_keys: List[str],
+        collection_name: Optional[str],
+        query: str,
+        response: Dict
+    ):
+        self.entries[self.next_id] = {
+            "expires_at": time.monotonic() + self.ttl_seconds,
+            "scope": scope,
+            "db_keys": frozenset(db_keys),
+            "collection": collection_name,
+            "embedding": self._unit(embedding),
+            "query": query,
+            "response": response
+        }
+        self.next_id += 1
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+    
+    def invalidate(self, db_key: Optional[str] = None, collection_name: Optional[str] = None):
+        """Drop answers whose search scope covers the changed database/collection"""
+        if db_key is None:
+            self.invalidations += len(self.entries)
+            self.entries.clear()
+            return
+        stale = [
+            entry_id for entry_id, entry in self.entries.items()
+            if db_key in entry["db_keys"] and (
+                collection_name is None or entry["collection"] in (None, collection_name)
+            )
+        ]
+        for entry_id in stale:
+            del self.entries[entry_id]
+        self.invalidations += len(stale)
+    
+    def stats(self) -> Dict:
+        """Get cache statistics"""
+        total = self.hits + self.misses
+        hit_rate = (self.hits / total * 100) if total > 0 else 0
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "max_distance": self.max_distance,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": f"{hit_rate:.1f}%"
+        }
+
+semantic_answer_cache = SemanticAnswerCache()
+
 class QuotaManager:
     """Track and limit API usage"""
     def __init__(self):
@@ -280,7 +1568,8 @@ class QuotaManager:
             "llm_calls": self.llm_calls,
             "llm_remaining": self.llm_limit - self.llm_calls,
             "uptime_seconds": int(uptime),
-            "cache_stats": embedding_cache.stats()
+            "cache_stats": embedding_cache.stats(),
+            "llm_cache_stats": llm_response_cache.stats()
         }
     
     def reset(self):
@@ -318,7 +1607,8 @@ class VectorStateManager:
         vector_count: int,
         text_fields: List[str],
         chunk_size: int,
-        content_hash: str
+        content_hash: str,
+        chunk_overlap: Optional[int] = None
     ):
         """Update vectorization state"""
         db_instance = databases.get(db_key)
@@ -336,6 +1626,7 @@ class VectorStateManager:
                     "vector_count": vector_count,
                     "text_fields": text_fields,
                     "chunk_size": chunk_size,
+                    "chunk_overlap": chunk_overlap,
                     "content_hash": content_hash,
                     "last_vectorized": datetime.utcnow(),
                     "status": "completed"
@@ -442,14 +1733,259 @@ class VectorStateManager:
 
 vector_state_manager = VectorStateManager()
 
-# ============= PYDANTIC MODELS =============
-class DatabaseInfo(BaseModel):
-    key: str
-    name: str
-    uri: str
-    description: Optional[str] = None
+# ============= DATABASE CATALOG =============
+CATALOG_TTL = int(os.getenv("CATALOG_TTL", "60"))  # Seconds a listing is fresh
+CATALOG_STALE_TTL = int(os.getenv("CATALOG_STALE_TTL", "900"))  # Older listings are served while refreshing, up to this age
+CATALOG_TIMEOUT = float(os.getenv("CATALOG_TIMEOUT", "15"))  # Max seconds to build one database's listing
 
-class QueryRequest(BaseModel):
+class DatabaseCatalog:
+    """Cached collection listings (estimated counts + vector state) per database
+    
+    A listing costs one list_collection_names, one vector_state query and one
+    estimated_document_count per collection, all issued concurrently. Listings
+    older than the TTL are still served while a background task rebuilds them;
+    concurrent requests for the same database share one rebuild.
+    """
+    def __init__(self, ttl_seconds: int = CATALOG_TTL, stale_seconds: int = CATALOG_STALE_TTL):
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = max(stale_seconds, ttl_seconds)
+        self.entries = {}  # db_key -> (built_at, list of collection info)
+        self.refreshing = {}  # db_key -> asyncio.Task rebuilding the listing
+        self.generation = 0  # Bumped on invalidation so in-flight rebuilds are not stored
+        self.hits = 0
+        self.misses = 0
+        self.background_refreshes = 0
+    
+    async def _build(self, db_key: str) -> List[Dict]:
+        db_instance = databases[db_key]
+        collection_names, states = await asyncio.gather(
+            db_instance.list_collection_names(),
+            db_instance[vector_state_manager.state_collection].find(
+                {"db_key": db_key},
+                {"collection_name": 1, "vector_count": 1, "last_vectorized": 1}
+            ).to_list(None)
+        )
+        counts = await asyncio.gather(
+            *(db_instance[coll_name].estimated_document_count() for coll_name in collection_names),
+            return_exceptions=True
+        )
+        states = {state.get("collection_name"): state for state in states}
+        collections = []
+        for coll_name, count in zip(collection_names, counts):
+            if isinstance(count, Exception):
+                print(f"⚠️  Could not count {db_key}.{coll_name}: {count!r}")
+                count = 0
+            state = states.get(coll_name)
+            collections.append({
+                "name": coll_name,
+                "document_count": count,
+                "vectorized": state is not None,
+                "vector_count": state.get("vector_count", 0) if state else 0,
+                "last_vectorized": state.get("last_vectorized") if state else None
+            })
+        return collections
+    
+    async def _rebuild(self, db_key: str) -> List[Dict]:
+        generation = self.generation
+        collections = await asyncio.wait_for(self._build(db_key), timeout=CATALOG_TIMEOUT)
+        if self.generation == generation:  # Not invalidated while building
+            self.entries[db_key] = (time.monotonic(), collections)
+        return collections
+    
+    def _refresh(self, db_key: str) -> asyncio.Task:
+        """Start (or join) the rebuild of one database's listing"""
+        task = self.refreshing.get(db_key)
+        if task is None:
+            task = asyncio.create_task(self._rebuild(db_key))
+            self.refreshing[db_key] = task
+            
+            def done(task: asyncio.Task):
+                if self.refreshing.get(db_key) is task:
+                    del self.refreshing[db_key]
+                if not task.cancelled() and task.exception() is not None:
+                    print(f"⚠️  Catalog refresh failed for '{db_key}': {task.exception()!r}")
+            
+            task.add_done_callback(done)
+        return task
+    
+    async def collections(self, db_key: str) -> List[Dict]:
+        entry = self.entries.get(db_key)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age < self.stale_seconds:
+                self.hits += 1
+                if age >= self.ttl_seconds and db_key not in self.refreshing:
+                    self.background_refreshes += 1
+                    self._refresh(db_key)
+                return entry[1]
+        self.misses += 1
+        return await asyncio.shield(self._refresh(db_key))
+    
+    def age(self, db_key: str) -> Optional[float]:
+        entry = self.entries.get(db_key)
+        return round(time.monotonic() - entry[0], 1) if entry is not None else None
+    
+    def warm(self):
+        """Build every database's listing in the background (e.g. at startup)"""
+        for db_key in list(databases):
+            self._refresh(db_key)
+    
+    def invalidate(self, db_key: Optional[str] = None):
+        self.generation += 1
+        if db_key is None:
+            self.entries.clear()
+            self.refreshing.clear()
+        else:
+            self.entries.pop(db_key, None)
+            self.refreshing.pop(db_key, None)
+    
+    def stats(self) -> Dict:
+        return {
+            "databases": len(self.entries),
+            "collections": sum(len(collections) for _, collections in self.entries.values()),
+            "refreshing": len(self.refreshing),
+            "hits": self.hits,
+            "misses": self.misses,
+            "background_refreshes": self.background_refreshes
+        }
+
+database_catalog = DatabaseCatalog()
+
+# ============= DOCUMENT HYDRATION =============
+DOCUMENT_CACHE_MAX_SIZE = int(os.getenv("DOCUMENT_CACHE_MAX_SIZE", "2000"))
+DOCUMENT_CACHE_TTL = int(os.getenv("DOCUMENT_CACHE_TTL", "300"))  # seconds
+
+def typed_id_candidates(doc_id: str) -> List[Any]:
+    """Possible original _id values for a stringified id (Qdrant stores str(_id))"""
+    candidates = [doc_id]
+    if ObjectId.is_valid(doc_id) and len(doc_id) == 24:
+        candidates.append(ObjectId(doc_id))
+    if re.fullmatch(r"-?\d+", doc_id):
+        candidates.append(int(doc_id))
+    return candidates
+
+class DocumentHydrator:
+    """Fetch source documents for search hits: one query per collection, run concurrently, LRU cached"""
+    def __init__(self, max_size: int = DOCUMENT_CACHE_MAX_SIZE, ttl_seconds: int = DOCUMENT_CACHE_TTL):
+        self.cache = OrderedDict()  # (db_key, collection, doc_id, projection) -> (expires_at, doc)
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+    
+    def _get_cached(self, key) -> Optional[Dict]:
+        entry = self.cache.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.cache.move_to_end(key)
+            return entry[1]
+        if entry is not None:
+            del self.cache[key]
+        return None
+    
+    def _set_cached(self, key, doc: Dict):
+        self.cache[key] = (time.monotonic() + self.ttl_seconds, doc)
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
+    
+    async def _fetch_collection(
+        self,
+        db_key: str,
+        collection_name: str,
+        doc_ids: List[str],
+        projection: Optional[Tuple[str, ...]]
+    ) -> Dict[str, Dict]:
+        db_instance = databases.get(db_key)
+        if db_instance is None or not doc_ids:
+            return {}
+        candidates = [candidate for doc_id in doc_ids for candidate in typed_id_candidates(doc_id)]
+        cursor = db_instance[collection_name].find(
+            {"_id": {"$in": candidates}},
+            {field: 1 for field in projection} if projection else None
+        )
+        return {str(doc["_id"]): doc async for doc in cursor}
+    
+    async def hydrate(
+        self,
+        refs: Iterable[Tuple[str, str, str]],
+        fields: Optional[List[str]] = None
+    ) -> Dict[Tuple[str, str, str], Dict]:
+        """Fetch documents for (db_key, collection, doc_id) refs; returns found docs by ref"""
+        projection = tuple(sorted(fields)) if fields else None
+        found = {}
+        missing = defaultdict(list)
+        for ref in dict.fromkeys(refs):
+            db_key, collection_name, doc_id = ref
+            if not doc_id:
+                continue
+            doc = self._get_cached((db_key, collection_name, doc_id, projection))
+            if doc is not None:
+                self.hits += 1
+                found[ref] = doc
+            else:
+                self.misses += 1
+                missing[(db_key, collection_name)].append(doc_id)
+        
+        if missing:
+            groups = list(missing.items())
+            fetched = await asyncio.gather(*[
+                self._fetch_collection(db_key, collection_name, doc_ids, projection)
+                for (db_key, collection_name), doc_ids in groups
+            ], return_exceptions=True)
+            for ((db_key, collection_name), doc_ids), docs in zip(groups, fetched):
+                if isinstance(docs, Exception):
+                    print(f"⚠️  Could not hydrate documents from {db_key}.{collection_name}: {docs}")
+                    continue
+                for doc_id in doc_ids:
+                    doc = docs.get(doc_id)
+                    if doc is not None:
+                        self._set_cached((db_key, collection_name, doc_id, projection), doc)
+                        found[(db_key, collection_name, doc_id)] = doc
+        
+        return found
+    
+    def invalidate(self, db_key: Optional[str] = None, collection_name: Optional[str] = None):
+        """Drop cached documents of a database or collection"""
+        if db_key is None:
+            self.cache.clear()
+            return
+        for key in [k for k in self.cache if k[0] == db_key and (collection_name is None or k[1] == collection_name)]:
+            del self.cache[key]
+    
+    def stats(self) -> Dict:
+        """Get cache statistics"""
+        total = self.hits + self.misses
+        hit_rate = (self.hits / total * 100) if total > 0 else 0
+        return {
+            "size": len(self.cache),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": f"{hit_rate:.1f}%"
+        }
+
+document_hydrator = DocumentHydrator()
+
+async def attach_documents(
+    items: List[Dict],
+    fields: Optional[List[str]] = None,
+    db_key_field: str = "db_key"
+):
+    """Attach the full (serialized) source document to each source/result dict in place"""
+    refs = [(item.get(db_key_field), item.get("collection"), item.get("doc_id")) for item in items]
+    documents = await document_hydrator.hydrate(refs, fields)
+    for item, ref in zip(items, refs):
+        doc = documents.get(ref)
+        item["document"] = serialize_document(doc) if doc is not None else None
+
+# ============= PYDANTIC MODELS =============
+class DatabaseInfo(BaseModel):
+    key: str
+    name: str
+    uri: str
+    description: Optional[str] = None
+
+class QueryRequest(BaseModel):
     query: str
     user_id: Optional[str] = "default_user"
     db_key: Optional[str] = "primary"
@@ -457,6 +1993,16 @@ class QueryRequest(BaseModel):
     use_vector_search: Optional[bool] = False
     top_k: Optional[int] = 20  # Increased from 5 to 20 for better coverage
     score_threshold: Optional[float] = 0.0  # Minimum similarity score (0.0-1.0)
+    keyword_mode: Optional[str] = None  # "llm" or "local" (None = KEYWORD_EXTRACTION_MODE)
+    context_token_budget: Optional[int] = None  # None = RAG_CONTEXT_TOKEN_BUDGET
+    group_by_document: Optional[bool] = False  # top_k = distinct documents instead of chunks
+    group_size: Optional[int] = DEFAULT_GROUP_SIZE  # Max chunks per document when grouping
+    db_keys: Optional[List[str]] = None  # Search several databases at once (["*"] = all)
+    cluster_timeout: Optional[float] = None  # Per-cluster timeout for db_keys fan-out
+    chart_mode: Optional[str] = None  # "local", "auto" or "llm" (None = CHART_MODE)
+    include_documents: Optional[bool] = False  # Attach full source documents to sources
+    document_fields: Optional[List[str]] = None  # Projection for attached documents
+    use_semantic_cache: Optional[bool] = False  # Opt in: reuse answers to near-identical earlier questions
 
 class VectorizeRequest(BaseModel):
     db_key: str = "primary"
@@ -480,9 +2026,57 @@ class SmartVectorizeRequest(BaseModel):
 class HybridSearchRequest(BaseModel):
     query: str
     db_key: Optional[str] = "primary"
+    collection_name: Optional[str] = None
     filters: Optional[Dict[str, Any]] = None
     top_k: Optional[int] = 30  # Increased for better results
-    score_threshold: Optional[float] = 0.0
+    score_threshold: Optional[float] = 0.0  # Applies to the vector channel
+    mode: Optional[str] = "hybrid"  # "hybrid", "vector" or "lexical"
+    group_by_document: Optional[bool] = False  # top_k = distinct documents instead of chunks
+    group_size: Optional[int] = DEFAULT_GROUP_SIZE  # Max chunks per document when grouping
+    include_documents: Optional[bool] = False  # Attach full source documents to results
+    document_fields: Optional[List[str]] = None  # Projection for attached documents
+    ids_only: Optional[bool] = False  # Return point/document ids and scores only (fetch text via /vectors/points)
+
+class BatchSearchItem(BaseModel):
+    query: str
+    id: Optional[str] = None  # Echoed back to correlate results
+    db_key: Optional[str] = None  # Overrides the request-level db_key
+    collection_name: Optional[str] = None
+
+class BatchSearchRequest(BaseModel):
+    queries: List[Union[str, BatchSearchItem]]
+    db_key: Optional[str] = "primary"
+    collection_name: Optional[str] = None
+    filters: Optional[Dict[str, Any]] = None
+    top_k: Optional[int] = 10
+    score_threshold: Optional[float] = 0.0  # Applies to the vector channel
+    mode: Optional[str] = "hybrid"  # "hybrid", "vector" or "lexical"
+    window_size: Optional[int] = None  # Queries per embedding/search round
+    ids_only: Optional[bool] = False  # Return point/document ids and scores only (fetch text via /vectors/points)
+
+class PointsRequest(BaseModel):
+    db_key: Optional[str] = "primary"
+    ids: List[str]
+    fields: Optional[List[str]] = None  # Payload fields to return (None = all)
+
+class VectorDumpRequest(BaseModel):
+    db_key: str = "primary"
+    dump_name: Optional[str] = None  # None = "<db_key>_<timestamp>"
+
+class VectorRestoreRequest(BaseModel):
+    dump_name: str
+    recreate: Optional[bool] = False  # Drop the target cluster before restoring
+    batch_size: Optional[int] = None  # Points per upsert (None = VECTOR_DUMP_BATCH)
+    parallelism: Optional[int] = None  # Concurrent upserts (None = VECTOR_RESTORE_PARALLELISM)
+
+class SnapshotRequest(BaseModel):
+    db_keys: Optional[List[str]] = None  # None = every cluster in qdrant_clusters.json
+    retention: Optional[int] = None  # Snapshots kept per cluster (None = SNAPSHOT_RETENTION, 0 = keep all)
+
+class SnapshotRestoreRequest(BaseModel):
+    db_key: str = "primary"
+    snapshot_name: Optional[str] = None  # None = latest snapshot of the cluster
+    location: Optional[str] = None  # URL/file:// location (None = QDRANT_SNAPSHOT_LOCATION)
 
 class MultiDBSyncRequest(BaseModel):
     db_keys: Optional[List[str]] = None  # None = all databases
@@ -495,20 +2089,10 @@ class VectorStatusRequest(BaseModel):
     collection_name: Optional[str] = None  # None = all collections
 
 # ============= HELPER FUNCTIONS =============
-def serialize_document(doc: Any) -> Any:
-    """Recursively serialize MongoDB documents"""
-    if isinstance(doc, dict):
-        return {key: serialize_document(value) for key, value in doc.items()}
-    elif isinstance(doc, list):
-        return [serialize_document(item) for item in doc]
-    elif isinstance(doc, ObjectId):
-        return str(doc)
-    elif isinstance(doc, datetime):
-        return doc.isoformat()
-    else:
-        return doc
+CHUNK_SIZE = 500  # Characters per chunk by default
+CHUNK_OVERLAP = 50  # Characters repeated between consecutive chunks by default
 
-def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]:
+def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
     """Split text into overlapping chunks"""
     if len(text) <= chunk_size:
         return [text]
@@ -521,6 +2105,108 @@ def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]
         start = end - overlap
     return chunks
 
+RAG_CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "3000"))
+CONTEXT_DUPLICATE_THRESHOLD = 0.85  # Shingle Jaccard similarity above which blocks are near-duplicates
+CHARS_PER_TOKEN = 4  # Rough token estimate for budgeting
+
+def merge_overlapping_chunks(first: str, second: str, overlap: int = CHUNK_OVERLAP) -> str:
+    """Join two consecutive chunks, removing exactly the overlap chunk_text added between them
+    
+    Searching for the longest suffix/prefix match instead would over-trim
+    repetitive text (tables, boilerplate) and drop content.
+    """
+    if overlap > 0 and first.endswith(second[:overlap]):
+        return first + second[overlap:]
+    # Chunked without overlap (or with a different one): keep both in full
+    return first + second
+
+def text_shingles(text: str, size: int = 3) -> set:
+    """Word n-gram shingles used for near-duplicate detection"""
+    words = text.lower().split()
+    if len(words) < size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+def pack_rag_context(hits: List[Any], token_budget: int = RAG_CONTEXT_TOKEN_BUDGET) -> Tuple[str, Dict]:
+    """Assemble the LLM context from search hits
+    
+    Adjacent chunks of the same source document are merged, near-duplicate
+    blocks are dropped and the remaining blocks are added best score first
+    until the token budget is used up.
+    """
+    # Group chunks by source document
+    documents = {}
+    for hit in hits:
+        payload = hit.payload
+        key = (payload.get("db_key"), payload.get("source_collection"), payload.get("source_doc_id"))
+        documents.setdefault(key, []).append(hit)
+    
+    # Merge runs of consecutive chunk indexes into blocks
+    blocks = []
+    merged_chunks = 0
+    for (db_key, collection, doc_id), doc_hits in documents.items():
+        doc_hits.sort(key=lambda h: h.payload.get("chunk_index", 0))
+        block = None
+        for hit in doc_hits:
+            index = hit.payload.get("chunk_index", 0)
+            text = hit.payload.get("text", "")
+            if block is not None and index == block["last_index"] + 1:
+                # Points vectorized before chunk_overlap was recorded used the default
+                overlap = hit.payload.get("chunk_overlap", CHUNK_OVERLAP)
+                block["text"] = merge_overlapping_chunks(block["text"], text, overlap)
+                block["score"] = max(block["score"], hit.score)
+                block["last_index"] = index
+                merged_chunks += 1
+                continue
+            if block is not None:
+                blocks.append(block)
+            block = {"db_key": db_key, "collection": collection, "doc_id": doc_id,
+                     "text": text, "score": hit.score, "last_index": index}
+        if block is not None:
+            blocks.append(block)
+    
+    # Best blocks first; drop near-duplicates and stop at the budget
+    blocks.sort(key=lambda b: b["score"], reverse=True)
+    char_budget = token_budget * CHARS_PER_TOKEN
+    kept = []
+    kept_shingles = []
+    duplicates = 0
+    truncated = 0
+    used_chars = 0
+    for block in blocks:
+        shingles = text_shingles(block["text"])
+        if any(
+            len(shingles & other) / max(len(shingles | other), 1) >= CONTEXT_DUPLICATE_THRESHOLD
+            for other in kept_shingles
+        ):
+            duplicates += 1
+            continue
+        
+        header = f"[DB: {block['db_key']}, Collection: {block['collection']}, Document: {block['doc_id']}, Similarity: {block['score']:.3f}]\n"
+        entry = header + block["text"]
+        remaining = char_budget - used_chars
+        if len(entry) > remaining:
+            if kept:
+                truncated += 1
+                continue
+            # Always keep (a truncated) best block
+            entry = entry[:remaining]
+        
+        kept.append(entry)
+        kept_shingles.append(shingles)
+        used_chars += len(entry) + 2
+    
+    context = "\n\n".join(kept)
+    return context, {
+        "hits": len(hits),
+        "blocks": len(kept),
+        "chunks_merged": merged_chunks,
+        "duplicates_dropped": duplicates,
+        "blocks_over_budget": truncated,
+        "estimated_tokens": len(context) // CHARS_PER_TOKEN,
+        "token_budget": token_budget
+    }
+
 def normalize_embedding(embedding: List[float]) -> List[float]:
     """Normalize embedding to unit length"""
     norm = sum(x * x for x in embedding) ** 0.5
@@ -586,6 +2272,193 @@ async def get_query_embedding(text: str) -> List[float]:
         print(f"❌ Query embedding error: {e}")
         return [0.0] * EMBEDDING_DIMENSION
 
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))  # seconds per Gemini call
+LLM_CHART_TIMEOUT = float(os.getenv("LLM_CHART_TIMEOUT", "15"))
+
+async def generate_llm_text(
+    prompt: str,
+    timeout: float = LLM_TIMEOUT,
+    context_ids: Optional[Iterable[str]] = None,
+    cache_tags: Optional[Iterable[Tuple[str, str]]] = None
+) -> str:
+    """Generate text with Gemini without blocking the event loop
+    
+    Responses are cached by prompt and context_ids; cache_tags are the
+    (db_key, collection) pairs whose re-vectorization invalidates the entry.
+    """
+    cache_key = llm_response_cache.get_key(prompt, context_ids)
+    cached = llm_response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    response = await asyncio.wait_for(
+        llm_model.generate_content_async(prompt),
+        timeout=timeout
+    )
+    quota_manager.track_llm()
+    llm_response_cache.set(cache_key, response.text, cache_tags)
+    return response.text
+
+async def stream_llm_text(
+    prompt: str,
+    timeout: float = LLM_TIMEOUT,
+    context_ids: Optional[Iterable[str]] = None,
+    cache_tags: Optional[Iterable[Tuple[str, str]]] = None
+):
+    """Stream Gemini text chunks as they are produced (timeout applies per chunk)
+    
+    Shares the response cache with generate_llm_text; a cache hit yields the
+    whole answer as a single chunk.
+    """
+    cache_key = llm_response_cache.get_key(prompt, context_ids)
+    cached = llm_response_cache.get(cache_key)
+    if cached is not None:
+        yield cached
+        return
+    
+    response = await asyncio.wait_for(
+        llm_model.generate_content_async(prompt, stream=True),
+        timeout=timeout
+    )
+    quota_manager.track_llm()
+    
+    parts = []
+    chunks = response.__aiter__()
+    while True:
+        try:
+            chunk = await asyncio.wait_for(chunks.__anext__(), timeout=timeout)
+        except StopAsyncIteration:
+            break
+        if chunk.text:
+            parts.append(chunk.text)
+            yield chunk.text
+    
+    llm_response_cache.set(cache_key, "".join(parts), cache_tags)
+
+async def extract_search_keywords(
+    prompt: str,
+    fallback: str,
+    cache_tags: Optional[Iterable[Tuple[str, str]]] = None
+) -> str:
+    """Extract search keywords with Gemini, falling back to the raw query on timeout"""
+    try:
+        return (await generate_llm_text(prompt, cache_tags=cache_tags)).strip()
+    except asyncio.TimeoutError:
+        print(f"⚠️  Keyword extraction timed out after {LLM_TIMEOUT}s, using raw query")
+        return fallback
+
+KEYWORD_EXTRACTION_MODE = os.getenv("KEYWORD_EXTRACTION_MODE", "llm")  # "llm" or "local"
+KEYWORD_MODES = ("llm", "local")
+KEYWORD_STOPWORDS = frozenset("""
+a about all also an and any are as at be been but by can could did do does each find for from get
+give has have how i if in into is it its list me my of on or our please show should so some tell
+than that the their them then there these they this those to us was we were what when where which
+who whom why will with would you your
+""".split())
+
+def resolve_keyword_mode(mode: Optional[str]) -> str:
+    """Resolve per-request keyword extraction mode against the configured default"""
+    mode = (mode or KEYWORD_EXTRACTION_MODE).lower()
+    if mode not in KEYWORD_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid keyword_mode '{mode}'. Must be one of: {', '.join(KEYWORD_MODES)}"
+        )
+    return mode
+
+async def extract_keywords_locally(query: str, schema_fields: Optional[List[str]] = None, top_n: int = 5) -> str:
+    """Extract search keywords in-process by ranking query n-grams with MiniLM
+    
+    Candidates are 1-3 word n-grams from the query (not starting or ending with a
+    stopword) plus schema field names. They are embedded together with the query
+    in a single model pass (off the event loop) and the top_n most similar,
+    non-overlapping ones win.
+    """
+    # Keep IDs, emails and product codes intact as single tokens
+    tokens = [t.strip(".-") for t in re.findall(r"[\w@.\-]+", query)]
+    tokens = [t for t in tokens if t]
+    
+    candidates = []
+    seen = set()
+    for n in (1, 2, 3):
+        for i in range(len(tokens) - n + 1):
+            gram = tokens[i:i + n]
+            if gram[0].lower() in KEYWORD_STOPWORDS or gram[-1].lower() in KEYWORD_STOPWORDS:
+                continue
+            phrase = " ".join(gram)
+            if phrase.lower() not in seen:
+                seen.add(phrase.lower())
+                candidates.append(phrase)
+    
+    for field in schema_fields or []:
+        # customer_name / customerName -> "customer name"
+        phrase = re.sub(r"(?<=[a-z])(?=[A-Z])", " ", field).replace("_", " ").strip().lower()
+        if phrase and phrase not in seen and not field.startswith("_"):
+            seen.add(phrase)
+            candidates.append(phrase)
+    
+    if not candidates:
+        return query.strip()
+    
+    embeddings = await asyncio.to_thread(
+        embedding_model.encode,
+        [query] + candidates,
+        convert_to_numpy=True,
+        normalize_embeddings=True
+    )
+    scores = embeddings[1:] @ embeddings[0]
+    
+    selected = []
+    covered = set()
+    for idx in scores.argsort()[::-1]:
+        words = set(candidates[idx].lower().split())
+        # Skip candidates fully covered by already selected phrases
+        if words <= covered:
+            continue
+        selected.append(candidates[idx])
+        covered |= words
+        if len(selected) >= top_n:
+            break
+    
+    return " ".join(selected)
+
+async def get_query_embeddings_batch(texts: List[str]) -> List[List[float]]:
+    """Embed many queries in one model pass, reusing cached query embeddings"""
+    return await get_embeddings_batch(texts, cache_prefix="query:")
+
+async def get_embeddings_batch(texts: List[str], cache_prefix: str = "") -> List[List[float]]:
+    """Embed many texts in one model pass off the event loop, reusing cached embeddings"""
+    embeddings = [None] * len(texts)
+    misses = []
+    for i, text in enumerate(texts):
+        if not text or not text.strip():
+            embeddings[i] = [0.0] * EMBEDDING_DIMENSION
+            continue
+        cached = embedding_cache.get(f"{cache_prefix}{text}")
+        if cached:
+            embeddings[i] = cached
+        else:
+            misses.append(i)
+    
+    if misses:
+        unique_texts = list(dict.fromkeys(texts[i] for i in misses))
+        encoded = await asyncio.to_thread(
+            embedding_model.encode,
+            unique_texts,
+            batch_size=64,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        )
+        by_text = {}
+        for text, embedding in zip(unique_texts, encoded):
+            by_text[text] = embedding.tolist()
+            embedding_cache.set(f"{cache_prefix}{text}", by_text[text])
+            quota_manager.track_embedding()
+        for i in misses:
+            embeddings[i] = by_text[texts[i]]
+    
+    return embeddings
+
 def build_qdrant_filter(
     db_key: Optional[str] = None,
     collection_filter: Optional[str] = None,
@@ -645,22 +2518,20 @@ def build_qdrant_filter(
 async def initialize_qdrant_collection_for_db(db_key: str, collection_name: str):
     """Initialize a Qdrant collection for a specific database"""
     try:
-        collections = qdrant_client.get_collections().collections
-        collection_names = [c.name for c in collections]
-        
         # Check if collection exists and has correct dimensions
-        if collection_name in collection_names:
-            collection_info = qdrant_client.get_collection(collection_name)
+        if qdrant_metadata_cache.exists(collection_name):
+            collection_info = qdrant_metadata_cache.get_info(collection_name)
             current_dim = collection_info.config.params.vectors.size
             
             if current_dim != EMBEDDING_DIMENSION:
                 print(f"⚠️  Collection '{collection_name}' dimension mismatch: expected {EMBEDDING_DIMENSION}, got {current_dim}")
                 print(f"🗑️  Deleting old collection '{collection_name}'...")
                 qdrant_client.delete_collection(collection_name)
+                qdrant_metadata_cache.mark_deleted(collection_name)
+                lexical_index_manager.drop(collection_name)
                 print(f"✓ Old collection deleted")
-                collection_names.remove(collection_name)
         
-        if collection_name not in collection_names:
+        if not qdrant_metadata_cache.exists(collection_name):
             print(f"Creating Qdrant collection: {collection_name} for database '{db_key}' (dimension: {EMBEDDING_DIMENSION})")
             
             qdrant_client.create_collection(
@@ -705,6 +2576,7 @@ async def initialize_qdrant_collection_for_db(db_key: str, collection_name: str)
                 field_schema="datetime"
             )
             
+            qdrant_metadata_cache.mark_created(collection_name)
             print(f"✓ Collection '{collection_name}' created with indexes")
         else:
             print(f"✓ Collection '{collection_name}' already exists (dimension: {EMBEDDING_DIMENSION})")
@@ -731,6 +2603,7 @@ async def startup_event():
     """Initialize Qdrant collection on startup"""
     try:
         await initialize_qdrant_collection()
+        database_catalog.warm()  # Build collection listings in the background
         print(f"✓ Synapse DB API started with {len(databases)} database(s)")
         for db_key, config in MONGO_DATABASES.items():
             print(f"  - {db_key}: {config['name']}")
@@ -740,68 +2613,57 @@ async def startup_event():
 # ============= DATABASE MANAGEMENT ENDPOINTS =============
 @app.get("/databases")
 async def list_databases():
-    """List all configured databases"""
+    """List all configured databases (counts are estimates from the cached catalog)"""
+    db_keys = [db_key for db_key in MONGO_DATABASES if db_key in databases]
+    listings = await asyncio.gather(
+        *(database_catalog.collections(db_key) for db_key in db_keys),
+        return_exceptions=True
+    )
+    listings = dict(zip(db_keys, listings))
+    
     db_info = []
     for db_key, config in MONGO_DATABASES.items():
-        try:
-            db_instance = databases[db_key]
-            collections = await db_instance.list_collection_names()
-            
-            # Count total documents
-            total_docs = 0
-            for coll_name in collections:
-                total_docs += await db_instance[coll_name].count_documents({})
-            
-            db_info.append({
-                "key": db_key,
-                "name": config["name"],
-                "description": config.get("description", ""),
-                "status": "connected",
-                "collections_count": len(collections),
-                "total_documents": total_docs
-            })
-        except Exception as e:
+        collections = listings.get(db_key, KeyError(f"Database '{db_key}' is not connected"))
+        if isinstance(collections, Exception):
             db_info.append({
                 "key": db_key,
                 "name": config["name"],
                 "status": "error",
-                "error": str(e)
+                "error": str(collections) or type(collections).__name__
             })
+            continue
+        db_info.append({
+            "key": db_key,
+            "name": config["name"],
+            "description": config.get("description", ""),
+            "status": "connected",
+            "collections_count": len(collections),
+            "total_documents": sum(c["document_count"] for c in collections),
+            "catalog_age_seconds": database_catalog.age(db_key)
+        })
     
-    return {"databases": db_info, "total": len(db_info)}
+    return {"databases": db_info, "total": len(db_info), "counts_estimated": True}
 
 @app.get("/databases/{db_key}/collections")
-async def list_collections_in_database(db_key: str):
-    """List all collections in a specific database"""
+async def list_collections_in_database(db_key: str, refresh: bool = False):
+    """List all collections in a specific database (refresh=true bypasses the catalog cache)"""
     if db_key not in databases:
         raise HTTPException(status_code=404, detail=f"Database '{db_key}' not found")
     
     try:
-        db_instance = databases[db_key]
-        collections = await db_instance.list_collection_names()
-        collection_info = []
-        
-        for coll_name in collections:
-            count = await db_instance[coll_name].count_documents({})
-            
-            # Check vector status
-            state = await vector_state_manager.get_state(db_key, coll_name)
-            
-            collection_info.append({
-                "name": coll_name,
-                "document_count": count,
-                "vectorized": state is not None,
-                "vector_count": state.get("vector_count", 0) if state else 0,
-                "last_vectorized": state.get("last_vectorized") if state else None
-            })
+        if refresh:
+            database_catalog.invalidate(db_key)
+        collections = await database_catalog.collections(db_key)
         
         return {
             "db_key": db_key,
-            "collections": collection_info,
-            "total_collections": len(collections)
+            "collections": collections,
+            "total_collections": len(collections),
+            "counts_estimated": True,
+            "catalog_age_seconds": database_catalog.age(db_key)
         }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=500, detail=str(e) or type(e).__name__)
 
 @app.post("/databases/add")
 async def add_database_connection(db_info: DatabaseInfo):
@@ -846,6 +2708,7 @@ async def add_database_connection(db_info: DatabaseInfo):
         
         # Save to file
         save_database_connections(MONGO_DATABASES)
+        database_catalog.invalidate(db_info.key)
         
         return {
             "status": "success",
@@ -883,6 +2746,7 @@ async def remove_database_connection(db_key: str):
         
         # Save to file
         save_database_connections(MONGO_DATABASES)
+        database_catalog.invalidate(db_key)
         
         return {
             "status": "success",
@@ -970,6 +2834,7 @@ async def vectorize_with_progress(request: SmartVectorizeRequest):
                         "source_collection": request.collection_name,
                         "source_doc_id": doc_id,
                         "chunk_index": idx,
+                        "chunk_overlap": request.overlap,
                         "text": chunk,
                         "metadata": {
                             "text_fields": request.text_fields,
@@ -985,10 +2850,7 @@ async def vectorize_with_progress(request: SmartVectorizeRequest):
                 if len(batch_points) >= request.batch_size:
                     # Use database-specific collection
                     qdrant_collection = get_qdrant_collection_for_db(request.db_key)
-                    qdrant_client.upsert(
-                        collection_name=qdrant_collection,
-                        points=batch_points
-                    )
+                    upsert_vector_points(qdrant_collection, batch_points)
                     yield f"data: {json.dumps({'stage': 'batch_uploaded', 'message': f'Uploaded batch of {len(batch_points)} vectors'})}\n\n"
                     batch_points = []
             
@@ -1002,12 +2864,11 @@ async def vectorize_with_progress(request: SmartVectorizeRequest):
         # Upsert remaining points
         if batch_points:
             qdrant_collection = get_qdrant_collection_for_db(request.db_key)
-            qdrant_client.upsert(
-                collection_name=qdrant_collection,
-                points=batch_points
-            )
+            upsert_vector_points(qdrant_collection, batch_points)
             yield f"data: {json.dumps({'stage': 'final_batch', 'message': f'Uploaded final batch of {len(batch_points)} vectors'})}\n\n"
         
+        invalidate_vector_caches(request.db_key, request.collection_name)
+        
         # Update state
         yield f"data: {json.dumps({'stage': 'saving_state', 'message': 'Saving vectorization state...'})}\n\n"
         
@@ -1023,6 +2884,7 @@ async def vectorize_with_progress(request: SmartVectorizeRequest):
             vector_count=total_chunks,
             text_fields=request.text_fields,
             chunk_size=request.chunk_size,
+            chunk_overlap=request.overlap,
             content_hash=content_hash
         )
         
@@ -1107,6 +2969,7 @@ async def smart_vectorize(request: SmartVectorizeRequest):
                         "source_collection": request.collection_name,
                         "source_doc_id": doc_id,
                         "chunk_index": idx,
+                        "chunk_overlap": request.overlap,
                         "text": chunk,
                         "metadata": {
                             "text_fields": request.text_fields,
@@ -1122,10 +2985,7 @@ async def smart_vectorize(request: SmartVectorizeRequest):
                 if len(batch_points) >= request.batch_size:
                     # Use database-specific collection
                     qdrant_collection = get_qdrant_collection_for_db(request.db_key)
-                    qdrant_client.upsert(
-                        collection_name=qdrant_collection,
-                        points=batch_points
-                    )
+                    upsert_vector_points(qdrant_collection, batch_points)
                     batch_points = []
             
             vectorized_count += 1
@@ -1134,10 +2994,9 @@ async def smart_vectorize(request: SmartVectorizeRequest):
         if batch_points:
             # Use database-specific collection
             qdrant_collection = get_qdrant_collection_for_db(request.db_key)
-            qdrant_client.upsert(
-                collection_name=qdrant_collection,
-                points=batch_points
-            )
+            upsert_vector_points(qdrant_collection, batch_points)
+        
+        invalidate_vector_caches(request.db_key, request.collection_name)
         
         # Update state
         content_hash = await vector_state_manager.compute_content_hash(
@@ -1152,6 +3011,7 @@ async def smart_vectorize(request: SmartVectorizeRequest):
             vector_count=total_chunks,
             text_fields=request.text_fields,
             chunk_size=request.chunk_size,
+            chunk_overlap=request.overlap,
             content_hash=content_hash
         )
         
@@ -1349,6 +3209,14 @@ async def sync_all_databases(request: MultiDBSyncRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def invalidate_vector_caches(db_key: str, collection_name: Optional[str] = None):
+    """Drop cached state derived from a database's vectors after they change"""
+    qdrant_metadata_cache.invalidate(get_qdrant_collection_for_db(db_key))
+    llm_response_cache.invalidate(db_key, collection_name)
+    semantic_answer_cache.invalidate(db_key, collection_name)
+    document_hydrator.invalidate(db_key, collection_name)
+    database_catalog.invalidate(db_key)
+
 async def clear_collection_vectors(db_key: str, collection_name: str):
     """Clear vectors for a specific collection from the database-specific Qdrant collection"""
     # Get the Qdrant collection for this database
@@ -1356,9 +3224,7 @@ async def clear_collection_vectors(db_key: str, collection_name: str):
     
     # Check if collection exists
     try:
-        collections = qdrant_client.get_collections().collections
-        collection_names = [c.name for c in collections]
-        if qdrant_collection not in collection_names:
+        if not qdrant_metadata_cache.exists(qdrant_collection):
             print(f"⚠️  Qdrant collection '{qdrant_collection}' not found")
             return 0
     except Exception as e:
@@ -1396,6 +3262,8 @@ async def clear_collection_vectors(db_key: str, collection_name: str):
             collection_name=qdrant_collection,
             points_selector=points_to_delete
         )
+        invalidate_vector_caches(db_key, collection_name)
+    lexical_index_manager.remove_collection(qdrant_collection, collection_name)
     
     return len(points_to_delete)
 
@@ -1428,17 +3296,16 @@ async def clear_vectors(
             
             try:
                 # Delete the entire Qdrant collection for this database
-                collections = qdrant_client.get_collections().collections
-                collection_names = [c.name for c in collections]
-                
                 total_deleted = 0
-                if qdrant_collection in collection_names:
+                if qdrant_metadata_cache.exists(qdrant_collection):
                     # Get count before deletion
-                    collection_info = qdrant_client.get_collection(qdrant_collection)
-                    total_deleted = collection_info.points_count
+                    total_deleted = qdrant_metadata_cache.points_count(qdrant_collection)
                     
                     # Delete the collection
                     qdrant_client.delete_collection(qdrant_collection)
+                    qdrant_metadata_cache.mark_deleted(qdrant_collection)
+                    lexical_index_manager.drop(qdrant_collection)
+                    invalidate_vector_caches(db_key)
                     print(f"🗑️  Deleted Qdrant collection '{qdrant_collection}' for database '{db_key}'")
                     
                     # Recreate the empty collection
@@ -1467,14 +3334,14 @@ async def clear_vectors(
             for db_key in databases.keys():
                 try:
                     qdrant_collection = get_qdrant_collection_for_db(db_key)
-                    collections = qdrant_client.get_collections().collections
-                    collection_names = [c.name for c in collections]
                     
-                    if qdrant_collection in collection_names:
-                        collection_info = qdrant_client.get_collection(qdrant_collection)
-                        total_deleted += collection_info.points_count
+                    if qdrant_metadata_cache.exists(qdrant_collection):
+                        total_deleted += qdrant_metadata_cache.points_count(qdrant_collection)
                         
                         qdrant_client.delete_collection(qdrant_collection)
+                        qdrant_metadata_cache.mark_deleted(qdrant_collection)
+                        lexical_index_manager.drop(qdrant_collection)
+                        invalidate_vector_caches(db_key)
                         deleted_collections.append(qdrant_collection)
                 except Exception as e:
                     print(f"⚠️  Error deleting collection for '{db_key}': {e}")
@@ -1536,283 +3403,162 @@ async def debug_qdrant_collections():
         raise HTTPException(status_code=500, detail=str(e))
 
 # ============= VECTOR QUERY ENDPOINTS =============
-@app.post("/query/natural")
-async def natural_language_query(request: QueryRequest):
-    """Natural language query - alias for vector RAG"""
-    return await vector_rag_query(request)
+CHART_MODE = os.getenv("CHART_MODE", "local")  # "local", "auto" (local, then LLM fallback) or "llm"
+CHART_MODES = ("local", "auto", "llm")
+CHART_MAX_CATEGORIES = 12
+CHART_MAX_POINTS = 50
+CHART_AVERAGE_WORDS = ("average", "avg", "mean", "typical")
+CHART_SHARE_WORDS = ("share", "distribution", "breakdown", "percentage", "proportion", "split")
 
-@app.post("/query/vector-rag")
-async def vector_rag_query(request: QueryRequest):
-    """Query using vector similarity search across databases"""
-    try:
-        # Get database schema information for VECTORIZED collections only
-        db_instance = databases.get(request.db_key or "primary")
-        schema_info = ""
-        vectorized_collections = []
-        
-        if db_instance is not None:
-            try:
-                # Get vectorized collections directly from Qdrant (ground truth)
-                db_key_to_check = request.db_key or "primary"
-                
-                # Query Qdrant to find which collections have vectors for this database
-                try:
-                    # Get the Qdrant collection for this database
-                    qdrant_collection = get_qdrant_collection_for_db(db_key_to_check)
-                    
-                    # Check if collection exists
-                    collections = qdrant_client.get_collections().collections
-                    collection_names = [c.name for c in collections]
-                    
-                    if qdrant_collection not in collection_names:
-                        print(f"⚠️  Qdrant collection '{qdrant_collection}' not found for database '{db_key_to_check}'")
-                        print(f"   Available collections: {collection_names}")
-                        vectorized_collections = []
-                    else:
-                        # Get collection info to check if it has any points
-                        try:
-                            collection_info = qdrant_client.get_collection(qdrant_collection)
-                            point_count = collection_info.points_count
-                            print(f"📊 Qdrant collection '{qdrant_collection}' has {point_count} points")
-                            
-                            if point_count == 0:
-                                print(f"⚠️  Collection is empty - no vectors found")
-                                vectorized_collections = []
-                            else:
-                                # Scroll through Qdrant to find unique collections
-                                collections_in_qdrant = set()
-                                offset = None
-                                total_points_checked = 0
-                                
-                                while True:
-                                    result = qdrant_client.scroll(
-                                        collection_name=qdrant_collection,
-                                        scroll_filter=Filter(
-                                            must=[
-                                                FieldCondition(
-                                                    key="db_key",
-                                                    match=MatchValue(value=db_key_to_check)
-                                                )
-                                            ]
-                                        ),
-                                        limit=100,
-                                        offset=offset,
-                                        with_payload=True,
-                                        with_vectors=False
-                                    )
-                                    
-                                    total_points_checked += len(result[0])
-                                    print(f"   Checked {total_points_checked} points so far...")
-                                    
-                                    for point in result[0]:
-                                        coll_name = point.payload.get("source_collection")
-                                        if coll_name:
-                                            collections_in_qdrant.add(coll_name)
-                                    
-                                    if result[1] is None:
-                                        break
-                                    offset = result[1]
-                                
-                                vectorized_collections = list(collections_in_qdrant)
-                                print(f"   Found {len(vectorized_collections)} unique collections with vectors")
-                        except Exception as scroll_error:
-                            print(f"❌ Error scrolling collection: {scroll_error}")
-                            vectorized_collections = []
-                except Exception as e:
-                    print(f"Error checking Qdrant: {e}")
-                    vectorized_collections = []
-                
-                # If specific collection requested, use only that
-                if request.collection_name:
-                    target_collections = [request.collection_name] if request.collection_name in vectorized_collections else []
-                else:
-                    # Use ALL vectorized collections found in Qdrant
-                    target_collections = vectorized_collections
-                
-                schema_parts = []
-                for coll_name in target_collections:
-                    # Get sample document to understand schema
-                    sample = await db_instance[coll_name].find_one()
-                    if sample:
-                        fields = list(sample.keys())
-                        fields = [f for f in fields if f != '_id']  # Remove _id
-                        
-                        # Limit to first 15 fields per collection to avoid token overflow
-                        if len(fields) > 15:
-                            displayed_fields = ', '.join(fields[:15]) + f' (and {len(fields)-15} more fields)'
-                        else:
-                            displayed_fields = ', '.join(fields)
-                        
-                        schema_parts.append(f"{coll_name}: {displayed_fields}")
-                
-                schema_info = "\n".join(schema_parts)
-                
-                if not schema_info:
-                    schema_info = "No vectorized collections found"
-                    
-                print(f"📚 Vectorized collections: {vectorized_collections}")
-            except Exception as e:
-                print(f"Could not fetch schema: {e}")
-                schema_info = "Schema unavailable"
-        
-        # Step 1: Use Gemini to extract keywords from the query based on schema
-        print(f"🔍 Original query: {request.query}")
-        print(f"📊 Searching across {len(target_collections)} collections: {', '.join(target_collections)}")
-        
-        keyword_prompt = f"""You are a search query optimizer. Extract the most important keywords and concepts from the user's query that would be useful for semantic search.
+def resolve_chart_mode(mode: Optional[str]) -> str:
+    """Resolve per-request chart mode against the configured default"""
+    mode = (mode or CHART_MODE).lower()
+    if mode not in CHART_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid chart_mode '{mode}'. Must be one of: {', '.join(CHART_MODES)}"
+        )
+    return mode
 
-Available Database Collections and Fields:
-{schema_info}
+def _field_label(field: str) -> str:
+    return field.replace(".", " ").replace("_", " ").strip().title()
 
-User Query: "{request.query}"
+def _query_mentions(query_words: set, field: str) -> bool:
+    parts = set(re.split(r"[._\s]+", re.sub(r"(?<=[a-z])(?=[A-Z])", " ", field).lower()))
+    return bool(parts & query_words)
 
-Task: Extract 3-5 key search terms or phrases that capture the essence of what the user is looking for. Consider:
-- Important nouns and entities
-- Actions or verbs
-- Relevant field names from the schema
-- Related concepts
+def build_chart_locally(docs: List[Dict], query: str) -> Optional[Dict]:
+    """Infer a chart from documents without an LLM
+    
+    Profiles the documents with pandas, picks a categorical field (few,
+    repeating values) and a numeric field, preferring fields the query
+    mentions, and aggregates. Falls back to a category count or a time series.
+    Returns the chart_data shape the UI expects, or None if nothing fits.
+    """
+    if len(docs) < 2:
+        return None
+    
+    df = pd.json_normalize([serialize_document(doc) for doc in docs])
+    df = df[[c for c in df.columns if not c.startswith("_") and not c.endswith("._id")]]
+    if df.empty:
+        return None
+    
+    query_lower = query.lower()
+    query_words = set(re.findall(r"[a-z0-9]+", query_lower))
+    
+    numeric, categorical, temporal = [], [], []
+    for column in df.columns:
+        values = df[column].dropna()
+        if values.empty or values.map(lambda v: isinstance(v, (list, dict))).any():
+            continue
+        if values.map(lambda v: isinstance(v, bool)).all():
+            categorical.append(column)
+            continue
+        as_number = pd.to_numeric(values, errors="coerce")
+        if as_number.notna().mean() >= 0.8:
+            # Unique integer columns are identifiers, not measures
+            looks_like_id = as_number.nunique() == len(values) and column.lower().endswith("id")
+            if not looks_like_id:
+                numeric.append(column)
+            continue
+        if values.map(lambda v: isinstance(v, str)).all():
+            as_date = pd.to_datetime(values, errors="coerce", utc=True)
+            if as_date.notna().mean() >= 0.8 and values.str.len().min() >= 8:
+                temporal.append(column)
+                continue
+            unique_count = values.nunique()
+            if 2 <= unique_count <= CHART_MAX_CATEGORIES * 2 and unique_count < len(values):
+                categorical.append(column)
+    
+    def ranked(columns):
+        # Fields named in the query first, then fewest missing values
+        return sorted(columns, key=lambda c: (not _query_mentions(query_words, c), df[c].isna().sum()))
+    
+    numeric, categorical, temporal = ranked(numeric), ranked(categorical), ranked(temporal)
+    use_average = any(word in query_words for word in CHART_AVERAGE_WORDS)
+    wants_share = any(word in query_words for word in CHART_SHARE_WORDS)
+    
+    if categorical and numeric:
+        category, measure = categorical[0], numeric[0]
+        frame = pd.DataFrame({
+            "category": df[category].astype(str),
+            "value": pd.to_numeric(df[measure], errors="coerce")
+        }).dropna()
+        if frame.empty:
+            return None
+        grouped = frame.groupby("category")["value"]
+        series = (grouped.mean() if use_average else grouped.sum()).sort_values(ascending=False)
+        series = series.head(CHART_MAX_CATEGORIES)
+        aggregation = "Average" if use_average else "Total"
+        chart_type = "pie" if wants_share and not use_average and len(series) <= 6 else "bar"
+        return {
+            "chartType": chart_type,
+            "title": f"{aggregation} {_field_label(measure)} by {_field_label(category)}",
+            "labels": [str(label) for label in series.index],
+            "datasets": [{
+                "label": f"{aggregation} {_field_label(measure)}",
+                "data": [round(float(value), 2) for value in series.values]
+            }]
+        }
+    
+    if temporal and numeric:
+        time_field, measure = temporal[0], numeric[0]
+        frame = pd.DataFrame({
+            "time": pd.to_datetime(df[time_field], errors="coerce", utc=True),
+            "value": pd.to_numeric(df[measure], errors="coerce")
+        }).dropna().sort_values("time").tail(CHART_MAX_POINTS)
+        if len(frame) < 2:
+            return None
+        return {
+            "chartType": "line",
+            "title": f"{_field_label(measure)} over {_field_label(time_field)}",
+            "labels": [t.strftime("%Y-%m-%d") for t in frame["time"]],
+            "datasets": [{
+                "label": _field_label(measure),
+                "data": [round(float(value), 2) for value in frame["value"]]
+            }]
+        }
+    
+    if categorical:
+        category = categorical[0]
+        counts = df[category].dropna().astype(str).value_counts().head(CHART_MAX_CATEGORIES)
+        return {
+            "chartType": "pie" if len(counts) <= 6 else "bar",
+            "title": f"Documents by {_field_label(category)}",
+            "labels": [str(label) for label in counts.index],
+            "datasets": [{
+                "label": "Count",
+                "data": [int(value) for value in counts.values]
+            }]
+        }
+    
+    return None
 
-Return ONLY the keywords/phrases separated by spaces (no explanation, no bullets, just the terms).
+def parse_llm_chart(chart_json: str) -> Optional[Dict]:
+    """Parse a chart configuration returned by the LLM (JSON only, never evaluated)"""
+    chart_json = chart_json.strip()
+    if not chart_json or chart_json.lower() == "null":
+        return None
+    # Remove markdown code blocks if present
+    chart_json = chart_json.replace('```json', '').replace('```', '').strip()
+    try:
+        chart_data = json.loads(chart_json)
+    except ValueError:
+        print(f"⚠️  Could not parse chart data")
+        return None
+    if not isinstance(chart_data, dict) or "labels" not in chart_data or "datasets" not in chart_data:
+        return None
+    return chart_data
 
-Keywords:"""
-        
-        print(f"🤖 Using Gemini to extract search keywords...")
-        keyword_response = llm_model.generate_content(keyword_prompt)
-        search_keywords = keyword_response.text.strip()
-        quota_manager.track_llm()
-        
-        print(f"🎯 Extracted keywords: {search_keywords}")
-        
-        # Step 2: Create vector embedding from the keywords using MiniLM
-        print(f"🧠 Creating 384-dim vector embedding from keywords...")
-        query_embedding = await get_query_embedding(search_keywords)
-        print(f"✓ Embedding created: {len(query_embedding)} dimensions")
-        
-        # Build filter
-        qdrant_filter = build_qdrant_filter(
-            db_key=request.db_key,
-            collection_filter=request.collection_name
-        )
-        
-        # Get the Qdrant collection for this database
-        db_key_for_search = request.db_key or "primary"
-        qdrant_collection = get_qdrant_collection_for_db(db_key_for_search)
-        
-        # Check if collection exists before searching
-        collections = qdrant_client.get_collections().collections
-        collection_names = [c.name for c in collections]
-        
-        if qdrant_collection not in collection_names:
-            return {
-                "query": request.query,
-                "error": f"No vectors found for database '{db_key_for_search}'. Vectorize collections first.",
-                "hint": "Use POST /vectorize/smart to create embeddings"
-            }
-        
-        # Search in Qdrant (database-specific collection)
-        print(f"🔎 Searching for top {request.top_k} results with score_threshold >= {request.score_threshold}...")
-        search_result = qdrant_client.search(
-            collection_name=qdrant_collection,
-            query_vector=query_embedding,
-            query_filter=qdrant_filter,
-            limit=request.top_k,
-            score_threshold=request.score_threshold,
-            with_payload=True,
-            with_vectors=False
-        )
-        
-        print(f"📊 Raw results from Qdrant: {len(search_result)} items")
-        if search_result:
-            print(f"   Score range: {min(h.score for h in search_result):.3f} - {max(h.score for h in search_result):.3f}")
-        
-        if not search_result:
-            return {
-                "query": request.query,
-                "search_keywords": search_keywords,
-                "error": "No matching results found. Try adjusting your query or lowering the similarity threshold.",
-                "hint": "The database has been vectorized but no results matched your query closely enough.",
-                "results_found": 0
-            }
-        
-        # Extract context from results
-        context = "\n\n".join([
-            f"[DB: {hit.payload.get('db_key')}, Collection: {hit.payload.get('source_collection')}, Similarity: {hit.score:.3f}]\n{hit.payload.get('text', '')}"
-            for hit in search_result
-        ])
-        
-        sources = [
-            {
-                "db_key": hit.payload.get("db_key"),
-                "db_name": hit.payload.get("metadata", {}).get("db_name"),
-                "collection": hit.payload.get("source_collection"),
-                "doc_id": hit.payload.get("source_doc_id"),
-                "similarity": hit.score,
-                "text_preview": hit.payload.get("text", "")[:200]
-            }
-            for hit in search_result
-        ]
-        
-        # Log collection distribution
-        collection_counts = {}
-        for source in sources:
-            coll = source['collection']
-            collection_counts[coll] = collection_counts.get(coll, 0) + 1
-        print(f"📚 Results by collection: {collection_counts}")
-        
-        # Generate answer using Gemini
-        if not quota_manager.can_llm():
-            return {
-                "query": request.query,
-                "answer": "LLM quota exceeded. Returning raw context.",
-                "context": context[:500],
-                "method": "vector_rag",
-                "sources": sources,
-                "quota_warning": True
-            }
-        
-        prompt = f"""Based on the following context from multiple databases, answer the user's question.
-
-Context:
-{context}
-
-Question: {request.query}
-
-Provide a clear, concise answer based only on the context provided. Mention which database/collection the information comes from when relevant."""
-        
-        response = llm_model.generate_content(prompt)
-        quota_manager.track_llm()
-        
-        # Generate chart data from the retrieved documents
-        chart_data = None
-        try:
-            # Get actual documents from sources for chart generation
-            unique_sources = {}
-            for source in sources:
-                key = f"{source['db_key']}:{source['collection']}"
-                if key not in unique_sources:
-                    unique_sources[key] = []
-                unique_sources[key].append(source['doc_id'])
-            
-            # Fetch documents from MongoDB
-            aggregated_docs = []
-            for source_key, doc_ids in unique_sources.items():
-                db_key, collection_name = source_key.split(':')
-                db_inst = databases.get(db_key)
-                if db_inst is not None:
-                    docs = await db_inst[collection_name].find(
-                        {"_id": {"$in": [doc_id for doc_id in doc_ids]}}
-                    ).limit(20).to_list(20)
-                    aggregated_docs.extend(docs)
-            
-            # Use Gemini to analyze data and suggest chart
-            if aggregated_docs:
-                chart_prompt = f"""Analyze this data and determine if it can be visualized as a chart.
+async def generate_llm_chart(query: str, docs: List[Dict], sources: List[Dict]) -> Optional[Dict]:
+    """Ask Gemini for a chart configuration (fallback when the local builder finds nothing)"""
+    chart_prompt = f"""Analyze this data and determine if it can be visualized as a chart.
 If yes, provide a JSON chart configuration. If no, return null.
 
 Data Sample (first 3 documents):
-{str(aggregated_docs[:3])}
+{dumps_json(docs[:3]).decode("utf-8")}
 
-User Query: {request.query}
+User Query: {query}
 
 Return a JSON object with this structure if data is chartable:
 {{
@@ -1830,338 +3576,1340 @@ Return a JSON object with this structure if data is chartable:
 Return exactly: null  (if data cannot be meaningfully visualized)
 
 Chart Configuration:"""
-                
-                chart_response = llm_model.generate_content(chart_prompt)
-                chart_json = chart_response.text.strip()
-                
-                # Try to parse chart JSON
-                if chart_json and chart_json.lower() != "null":
-                    # Remove markdown code blocks if present
-                    chart_json = chart_json.replace('```json', '').replace('```', '').strip()
-                    try:
-                        chart_data = eval(chart_json) if chart_json.startswith('{') else None
-                        print(f"📊 Chart generated: {chart_data.get('chartType') if chart_data else 'None'}")
-                    except:
-                        print(f"⚠️  Could not parse chart data")
-        except Exception as e:
-            print(f"⚠️  Chart generation failed: {e}")
-        
-        print(f"✓ Found {len(sources)} relevant sources")
-        print(f"📝 Generating answer using Gemini...")
-        
-        return {
-            "query": request.query,
-            "search_keywords": search_keywords,
-            "answer": response.text,
-            "method": "hybrid_keyword_semantic",
-            "embedding_model": "all-MiniLM-L6-v2",
-            "embedding_dimensions": 384,
-            "sources": sources,
-            "total_sources": len(sources),
-            "databases_searched": list(set([s["db_key"] for s in sources])),
-            "collections_searched": list(set([s["collection"] for s in sources])),
-            "chart_data": chart_data,
-            "timestamp": datetime.utcnow().isoformat()
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    
+    chart_json = await generate_llm_text(
+        chart_prompt,
+        timeout=LLM_CHART_TIMEOUT,
+        context_ids=[f"{s['db_key']}:{s['collection']}:{s['doc_id']}" for s in sources],
+        cache_tags={(s['db_key'], s['collection']) for s in sources}
+    )
+    return parse_llm_chart(chart_json)
 
-@app.post("/query/mongodb-vector-search")
-async def mongodb_vector_search(request: QueryRequest):
-    """Search directly in MongoDB Atlas using vector search (skip Qdrant)"""
+async def generate_chart_data(query: str, sources: List[Dict], chart_mode: str = CHART_MODE) -> Optional[Dict]:
+    """Generate chart configuration from the documents behind the retrieved sources"""
+    chart_data = None
     try:
-        # Get database instance
-        db_instance = databases.get(request.db_key or "primary")
-        if db_instance is None:
-            raise HTTPException(status_code=400, detail=f"Database '{request.db_key}' not found")
+        # Get actual documents from sources for chart generation (up to 20 per collection)
+        refs = []
+        per_collection = defaultdict(int)
+        for source in sources:
+            ref = (source['db_key'], source['collection'], source['doc_id'])
+            if ref in refs or per_collection[ref[:2]] >= 20:
+                continue
+            per_collection[ref[:2]] += 1
+            refs.append(ref)
         
-        # Get all collections in the database
-        collection_names = await db_instance.list_collection_names()
-        print(f"📚 Found {len(collection_names)} collections in database")
+        documents = await document_hydrator.hydrate(refs)
+        aggregated_docs = [documents[ref] for ref in refs if ref in documents]
         
-        # Build schema info
-        schema_parts = []
-        for coll_name in collection_names[:20]:  # Limit to first 20 collections
-            sample = await db_instance[coll_name].find_one()
-            if sample:
-                fields = [f for f in sample.keys() if f != '_id'][:10]
-                schema_parts.append(f"{coll_name}: {', '.join(fields)}")
+        if not aggregated_docs:
+            return None
         
-        schema_info = "\n".join(schema_parts) if schema_parts else "No collections found"
+        if chart_mode in ("local", "auto"):
+            chart_data = build_chart_locally(aggregated_docs, query)
         
-        # Extract keywords using Gemini
-        print(f"🔍 Query: {request.query}")
-        keyword_prompt = f"""Extract 3-5 key search terms from this query for semantic search.
+        if chart_data is None and chart_mode in ("auto", "llm"):
+            chart_data = await generate_llm_chart(query, aggregated_docs, sources)
+        
+        print(f"📊 Chart generated ({chart_mode}): {chart_data.get('chartType') if chart_data else 'None'}")
+    except asyncio.TimeoutError:
+        print(f"⚠️  Chart generation timed out after {LLM_CHART_TIMEOUT}s")
+    except Exception as e:
+        print(f"⚠️  Chart generation failed: {e}")
+    return chart_data
 
-Database Collections: {', '.join(collection_names)}
-Schema: {schema_info}
+async def extract_llm_keywords_for_schema(
+    query: str,
+    schema_info: str,
+    cache_tags: Optional[Iterable[Tuple[str, str]]] = None
+) -> str:
+    """Extract search keywords with Gemini using the vectorized collections' schema"""
+    keyword_prompt = f"""You are a search query optimizer. Extract the most important keywords and concepts from the user's query that would be useful for semantic search.
 
-Query: "{request.query}"
+Available Database Collections and Fields:
+{schema_info}
 
-Return ONLY keywords separated by spaces:"""
-        
-        keyword_response = llm_model.generate_content(keyword_prompt)
-        search_keywords = keyword_response.text.strip()
-        quota_manager.track_llm()
-        print(f"🎯 Keywords: {search_keywords}")
-        
-        # Create embedding for keywords
-        query_embedding = await get_query_embedding(search_keywords)
+User Query: "{query}"
+
+Task: Extract 3-5 key search terms or phrases that capture the essence of what the user is looking for. Consider:
+- Important nouns and entities
+- Actions or verbs
+- Relevant field names from the schema
+- Related concepts
+
+Return ONLY the keywords/phrases separated by spaces (no explanation, no bullets, just the terms).
+
+Keywords:"""
+    
+    print(f"🤖 Using Gemini to extract search keywords...")
+    return await extract_search_keywords(keyword_prompt, query, cache_tags)
+
+@app.post("/query/natural")
+async def natural_language_query(request: QueryRequest):
+    """Natural language query - alias for vector RAG"""
+    return await vector_rag_query(request)
+
+async def load_vectorized_schema(db_key: str, collection_name: Optional[str] = None) -> Dict[str, Any]:
+    """Find the vectorized collections of a database and sample their fields for the keyword stage"""
+    db_instance = databases.get(db_key)
+    vectorized_collections = []
+    target_collections = []
+    schema_parts = []
+    schema_fields = []
+    
+    if db_instance is None:
+        return {"target_collections": [], "schema_parts": [], "schema_fields": [], "error": "database_not_found"}
+    
+    try:
+        # Query Qdrant to find which collections have vectors for this database
+        try:
+            # Get the Qdrant collection for this database
+            qdrant_collection = get_qdrant_collection_for_db(db_key)
+            
+            # Check if collection exists (cached metadata, no round trip in steady state)
+            if not qdrant_metadata_cache.exists(qdrant_collection):
+                print(f"⚠️  Qdrant collection '{qdrant_collection}' not found for database '{db_key}'")
+            else:
+                # Get collection info to check if it has any points
+                try:
+                    point_count = qdrant_metadata_cache.points_count(qdrant_collection)
+                    print(f"📊 Qdrant collection '{qdrant_collection}' has {point_count} points")
+                    
+                    if point_count == 0:
+                        print(f"⚠️  Collection is empty - no vectors found")
+                    else:
+                        # Unique source collections with vectors for this database
+                        vectorized_collections = qdrant_metadata_cache.source_collections(
+                            qdrant_collection,
+                            db_key
+                        )
+                        print(f"   Found {len(vectorized_collections)} unique collections with vectors")
+                except Exception as scroll_error:
+                    print(f"❌ Error scrolling collection: {scroll_error}")
+        except Exception as e:
+            print(f"Error checking Qdrant: {e}")
         
-        # Search across all collections with vector indexes
-        all_results = []
+        # If specific collection requested, use only that
+        if collection_name:
+            target_collections = [collection_name] if collection_name in vectorized_collections else []
+        else:
+            # Use ALL vectorized collections found in Qdrant
+            target_collections = vectorized_collections
         
-        # Try to search collections that might have vector indexes
-        for coll_name in collection_names:
-            try:
-                # MongoDB Atlas Vector Search aggregation pipeline
-                pipeline = [
-                    {
-                        "$vectorSearch": {
-                            "index": "vector_index",  # Your Atlas vector search index name
-                            "path": "embedding",      # Field containing the vector
-                            "queryVector": query_embedding,
-                            "numCandidates": 100,
-                            "limit": request.top_k
-                        }
-                    },
-                    {
-                        "$project": {
-                            "_id": 1,
-                            "score": {"$meta": "vectorSearchScore"},
-                            "text": 1,
-                            "content": 1,
-                            "title": 1,
-                            "description": 1
-                        }
-                    }
-                ]
+        # Get sample documents to understand schema (one concurrent round trip)
+        samples = await asyncio.gather(*[
+            db_instance[coll_name].find_one() for coll_name in target_collections
+        ])
+        for coll_name, sample in zip(target_collections, samples):
+            if sample:
+                fields = list(sample.keys())
+                fields = [f for f in fields if f != '_id']  # Remove _id
+                schema_fields.extend(fields)
                 
-                results = await db_instance[coll_name].aggregate(pipeline).to_list(request.top_k)
+                # Limit to first 15 fields per collection to avoid token overflow
+                if len(fields) > 15:
+                    displayed_fields = ', '.join(fields[:15]) + f' (and {len(fields)-15} more fields)'
+                else:
+                    displayed_fields = ', '.join(fields)
                 
-                if results:
-                    print(f"✓ Found {len(results)} results in {coll_name}")
-                    for doc in results:
-                        doc['_collection'] = coll_name
-                        all_results.append(doc)
-                        
-            except Exception as e:
-                # Collection might not have vector index, skip it
-                continue
-        
-        if not all_results:
-            return {
-                "query": request.query,
-                "search_keywords": search_keywords,
-                "error": "No vector search results found. Make sure collections have 'vector_index' configured.",
-                "hint": "Check MongoDB Atlas vector search index configuration"
-            }
-        
-        # Sort by score and limit
-        all_results.sort(key=lambda x: x.get('score', 0), reverse=True)
-        all_results = all_results[:request.top_k]
-        
-        # Build context from results
-        context_parts = []
-        sources = []
-        
-        for doc in all_results:
-            # Extract text from various possible fields
-            text = (
-                doc.get('text') or 
-                doc.get('content') or 
-                doc.get('description') or 
-                doc.get('title') or 
-                str(doc.get('_id'))
-            )
-            
-            collection = doc.get('_collection', 'unknown')
-            score = doc.get('score', 0)
-            
-            context_parts.append(f"[Collection: {collection}, Score: {score:.3f}]\n{text}")
-            
-            sources.append({
-                "db_key": request.db_key or "primary",
-                "collection": collection,
-                "doc_id": str(doc.get('_id')),
-                "similarity": score,
-                "text_preview": str(text)[:200]
-            })
+                schema_parts.append(f"{coll_name}: {displayed_fields}")
         
-        context = "\n\n".join(context_parts)
-        
-        # Generate answer using Gemini
-        prompt = f"""Based on the following context from MongoDB, answer the user's question.
+        print(f"📚 Vectorized collections in '{db_key}': {vectorized_collections}")
+        return {"target_collections": target_collections, "schema_parts": schema_parts, "schema_fields": schema_fields}
+    except Exception as e:
+        print(f"Could not fetch schema: {e}")
+        return {"target_collections": target_collections, "schema_parts": [], "schema_fields": [], "error": "schema_unavailable"}
 
-Context:
-{context}
+QDRANT_CLUSTER_TIMEOUT = float(os.getenv("QDRANT_CLUSTER_TIMEOUT", "5"))  # seconds per cluster in fan-out
 
-Question: {request.query}
+def resolve_search_db_keys(request: QueryRequest) -> List[str]:
+    """Databases a query searches: db_keys (["*"] = all) or the single db_key"""
+    if not request.db_keys:
+        return [request.db_key or "primary"]
+    if "*" in request.db_keys:
+        return list(databases.keys())
+    unknown = [key for key in request.db_keys if key not in databases]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown database(s): {', '.join(unknown)}")
+    return list(dict.fromkeys(request.db_keys))
 
-Provide a clear, concise answer based on the context."""
-        
-        response = llm_model.generate_content(prompt)
-        quota_manager.track_llm()
-        
-        print(f"✓ Generated answer from {len(sources)} sources")
-        
-        return {
-            "query": request.query,
-            "search_keywords": search_keywords,
-            "answer": response.text,
-            "method": "mongodb_atlas_vector_search",
-            "embedding_model": "all-MiniLM-L6-v2",
-            "embedding_dimensions": 384,
-            "sources": sources,
-            "total_sources": len(sources),
-            "collections_searched": list(set([s["collection"] for s in sources])),
-            "timestamp": datetime.utcnow().isoformat()
-        }
-        
-    except Exception as e:
-        print(f"❌ Error in MongoDB vector search: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+async def search_clusters(
+    db_keys: List[str],
+    query_vector: List[float],
+    limit: int,
+    collection_filter: Optional[str] = None,
+    score_threshold: Optional[float] = None,
+    group_by_document: bool = False,
+    group_size: int = DEFAULT_GROUP_SIZE,
+    timeout: float = QDRANT_CLUSTER_TIMEOUT,
+    with_payload: Union[bool, List[str]] = True
+) -> Tuple[List[Any], Dict[str, Dict]]:
+    """Search several per-database clusters concurrently and merge hits by score
+    
+    Each cluster gets its own timeout; slow or failing clusters are reported
+    and left out instead of holding up the merged result.
+    """
+    async def search_one(db_key: str):
+        qdrant_collection = get_qdrant_collection_for_db(db_key)
+        if not qdrant_metadata_cache.exists(qdrant_collection):
+            return db_key, [], "not_vectorized"
+        try:
+            hits = await asyncio.wait_for(
+                asyncio.to_thread(
+                    search_vectors,
+                    qdrant_collection,
+                    query_vector,
+                    build_qdrant_filter(db_key=db_key, collection_filter=collection_filter),
+                    limit,
+                    score_threshold,
+                    group_by_document,
+                    group_size,
+                    with_payload
+                ),
+                timeout=timeout
+            )
+            return db_key, hits, "ok"
+        except asyncio.TimeoutError:
+            print(f"⚠️  Cluster '{qdrant_collection}' timed out after {timeout}s")
+            return db_key, [], "timeout"
+        except Exception as e:
+            print(f"❌ Cluster '{qdrant_collection}' search failed: {e}")
+            return db_key, [], f"error: {e}"
+    
+    cluster_results = await asyncio.gather(*[search_one(db_key) for db_key in db_keys])
+    
+    report = {}
+    all_hits = []
+    for db_key, hits, status in cluster_results:
+        report[db_key] = {"status": status, "hits": len(hits)}
+        all_hits.extend(hits)
+    
+    if group_by_document:
+        all_hits.sort(key=lambda h: h.score, reverse=True)
+        merged = limit_per_document(
+            all_hits,
+            lambda h: (h.payload.get("db_key"), h.payload.get("source_collection"), h.payload.get("source_doc_id")),
+            limit,
+            group_size
+        )
+    else:
+        merged = heapq.nlargest(limit, all_hits, key=lambda h: h.score)
+    return merged, report
 
-@app.post("/query/hybrid-search")
-async def hybrid_search(request: HybridSearchRequest):
-    """Advanced hybrid search with multi-database support"""
-    try:
-        query_embedding = await get_query_embedding(request.query)
-        
-        # Build filter
-        qdrant_filter = build_qdrant_filter(
-            db_key=request.db_key,
-            custom_filters=request.filters
+async def retrieve_rag_context(request: QueryRequest) -> Dict[str, Any]:
+    """Retrieval half of vector RAG: schema, keywords, embedding and Qdrant search
+    
+    Returns {"response": {...}} when there is nothing to answer from, otherwise
+    the keywords, raw search hits, formatted sources and prompt context.
+    """
+    keyword_mode = resolve_keyword_mode(request.keyword_mode)
+    search_db_keys = resolve_search_db_keys(request)
+    cross_database = len(search_db_keys) > 1
+    
+    # Get database schema information for VECTORIZED collections only
+    schemas = await asyncio.gather(*[
+        load_vectorized_schema(db_key, request.collection_name) for db_key in search_db_keys
+    ])
+    target_collections = []
+    schema_parts = []
+    schema_fields = []
+    for db_key, schema in zip(search_db_keys, schemas):
+        target_collections.extend((db_key, c) for c in schema["target_collections"])
+        schema_fields.extend(schema["schema_fields"])
+        if cross_database:
+            schema_parts.extend(f"{db_key}.{part}" for part in schema["schema_parts"])
+        else:
+            schema_parts.extend(schema["schema_parts"])
+    
+    schema_info = "\n".join(schema_parts)
+    if not schema_info:
+        if all(schema.get("error") == "schema_unavailable" for schema in schemas):
+            schema_info = "Schema unavailable"
+        else:
+            schema_info = "No vectorized collections found"
+    
+    # Step 1: Extract keywords from the query based on schema (Gemini or local MiniLM)
+    print(f"🔍 Original query: {request.query}")
+    print(f"📊 Searching across {len(target_collections)} collections: {', '.join(c for _, c in target_collections)}")
+    
+    if keyword_mode == "local":
+        print(f"⚡ Extracting search keywords locally...")
+        search_keywords = await extract_keywords_locally(request.query, schema_fields)
+    else:
+        search_keywords = await extract_llm_keywords_for_schema(
+            request.query,
+            schema_info,
+            cache_tags=set(target_collections)
         )
-        
-        # Search with filters
-        search_result = qdrant_client.search(
-            collection_name=QDRANT_COLLECTION_NAME,
-            query_vector=query_embedding,
-            query_filter=qdrant_filter,
+    
+    print(f"🎯 Extracted keywords: {search_keywords}")
+    
+    # Step 2: Create vector embedding from the keywords using MiniLM
+    print(f"🧠 Creating 384-dim vector embedding from keywords...")
+    query_embedding = await get_query_embedding(search_keywords)
+    print(f"✓ Embedding created: {len(query_embedding)} dimensions")
+    
+    unit = "documents" if request.group_by_document else "results"
+    cluster_report = None
+    if cross_database:
+        # Fan out over the per-database clusters and merge with a global top_k
+        print(f"🔎 Searching {len(search_db_keys)} clusters for top {request.top_k} {unit}...")
+        search_result, cluster_report = await search_clusters(
+            search_db_keys,
+            query_embedding,
             limit=request.top_k,
+            collection_filter=request.collection_name,
             score_threshold=request.score_threshold,
-            with_payload=True,
-            with_vectors=False
+            group_by_document=request.group_by_document,
+            group_size=request.group_size or DEFAULT_GROUP_SIZE,
+            timeout=request.cluster_timeout or QDRANT_CLUSTER_TIMEOUT,
+            with_payload=RAG_PAYLOAD_FIELDS
+        )
+        print(f"   Cluster results: {cluster_report}")
+    else:
+        # Filter and cluster both come from the one database being searched
+        db_key_for_search = search_db_keys[0]
+        qdrant_filter = build_qdrant_filter(
+            db_key=db_key_for_search,
+            collection_filter=request.collection_name
         )
         
-        results = [
-            {
-                "id": hit.id,
-                "score": hit.score,
-                "db_key": hit.payload.get("db_key"),
-                "collection": hit.payload.get("source_collection"),
-                "text": hit.payload.get("text"),
-                "metadata": hit.payload.get("metadata", {}),
-                "created_at": hit.payload.get("created_at")
-            }
-            for hit in search_result
-        ]
+        # Get the Qdrant collection for this database
+        qdrant_collection = get_qdrant_collection_for_db(db_key_for_search)
         
-        return {
+        # Check if collection exists before searching
+        if not qdrant_metadata_cache.exists(qdrant_collection):
+            return {"response": {
+                "query": request.query,
+                "error": f"No vectors found for database '{db_key_for_search}'. Vectorize collections first.",
+                "hint": "Use POST /vectorize/smart to create embeddings"
+            }}
+        
+        # Search in Qdrant (database-specific collection)
+        print(f"🔎 Searching for top {request.top_k} {unit} with score_threshold >= {request.score_threshold}...")
+        search_result = search_vectors(
+            qdrant_collection,
+            query_embedding,
+            qdrant_filter,
+            limit=request.top_k,
+            score_threshold=request.score_threshold,
+            group_by_document=request.group_by_document,
+            group_size=request.group_size or DEFAULT_GROUP_SIZE,
+            with_payload=RAG_PAYLOAD_FIELDS
+        )
+    
+    print(f"📊 Raw results from Qdrant: {len(search_result)} items")
+    if search_result:
+        print(f"   Score range: {min(h.score for h in search_result):.3f} - {max(h.score for h in search_result):.3f}")
+    
+    if not search_result:
+        response = {
             "query": request.query,
-            "filters_applied": request.filters,
-            "results": results,
-            "total_results": len(results),
-            "timestamp": datetime.utcnow().isoformat()
+            "search_keywords": search_keywords,
+            "error": "No matching results found. Try adjusting your query or lowering the similarity threshold.",
+            "hint": "The database has been vectorized but no results matched your query closely enough.",
+            "results_found": 0
+        }
+        if cluster_report is not None:
+            response["clusters"] = cluster_report
+        return {"response": response}
+    
+    # Merge, dedupe and budget the retrieved chunks into the prompt context
+    context, context_stats = pack_rag_context(
+        search_result,
+        request.context_token_budget or RAG_CONTEXT_TOKEN_BUDGET
+    )
+    print(f"📦 Context packed: {context_stats['hits']} hits -> {context_stats['blocks']} blocks, ~{context_stats['estimated_tokens']} tokens")
+    
+    sources = [
+        {
+            "db_key": hit.payload.get("db_key"),
+            "db_name": hit.payload.get("metadata", {}).get("db_name"),
+            "collection": hit.payload.get("source_collection"),
+            "doc_id": hit.payload.get("source_doc_id"),
+            "similarity": hit.score,
+            "text_preview": hit.payload.get("text", "")[:200]
         }
+        for hit in search_result
+    ]
+    if request.include_documents:
+        await attach_documents(sources, request.document_fields)
+    
+    # Log collection distribution
+    collection_counts = {}
+    for source in sources:
+        coll = source['collection']
+        collection_counts[coll] = collection_counts.get(coll, 0) + 1
+    print(f"📚 Results by collection: {collection_counts}")
+    
+    return {
+        "search_keywords": search_keywords,
+        "keyword_mode": keyword_mode,
+        "search_result": search_result,
+        "sources": sources,
+        "context": context,
+        "context_stats": context_stats,
+        "clusters": cluster_report
+    }
+
+def build_rag_answer_prompt(query: str, context: str) -> str:
+    """Build the Gemini answer prompt for vector RAG"""
+    return f"""Based on the following context from multiple databases, answer the user's question.
+
+Context:
+{context}
+
+Question: {query}
+
+Provide a clear, concise answer based only on the context provided. Mention which database/collection the information comes from when relevant."""
+
+SEMANTIC_CACHE_IGNORED_FIELDS = {"query", "user_id", "use_semantic_cache", "cluster_timeout"}
+
+def query_entities(query: str) -> List[str]:
+    """Tokens a paraphrase must repeat exactly: anything with a digit, quoted text, emails and proper nouns"""
+    entities = set()
+    for double_quoted, single_quoted in re.findall(r'"([^"]+)"|\'([^\']+)\'', query):
+        quoted = (double_quoted or single_quoted).strip()
+        if quoted:
+            entities.add(quoted.casefold())
+    for position, token in enumerate(re.findall(r"[\w.@+-]+", query)):
+        token = token.strip(".-")
+        if not token:
+            continue
+        if any(ch.isdigit() for ch in token) or "@" in token:
+            entities.add(token.casefold())
+        elif token[0].isupper() and (position > 0 or token.isupper()):
+            entities.add(token.casefold())  # Proper noun or acronym (the first word is just capitalised)
+    return sorted(entities)
+
+async def lookup_semantic_answer(request: QueryRequest) -> Tuple[Optional[Dict], Optional[Tuple]]:
+    """Check the semantic answer cache; returns (cached response, slot to store a fresh answer under)"""
+    if not request.use_semantic_cache or semantic_answer_cache.max_distance <= 0:
+        return None, None
+    db_keys = resolve_search_db_keys(request)
+    embedding = await get_query_embedding(request.query)
+    scope = semantic_answer_cache.scope_key(
+        db_keys,
+        request.collection_name,
+        request.model_dump(exclude=SEMANTIC_CACHE_IGNORED_FIELDS),
+        query_entities(request.query)
+    )
+    slot = (embedding, scope, db_keys, request.collection_name)
+    hit = semantic_answer_cache.lookup(embedding, scope)
+    if hit is None:
+        return None, slot
+    response, similarity, cached_query = hit
+    print(f"♻️  Semantic cache hit ({similarity:.3f}) for: {cached_query}")
+    return {
+        **response,
+        "query": request.query,
+        "semantic_cache": {"hit": True, "similarity": round(similarity, 4), "cached_query": cached_query}
+    }, slot
+
+def store_semantic_answer(slot: Optional[Tuple], query: str, response: Dict):
+    if slot is not None:
+        semantic_answer_cache.store(*slot, query, response)
+
+def build_rag_response(request: QueryRequest, retrieval: Dict[str, Any], answer: str, chart_data: Optional[Dict]) -> Dict:
+    """Assemble the vector RAG response body"""
+    sources = retrieval["sources"]
+    return {
+        "query": request.query,
+        "search_keywords": retrieval["search_keywords"],
+        "keyword_mode": retrieval["keyword_mode"],
+        "answer": answer,
+        "method": "hybrid_keyword_semantic",
+        "embedding_model": "all-MiniLM-L6-v2",
+        "embedding_dimensions": 384,
+        "sources": sources,
+        "total_sources": len(sources),
+        "context_stats": retrieval["context_stats"],
+        "clusters": retrieval["clusters"],
+        "databases_searched": list(set([s["db_key"] for s in sources])),
+        "collections_searched": list(set([s["collection"] for s in sources])),
+        "chart_data": chart_data,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+@app.post("/query/vector-rag")
+async def vector_rag_query(request: QueryRequest):
+    """Query using vector similarity search across databases"""
+    try:
+        chart_mode = resolve_chart_mode(request.chart_mode)
+        cached_response, semantic_slot = await lookup_semantic_answer(request)
+        if cached_response is not None:
+            return cached_response
+        
+        retrieval = await retrieve_rag_context(request)
+        if "response" in retrieval:
+            return retrieval["response"]
+        
+        search_result = retrieval["search_result"]
+        sources = retrieval["sources"]
+        context = retrieval["context"]
+        
+        # Generate answer using Gemini
+        if not quota_manager.can_llm():
+            return {
+                "query": request.query,
+                "answer": "LLM quota exceeded. Returning raw context.",
+                "context": context[:500],
+                "method": "vector_rag",
+                "sources": sources,
+                "quota_warning": True
+            }
+        
+        prompt = build_rag_answer_prompt(request.query, context)
+        
+        # Answer and chart only depend on the retrieved sources, so run them concurrently
+        print(f"📝 Generating answer and chart using Gemini...")
+        chart_task = asyncio.create_task(generate_chart_data(request.query, sources, chart_mode))
+        try:
+            answer = await generate_llm_text(
+                prompt,
+                context_ids=[str(hit.id) for hit in search_result],
+                cache_tags={(s["db_key"], s["collection"]) for s in sources}
+            )
+        except asyncio.TimeoutError:
+            chart_task.cancel()
+            raise HTTPException(status_code=504, detail=f"Answer generation timed out after {LLM_TIMEOUT}s")
+        except Exception:
+            chart_task.cancel()
+            raise
+        chart_data = await chart_task
+        
+        print(f"✓ Found {len(sources)} relevant sources")
+        
+        response = build_rag_response(request, retrieval, answer, chart_data)
+        store_semantic_answer(semantic_slot, request.query, response)
+        return response
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/vectors/stats")
-async def get_vector_stats():
-    """Get detailed statistics across all databases (each with separate Qdrant collection)"""
+async def vector_rag_with_progress(request: QueryRequest):
+    """Generator that yields vector RAG results as SSE events as soon as each stage finishes"""
+    chart_task = None
     try:
-        # Get all Qdrant collections
-        all_collections = qdrant_client.get_collections().collections
-        collection_names = [c.name for c in all_collections]
+        yield f"data: {json.dumps({'stage': 'init', 'message': 'Retrieving context...'})}\n\n"
+        
+        chart_mode = resolve_chart_mode(request.chart_mode)
+        cached_response, semantic_slot = await lookup_semantic_answer(request)
+        if cached_response is not None:
+            # Replay the cached answer through the same stages
+            yield f"data: {dumps_json({'stage': 'sources', 'search_keywords': cached_response['search_keywords'], 'keyword_mode': cached_response['keyword_mode'], 'sources': cached_response['sources'], 'total_sources': cached_response['total_sources'], 'context_stats': cached_response['context_stats'], 'clusters': cached_response['clusters']}).decode('utf-8')}\n\n"
+            yield f"data: {json.dumps({'stage': 'token', 'text': cached_response['answer']})}\n\n"
+            yield f"data: {json.dumps({'stage': 'chart', 'chart_data': cached_response['chart_data']})}\n\n"
+            yield f"data: {json.dumps({'stage': 'complete', 'status': 'success', 'answer': cached_response['answer'], 'databases_searched': cached_response['databases_searched'], 'collections_searched': cached_response['collections_searched'], 'semantic_cache': cached_response['semantic_cache'], 'timestamp': datetime.utcnow().isoformat()})}\n\n"
+            return
         
-        # Get breakdown by database and collection
-        db_breakdown = defaultdict(lambda: defaultdict(int))
-        total_vectors = 0
+        retrieval = await retrieve_rag_context(request)
+        if "response" in retrieval:
+            yield f"data: {json.dumps({'stage': 'complete', 'status': 'no_results', **retrieval['response']})}\n\n"
+            return
         
-        # Iterate through each database's Qdrant collection
-        for db_key in MONGO_DATABASES.keys():
-            qdrant_collection = get_qdrant_collection_for_db(db_key)
+        sources = retrieval["sources"]
+        yield f"data: {dumps_json({'stage': 'sources', 'search_keywords': retrieval['search_keywords'], 'keyword_mode': retrieval['keyword_mode'], 'sources': sources, 'total_sources': len(sources), 'context_stats': retrieval['context_stats'], 'clusters': retrieval['clusters']}).decode('utf-8')}\n\n"
+        
+        if not quota_manager.can_llm():
+            yield f"data: {json.dumps({'stage': 'complete', 'status': 'quota_exceeded', 'answer': 'LLM quota exceeded. Returning raw context.', 'context': retrieval['context'][:500], 'quota_warning': True})}\n\n"
+            return
+        
+        # Chart runs in the background while answer tokens stream
+        chart_task = asyncio.create_task(generate_chart_data(request.query, sources, chart_mode))
+        
+        answer_parts = []
+        async for token in stream_llm_text(
+            build_rag_answer_prompt(request.query, retrieval["context"]),
+            context_ids=[str(hit.id) for hit in retrieval["search_result"]],
+            cache_tags={(s["db_key"], s["collection"]) for s in sources}
+        ):
+            answer_parts.append(token)
+            yield f"data: {json.dumps({'stage': 'token', 'text': token})}\n\n"
+        
+        chart_data = await chart_task
+        yield f"data: {json.dumps({'stage': 'chart', 'chart_data': chart_data})}\n\n"
+        
+        response = build_rag_response(request, retrieval, ''.join(answer_parts), chart_data)
+        store_semantic_answer(semantic_slot, request.query, response)
+        yield f"data: {json.dumps({'stage': 'complete', 'status': 'success', 'answer': response['answer'], 'databases_searched': response['databases_searched'], 'collections_searched': response['collections_searched'], 'timestamp': response['timestamp']})}\n\n"
+    
+    except asyncio.TimeoutError:
+        yield f"data: {json.dumps({'error': f'Answer generation timed out after {LLM_TIMEOUT}s', 'stage': 'error'})}\n\n"
+    except HTTPException as e:
+        yield f"data: {json.dumps({'error': e.detail, 'stage': 'error'})}\n\n"
+    except Exception as e:
+        yield f"data: {json.dumps({'error': str(e), 'stage': 'error'})}\n\n"
+    finally:
+        if chart_task is not None and not chart_task.done():
+            chart_task.cancel()
+
+@app.post("/query/vector-rag/stream")
+async def vector_rag_query_stream(request: QueryRequest):
+    """Vector RAG with sources, answer tokens and chart streamed as they become available"""
+    return StreamingResponse(
+        vector_rag_with_progress(request),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+        }
+    )
+
+ATLAS_VECTOR_INDEX = "vector_index"  # Atlas vector search index name
+ATLAS_VECTOR_PATH = "embedding"      # Field containing the vector
+ATLAS_SEARCH_TIMEOUT = float(os.getenv("ATLAS_SEARCH_TIMEOUT", "5"))  # seconds per collection
+ATLAS_INDEX_CACHE_TTL = int(os.getenv("ATLAS_INDEX_CACHE_TTL", "300"))  # seconds
+ATLAS_INDEX_RETRY_TTL = int(os.getenv("ATLAS_INDEX_RETRY_TTL", "15"))  # seconds, after a transient lookup failure
+
+class AtlasVectorIndexCache:
+    """Per-database cache of collections that carry the Atlas vector index, with their schema fields"""
+    def __init__(self, ttl_seconds: int = ATLAS_INDEX_CACHE_TTL):
+        self.ttl_seconds = ttl_seconds
+        self.entries = {}  # db_key -> (expires_at, {collection_name: [fields]})
+        self.hits = 0
+        self.misses = 0
+    
+    async def _describe_collection(self, db_instance, coll_name: str) -> Tuple[Optional[List[str]], bool]:
+        """Return (sample fields if the collection has the vector index else None, lookup failed transiently)"""
+        try:
+            indexes = await db_instance[coll_name].list_search_indexes(ATLAS_VECTOR_INDEX).to_list(None)
+        except OperationFailure:
+            # Not an Atlas deployment, or search indexes unsupported for this collection
+            return None, False
+        except Exception as e:
+            print(f"⚠️  Atlas index lookup failed for {coll_name}: {e!r}")
+            return None, True
+        if not indexes:
+            return None, False
+        try:
+            sample = await db_instance[coll_name].find_one(projection={ATLAS_VECTOR_PATH: 0})
+        except Exception as e:
+            # Indexed but unreadable right now: leave it out and retry soon
+            print(f"⚠️  Atlas sample lookup failed for {coll_name}: {e!r}")
+            return None, True
+        return [f for f in (sample or {}).keys() if f != '_id'][:10], False
+    
+    async def get(self, db_key: str, db_instance) -> Dict[str, List[str]]:
+        entry = self.entries.get(db_key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+        
+        self.misses += 1
+        collection_names = await db_instance.list_collection_names()
+        described = await asyncio.gather(*[
+            self._describe_collection(db_instance, coll_name) for coll_name in collection_names
+        ])
+        indexed = {
+            coll_name: fields
+            for coll_name, (fields, _) in zip(collection_names, described)
+            if fields is not None
+        }
+        # A transient failure must not hide a collection for the full TTL
+        failed = any(failed for _, failed in described)
+        ttl = min(ATLAS_INDEX_RETRY_TTL, self.ttl_seconds) if failed else self.ttl_seconds
+        self.entries[db_key] = (time.monotonic() + ttl, indexed)
+        return indexed
+    
+    def invalidate(self, db_key: Optional[str] = None):
+        if db_key is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(db_key, None)
+    
+    def stats(self) -> Dict:
+        return {
+            "databases": len(self.entries),
+            "indexed_collections": sum(len(indexed) for _, indexed in self.entries.values()),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+atlas_vector_index_cache = AtlasVectorIndexCache()
+
+async def atlas_vector_search(db_instance, coll_name: str, query_embedding: List[float], top_k: int) -> List[Dict]:
+    """Run one $vectorSearch aggregate against a collection, bounded by ATLAS_SEARCH_TIMEOUT"""
+    pipeline = [
+        {
+            "$vectorSearch": {
+                "index": ATLAS_VECTOR_INDEX,
+                "path": ATLAS_VECTOR_PATH,
+                "queryVector": query_embedding,
+                "numCandidates": 100,
+                "limit": top_k
+            }
+        },
+        {
+            "$project": {
+                "_id": 1,
+                "score": {"$meta": "vectorSearchScore"},
+                "text": 1,
+                "content": 1,
+                "title": 1,
+                "description": 1
+            }
+        }
+    ]
+    results = await asyncio.wait_for(
+        db_instance[coll_name].aggregate(pipeline).to_list(top_k),
+        timeout=ATLAS_SEARCH_TIMEOUT
+    )
+    for doc in results:
+        doc['_collection'] = coll_name
+    return results
+
+@app.post("/query/mongodb-vector-search")
+async def mongodb_vector_search(request: QueryRequest):
+    """Search directly in MongoDB Atlas using vector search (skip Qdrant)"""
+    try:
+        keyword_mode = resolve_keyword_mode(request.keyword_mode)
+        
+        # Get database instance
+        db_key = request.db_key or "primary"
+        db_instance = databases.get(db_key)
+        if db_instance is None:
+            raise HTTPException(status_code=400, detail=f"Database '{request.db_key}' not found")
+        
+        # Only collections with an Atlas vector index are searched
+        indexed = await atlas_vector_index_cache.get(db_key, db_instance)
+        collection_names = list(indexed)
+        print(f"📚 Found {len(collection_names)} collections with '{ATLAS_VECTOR_INDEX}'")
+        if not collection_names:
+            return {
+                "query": request.query,
+                "error": f"No collections with '{ATLAS_VECTOR_INDEX}' configured in database '{db_key}'.",
+                "hint": "Check MongoDB Atlas vector search index configuration"
+            }
+        
+        schema_parts = [f"{coll_name}: {', '.join(fields)}" for coll_name, fields in indexed.items() if fields]
+        schema_fields = [field for fields in indexed.values() for field in fields]
+        schema_info = "\n".join(schema_parts) if schema_parts else "No collections found"
+        
+        # Extract keywords using Gemini or locally with MiniLM
+        print(f"🔍 Query: {request.query}")
+        if keyword_mode == "local":
+            search_keywords = await extract_keywords_locally(request.query, schema_fields)
+        else:
+            keyword_prompt = f"""Extract 3-5 key search terms from this query for semantic search.
+
+Database Collections: {', '.join(collection_names)}
+Schema: {schema_info}
+
+Query: "{request.query}"
+
+Return ONLY keywords separated by spaces:"""
             
-            if qdrant_collection not in collection_names:
+            search_keywords = await extract_search_keywords(
+                keyword_prompt,
+                request.query,
+                cache_tags={(db_key, c) for c in collection_names}
+            )
+        print(f"🎯 Keywords: {search_keywords}")
+        
+        # Create embedding for keywords
+        query_embedding = await get_query_embedding(search_keywords)
+        
+        # Search all indexed collections concurrently
+        outcomes = await asyncio.gather(*[
+            atlas_vector_search(db_instance, coll_name, query_embedding, request.top_k)
+            for coll_name in collection_names
+        ], return_exceptions=True)
+        
+        all_results = []
+        failed_collections = {}
+        for coll_name, outcome in zip(collection_names, outcomes):
+            if isinstance(outcome, Exception):
+                reason = "timeout" if isinstance(outcome, asyncio.TimeoutError) else str(outcome)
+                print(f"⚠️  Vector search failed in {coll_name}: {reason}")
+                failed_collections[coll_name] = reason
                 continue
-                
-            # Get collection info
-            collection_info = qdrant_client.get_collection(qdrant_collection)
-            total_vectors += collection_info.points_count
-            
-            # Scroll through this collection
-            offset = None
-            while True:
-                result = qdrant_client.scroll(
-                    collection_name=qdrant_collection,
-                    limit=100,
-                    offset=offset,
-                    with_payload=True,
-                    with_vectors=False
-                )
-                
-                for point in result[0]:
-                    db_key_from_payload = point.payload.get("db_key", db_key)
-                    coll_name = point.payload.get("source_collection", "unknown")
-                    db_breakdown[db_key_from_payload][coll_name] += 1
-                
-                if result[1] is None:
-                    break
-                offset = result[1]
+            if outcome:
+                print(f"✓ Found {len(outcome)} results in {coll_name}")
+            all_results.extend(outcome)
         
-        # Format breakdown
-        formatted_breakdown = []
-        for db_key, collections in db_breakdown.items():
-            for coll_name, count in collections.items():
-                formatted_breakdown.append({
-                    "db_key": db_key,
-                    "db_name": MONGO_DATABASES.get(db_key, {}).get("name", "unknown"),
-                    "collection": coll_name,
-                    "vector_count": count
-                })
+        if not all_results:
+            return {
+                "query": request.query,
+                "search_keywords": search_keywords,
+                "error": "No vector search results found. Make sure collections have 'vector_index' configured.",
+                "hint": "Check MongoDB Atlas vector search index configuration",
+                "failed_collections": failed_collections
+            }
         
-        # Get database summaries with Qdrant collection names
-        db_summaries = []
-        for db_key in MONGO_DATABASES.keys():
-            qdrant_collection = get_qdrant_collection_for_db(db_key)
-            vector_count = sum(item["vector_count"] for item in formatted_breakdown if item["db_key"] == db_key)
+        # Merge into the global top_k by score
+        all_results = heapq.nlargest(request.top_k, all_results, key=lambda x: x.get('score', 0))
+        
+        # Build context from results
+        context_parts = []
+        sources = []
+        
+        for doc in all_results:
+            # Extract text from various possible fields
+            text = (
+                doc.get('text') or 
+                doc.get('content') or 
+                doc.get('description') or 
+                doc.get('title') or 
+                str(doc.get('_id'))
+            )
             
-            db_summaries.append({
+            collection = doc.get('_collection', 'unknown')
+            score = doc.get('score', 0)
+            
+            context_parts.append(f"[Collection: {collection}, Score: {score:.3f}]\n{text}")
+            
+            sources.append({
                 "db_key": db_key,
-                "db_name": MONGO_DATABASES.get(db_key, {}).get("name", "unknown"),
-                "qdrant_collection": qdrant_collection,
-                "total_vectors": vector_count
+                "collection": collection,
+                "doc_id": str(doc.get('_id')),
+                "similarity": score,
+                "text_preview": str(text)[:200]
             })
         
-        return {
-            "total_vectors": total_vectors,
-            "vector_dimension": EMBEDDING_DIMENSION,
-            "distance_metric": "COSINE",
-            "qdrant_clusters": len([c for c in collection_names if c.startswith("synapse_")]),
-            "database_summary": db_summaries,
-            "collection_breakdown": formatted_breakdown,
-            "timestamp": datetime.utcnow().isoformat()
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        context = "\n\n".join(context_parts)
+        if request.include_documents:
+            await attach_documents(sources, request.document_fields)
+        
+        # Generate answer using Gemini
+        prompt = f"""Based on the following context from MongoDB, answer the user's question.
 
-@app.get("/qdrant/clusters")
-async def get_qdrant_clusters():
-    """Get Qdrant cluster configuration for all databases"""
-    try:
-        clusters = load_qdrant_clusters()
+Context:
+{context}
+
+Question: {request.query}
+
+Provide a clear, concise answer based on the context."""
         
-        # Enrich with real-time stats from Qdrant
-        all_collections = qdrant_client.get_collections().collections
-        collection_names = [c.name for c in all_collections]
+        try:
+            answer = await generate_llm_text(
+                prompt,
+                context_ids=[f"{s['collection']}:{s['doc_id']}" for s in sources],
+                cache_tags={(s["db_key"], s["collection"]) for s in sources}
+            )
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail=f"Answer generation timed out after {LLM_TIMEOUT}s")
         
-        for db_key, cluster_info in clusters.get("clusters", {}).items():
-            collection_name = cluster_info["collection_name"]
-            if collection_name in collection_names:
-                try:
-                    collection_info = qdrant_client.get_collection(collection_name)
+        print(f"✓ Generated answer from {len(sources)} sources")
+        
+        return {
+            "query": request.query,
+            "search_keywords": search_keywords,
+            "keyword_mode": keyword_mode,
+            "answer": answer,
+            "method": "mongodb_atlas_vector_search",
+            "embedding_model": "all-MiniLM-L6-v2",
+            "embedding_dimensions": 384,
+            "sources": sources,
+            "total_sources": len(sources),
+            "collections_searched": list(set([s["collection"] for s in sources])),
+            "indexed_collections": collection_names,
+            "failed_collections": failed_collections,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Error in MongoDB vector search: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+HYBRID_RRF_K = 60  # Reciprocal rank fusion constant
+HYBRID_CANDIDATE_MULTIPLIER = 3  # Candidates fetched per channel = top_k * multiplier
+HYBRID_MODES = ("hybrid", "vector", "lexical")
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = HYBRID_RRF_K) -> List[Tuple[str, float]]:
+    """Fuse ranked ID lists: score(id) = sum of 1 / (k + rank) over the lists it appears in"""
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, point_id in enumerate(ranking, 1):
+            fused[point_id] += 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+def payload_matches_filters(payload: Dict, filters: Optional[Dict[str, Any]]) -> bool:
+    """Apply the same metadata.<key> equality filters Qdrant uses to a payload"""
+    if not filters:
+        return True
+    metadata = payload.get("metadata", {})
+    return all(metadata.get(key) == value for key, value in filters.items())
+
+def resolve_hybrid_mode(mode: Optional[str]) -> str:
+    """Validate a hybrid search mode"""
+    mode = (mode or "hybrid").lower()
+    if mode not in HYBRID_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid mode '{mode}'. Must be one of: {', '.join(HYBRID_MODES)}"
+        )
+    return mode
+
+LEXICAL_FILTER_PAGE = 200  # Ranked BM25 hits hydrated per round when metadata filters apply
+
+def lexical_channel(
+    qdrant_collection: str,
+    query: str,
+    candidate_k: int,
+    collection_name: Optional[str] = None,
+    group_by_document: bool = False,
+    group_size: int = DEFAULT_GROUP_SIZE,
+    filters: Optional[Dict[str, Any]] = None,
+    payloads: Optional[Dict[str, Dict]] = None,
+    payload_fields: Union[bool, List[str]] = True
+) -> Dict[str, float]:
+    """BM25 candidates for a query as {point_id: score}, best first
+    
+    Blocking (index build, Qdrant retrieves): run via asyncio.to_thread. The
+    index holds no metadata, so with filters the full ranking is walked in
+    pages, hydrating payloads into payloads, until candidate_k hits pass;
+    filtering the top candidate_k afterwards could leave nothing.
+    """
+    limit = candidate_k * group_size if group_by_document else candidate_k
+    if not filters:
+        lexical_hits = lexical_index_manager.search(qdrant_collection, query, limit, collection_name)
+    else:
+        payloads = {} if payloads is None else payloads
+        ranking = lexical_index_manager.search(qdrant_collection, query, None, collection_name)
+        lexical_hits = []
+        for start in range(0, len(ranking), LEXICAL_FILTER_PAGE):
+            page = ranking[start:start + LEXICAL_FILTER_PAGE]
+            hydrate_payloads(qdrant_collection, (point_id for point_id, _ in page), payloads, payload_fields)
+            lexical_hits.extend(
+                hit for hit in page
+                if payloads.get(hit[0]) is not None and payload_matches_filters(payloads[hit[0]], filters)
+            )
+            if len(lexical_hits) >= limit:
+                break
+        lexical_hits = lexical_hits[:limit]
+    if group_by_document:
+        lexical_index = lexical_index_manager.get(qdrant_collection)
+        lexical_hits = limit_per_document(
+            lexical_hits,
+            lambda hit: (lexical_index.doc_collections.get(hit[0]), lexical_index.doc_ids.get(hit[0])),
+            candidate_k,
+            group_size
+        )
+    return dict(lexical_hits)
+
+def hydrate_payloads(
+    qdrant_collection: str,
+    point_ids: Iterable[str],
+    payloads: Dict[str, Dict],
+    fields: Union[bool, List[str]] = True
+):
+    """Fetch payloads (or just the given fields) for points not already in payloads (e.g. lexical-only hits)"""
+    missing = [point_id for point_id in dict.fromkeys(point_ids) if point_id not in payloads]
+    for i in range(0, len(missing), 100):
+        for point in qdrant_client.retrieve(
+            collection_name=qdrant_collection,
+            ids=missing[i:i + 100],
+            with_payload=fields,
+            with_vectors=False
+        ):
+            payloads[str(point.id)] = point.payload
+
+def hybrid_payload_fields(ids_only: bool, filters: Optional[Dict[str, Any]]) -> List[str]:
+    """Payload fields hybrid results need; ids_only skips text and keeps metadata only for filtering"""
+    if not ids_only:
+        return HYBRID_PAYLOAD_FIELDS
+    return POINT_ID_FIELDS + (["metadata"] if filters else [])
+
+def format_hybrid_results(
+    fused: List[Tuple[str, float]],
+    payloads: Dict[str, Dict],
+    vector_scores: Dict[str, float],
+    lexical_scores: Dict[str, float],
+    filters: Optional[Dict[str, Any]],
+    top_k: int,
+    group_by_document: bool = False,
+    group_size: int = DEFAULT_GROUP_SIZE,
+    ids_only: bool = False
+) -> List[Dict]:
+    """Turn fused rankings into result dicts, applying metadata filters and the top_k limit"""
+    results = []
+    for point_id, fused_score in fused:
+        payload = payloads.get(point_id)
+        if payload is None or not payload_matches_filters(payload, filters):
+            continue
+        result = {
+            "id": point_id,
+            "score": fused_score,
+            "vector_score": vector_scores.get(point_id),
+            "lexical_score": lexical_scores.get(point_id),
+            "db_key": payload.get("db_key"),
+            "collection": payload.get("source_collection"),
+            "doc_id": payload.get("source_doc_id")
+        }
+        if not ids_only:
+            result["text"] = payload.get("text")
+            result["metadata"] = payload.get("metadata", {})
+            result["created_at"] = payload.get("created_at")
+        results.append(result)
+    
+    if group_by_document:
+        # top_k distinct documents, each with its best group_size chunks
+        return limit_per_document(
+            results,
+            lambda r: (r["collection"], r["doc_id"]),
+            top_k,
+            group_size
+        )
+    return results[:top_k]
+
+@app.post("/query/hybrid-search")
+async def hybrid_search(request: HybridSearchRequest):
+    """Hybrid lexical (BM25) + vector search over the database's Qdrant cluster, fused with RRF"""
+    try:
+        mode = resolve_hybrid_mode(request.mode)
+        
+        db_key = request.db_key or "primary"
+        qdrant_collection = get_qdrant_collection_for_db(db_key)
+        if not qdrant_metadata_cache.exists(qdrant_collection):
+            return {
+                "query": request.query,
+                "error": f"No vectors found for database '{db_key}'. Vectorize collections first.",
+                "hint": "Use POST /vectorize/smart to create embeddings"
+            }
+        
+        candidate_k = request.top_k * HYBRID_CANDIDATE_MULTIPLIER
+        group_size = request.group_size or DEFAULT_GROUP_SIZE
+        payload_fields = hybrid_payload_fields(request.ids_only, request.filters)
+        payloads = {}
+        vector_scores = {}
+        lexical_scores = {}
+        
+        # Dense channel
+        if mode in ("hybrid", "vector"):
+            query_embedding = await get_query_embedding(request.query)
+            qdrant_filter = build_qdrant_filter(
+                db_key=db_key,
+                collection_filter=request.collection_name,
+                custom_filters=request.filters
+            )
+            search_result = search_vectors(
+                qdrant_collection,
+                query_embedding,
+                qdrant_filter,
+                limit=candidate_k if mode == "hybrid" else request.top_k,
+                score_threshold=request.score_threshold,
+                group_by_document=request.group_by_document,
+                group_size=group_size,
+                with_payload=payload_fields
+            )
+            for hit in search_result:
+                point_id = str(hit.id)
+                vector_scores[point_id] = hit.score
+                payloads[point_id] = hit.payload
+        
+        # Lexical channel
+        if mode in ("hybrid", "lexical"):
+            lexical_scores = await asyncio.to_thread(
+                lexical_channel,
+                qdrant_collection,
+                request.query,
+                candidate_k,
+                request.collection_name,
+                request.group_by_document,
+                group_size,
+                request.filters,
+                payloads,
+                payload_fields
+            )
+        
+        # Fuse rankings (dict order is rank order for both channels)
+        fused = reciprocal_rank_fusion([list(vector_scores), list(lexical_scores)])
+        
+        # Hydrate payloads for lexical-only hits, applying metadata filters
+        hydrate_payloads(qdrant_collection, (point_id for point_id, _ in fused), payloads, payload_fields)
+        results = format_hybrid_results(
+            fused,
+            payloads,
+            vector_scores,
+            lexical_scores,
+            request.filters,
+            request.top_k,
+            request.group_by_document,
+            group_size,
+            request.ids_only
+        )
+        if request.include_documents:
+            await attach_documents(results, request.document_fields)
+        
+        return {
+            "query": request.query,
+            "mode": mode,
+            "qdrant_collection": qdrant_collection,
+            "filters_applied": request.filters,
+            "results": results,
+            "total_results": len(results),
+            "total_documents": len({(r["collection"], r["doc_id"]) for r in results}),
+            "vector_candidates": len(vector_scores),
+            "lexical_candidates": len(lexical_scores),
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+BATCH_QUERY_WINDOW = 256  # Queries embedded and searched per round
+
+async def batch_search_ndjson(request: BatchSearchRequest, mode: str):
+    """Generator that yields one NDJSON line per query
+    
+    Queries are processed in windows: each window is embedded in one model
+    pass and searched with one Qdrant search_batch call per cluster. mode is
+    validated by the endpoint before the stream starts.
+    """
+    items = [BatchSearchItem(query=item) if isinstance(item, str) else item for item in request.queries]
+    window = max(1, request.window_size or BATCH_QUERY_WINDOW)
+    payload_fields = hybrid_payload_fields(request.ids_only, request.filters)
+    candidate_k = request.top_k * HYBRID_CANDIDATE_MULTIPLIER if mode == "hybrid" else request.top_k
+    
+    for window_start in range(0, len(items), window):
+        window_items = []
+        for index, item in enumerate(items[window_start:window_start + window], window_start):
+            db_key = item.db_key or request.db_key or "primary"
+            if db_key in databases:
+                window_items.append((index, item))
+                continue
+            # Never resolve a cluster for an unknown key: that would register it in qdrant_clusters.json
+            yield json.dumps({
+                "index": index,
+                "id": item.id,
+                "query": item.query,
+                "db_key": db_key,
+                "error": f"Database '{db_key}' not found"
+            }) + "\n"
+        if not window_items:
+            continue
+        
+        embeddings = {}
+        if mode in ("hybrid", "vector"):
+            vectors = await get_query_embeddings_batch([item.query for _, item in window_items])
+            embeddings = {index: vector for (index, _), vector in zip(window_items, vectors)}
+        
+        # One batch search per cluster
+        by_cluster = defaultdict(list)
+        for index, item in window_items:
+            db_key = item.db_key or request.db_key or "primary"
+            by_cluster[get_qdrant_collection_for_db(db_key)].append((index, item, db_key))
+        
+        for qdrant_collection, entries in by_cluster.items():
+            try:
+                if not qdrant_metadata_cache.exists(qdrant_collection):
+                    for index, item, db_key in entries:
+                        yield json.dumps({
+                            "index": index,
+                            "id": item.id,
+                            "query": item.query,
+                            "db_key": db_key,
+                            "error": f"No vectors found for database '{db_key}'. Vectorize collections first."
+                        }) + "\n"
+                    continue
+                
+                dense_batches = [[] for _ in entries]
+                if mode in ("hybrid", "vector"):
+                    search_requests = [
+                        SearchRequest(
+                            vector=embeddings[index],
+                            filter=build_qdrant_filter(
+                                db_key=db_key,
+                                collection_filter=item.collection_name or request.collection_name,
+                                custom_filters=request.filters
+                            ),
+                            limit=candidate_k,
+                            score_threshold=request.score_threshold,
+                            with_payload=payload_fields,
+                            with_vector=False
+                        )
+                        for index, item, db_key in entries
+                    ]
+                    dense_batches = await asyncio.to_thread(
+                        qdrant_client.search_batch,
+                        collection_name=qdrant_collection,
+                        requests=search_requests
+                    )
+                
+                payloads = {}
+                ranked = []
+                for (index, item, db_key), dense_hits in zip(entries, dense_batches):
+                    vector_scores = {}
+                    for hit in dense_hits:
+                        point_id = str(hit.id)
+                        vector_scores[point_id] = hit.score
+                        payloads[point_id] = hit.payload
+                    lexical_scores = {}
+                    if mode in ("hybrid", "lexical"):
+                        lexical_scores = await asyncio.to_thread(
+                            lexical_channel,
+                            qdrant_collection,
+                            item.query,
+                            candidate_k,
+                            item.collection_name or request.collection_name,
+                            filters=request.filters,
+                            payloads=payloads,
+                            payload_fields=payload_fields
+                        )
+                    fused = reciprocal_rank_fusion([list(vector_scores), list(lexical_scores)])
+                    ranked.append((index, item, db_key, fused, vector_scores, lexical_scores))
+                
+                # One retrieve round for every lexical-only hit in this cluster
+                hydrate_payloads(
+                    qdrant_collection,
+                    (point_id for entry in ranked for point_id, _ in entry[3]),
+                    payloads,
+                    payload_fields
+                )
+                
+                for index, item, db_key, fused, vector_scores, lexical_scores in ranked:
+                    results = format_hybrid_results(
+                        fused,
+                        payloads,
+                        vector_scores,
+                        lexical_scores,
+                        request.filters,
+                        request.top_k,
+                        ids_only=request.ids_only
+                    )
+                    yield json.dumps({
+                        "index": index,
+                        "id": item.id,
+                        "query": item.query,
+                        "db_key": db_key,
+                        "results": results,
+                        "total_results": len(results)
+                    }) + "\n"
+            except Exception as e:
+                for index, item, db_key in entries:
+                    yield json.dumps({"index": index, "id": item.id, "query": item.query, "db_key": db_key, "error": str(e)}) + "\n"
+
+@app.post("/query/batch-search")
+async def batch_search(request: BatchSearchRequest):
+    """Batch retrieval: many queries, batched embeddings and Qdrant search_batch, streamed as NDJSON"""
+    mode = resolve_hybrid_mode(request.mode)  # 400 before any NDJSON is sent
+    if (request.db_key or "primary") not in databases:
+        raise HTTPException(status_code=400, detail=f"Database '{request.db_key}' not found")
+    return StreamingResponse(
+        batch_search_ndjson(request, mode),
+        media_type="application/x-ndjson"
+    )
+
+@app.post("/vectors/points")
+async def get_vector_points(request: PointsRequest):
+    """Fetch payloads for point ids returned by an ids_only search"""
+    try:
+        db_key = request.db_key or "primary"
+        qdrant_collection = get_qdrant_collection_for_db(db_key)
+        if not qdrant_metadata_cache.exists(qdrant_collection):
+            raise HTTPException(status_code=404, detail=f"No vectors found for database '{db_key}'")
+        
+        payloads = {}
+        hydrate_payloads(qdrant_collection, request.ids, payloads, request.fields or True)
+        return {
+            "db_key": db_key,
+            "points": [
+                {"id": point_id, "payload": payloads.get(point_id)}
+                for point_id in request.ids
+            ],
+            "found": len(payloads)
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/vectors/stats")
+async def get_vector_stats():
+    """Get detailed statistics across all databases (each with separate Qdrant collection)"""
+    try:
+        # Get all Qdrant collections
+        collection_names = qdrant_metadata_cache.collection_names()
+        
+        # Get breakdown by database and collection
+        db_breakdown = defaultdict(lambda: defaultdict(int))
+        total_vectors = 0
+        
+        # Iterate through each database's Qdrant collection
+        for db_key in MONGO_DATABASES.keys():
+            qdrant_collection = get_qdrant_collection_for_db(db_key)
+            
+            if qdrant_collection not in collection_names:
+                continue
+                
+            # Get collection info
+            total_vectors += qdrant_metadata_cache.points_count(qdrant_collection)
+            
+            # Scroll through this collection
+            offset = None
+            while True:
+                result = qdrant_client.scroll(
+                    collection_name=qdrant_collection,
+                    limit=100,
+                    offset=offset,
+                    with_payload=["db_key", "source_collection"],
+                    with_vectors=False
+                )
+                
+                for point in result[0]:
+                    db_key_from_payload = point.payload.get("db_key", db_key)
+                    coll_name = point.payload.get("source_collection", "unknown")
+                    db_breakdown[db_key_from_payload][coll_name] += 1
+                
+                if result[1] is None:
+                    break
+                offset = result[1]
+        
+        # Format breakdown
+        formatted_breakdown = []
+        for db_key, collections in db_breakdown.items():
+            for coll_name, count in collections.items():
+                formatted_breakdown.append({
+                    "db_key": db_key,
+                    "db_name": MONGO_DATABASES.get(db_key, {}).get("name", "unknown"),
+                    "collection": coll_name,
+                    "vector_count": count
+                })
+        
+        # Get database summaries with Qdrant collection names
+        db_summaries = []
+        for db_key in MONGO_DATABASES.keys():
+            qdrant_collection = get_qdrant_collection_for_db(db_key)
+            vector_count = sum(item["vector_count"] for item in formatted_breakdown if item["db_key"] == db_key)
+            
+            db_summaries.append({
+                "db_key": db_key,
+                "db_name": MONGO_DATABASES.get(db_key, {}).get("name", "unknown"),
+                "qdrant_collection": qdrant_collection,
+                "total_vectors": vector_count
+            })
+        
+        return {
+            "total_vectors": total_vectors,
+            "vector_dimension": EMBEDDING_DIMENSION,
+            "distance_metric": "COSINE",
+            "qdrant_clusters": len([c for c in collection_names if c.startswith("synapse_")]),
+            "database_summary": db_summaries,
+            "collection_breakdown": formatted_breakdown,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/qdrant/clusters")
+async def get_qdrant_clusters():
+    """Get Qdrant cluster configuration for all databases"""
+    try:
+        clusters = load_qdrant_clusters()
+        
+        # Enrich with stats from Qdrant
+        collection_names = qdrant_metadata_cache.collection_names()
+        
+        for db_key, cluster_info in clusters.get("clusters", {}).items():
+            collection_name = cluster_info["collection_name"]
+            if collection_name in collection_names:
+                try:
+                    collection_info = qdrant_metadata_cache.get_info(collection_name)
                     cluster_info["vector_count"] = collection_info.points_count
                     cluster_info["status"] = collection_info.status
                     cluster_info["exists"] = True
@@ -2175,295 +4923,1667 @@ async def get_qdrant_clusters():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/quota/stats")
-async def get_quota_stats():
-    """Get quota usage statistics"""
-    return quota_manager.stats()
-
-@app.post("/quota/reset")
-async def reset_quota():
-    """Reset quota counters (admin only)"""
-    quota_manager.reset()
-    return {
-        "status": "reset",
-        "message": "Quota counters have been reset",
-        "timestamp": datetime.utcnow().isoformat()
-    }
+@app.get("/quota/stats")
+async def get_quota_stats():
+    """Get quota usage statistics"""
+    return quota_manager.stats()
+
+@app.post("/quota/reset")
+async def reset_quota():
+    """Reset quota counters (admin only)"""
+    quota_manager.reset()
+    return {
+        "status": "reset",
+        "message": "Quota counters have been reset",
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Get embedding cache statistics"""
+    stats = embedding_cache.stats()
+    stats["qdrant_metadata"] = qdrant_metadata_cache.stats()
+    stats["llm_responses"] = llm_response_cache.stats()
+    stats["lexical_indexes"] = lexical_index_manager.stats()
+    stats["documents"] = document_hydrator.stats()
+    stats["semantic_answers"] = semantic_answer_cache.stats()
+    stats["atlas_vector_indexes"] = atlas_vector_index_cache.stats()
+    stats["database_catalog"] = database_catalog.stats()
+    return stats
+
+@app.post("/cache/clear")
+async def clear_cache():
+    """Clear embedding cache"""
+    size_before = len(embedding_cache.cache)
+    embedding_cache.cache.clear()
+    embedding_cache.hits = 0
+    embedding_cache.misses = 0
+    qdrant_metadata_cache.invalidate()
+    llm_response_cache.invalidate()
+    semantic_answer_cache.invalidate()
+    document_hydrator.invalidate()
+    atlas_vector_index_cache.invalidate()
+    database_catalog.invalidate()
+    return {
+        "status": "cleared",
+        "items_cleared": size_before,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+# ============= HEALTH CHECK =============
+@app.get("/")
+async def root():
+    return {
+        "message": "Synapse DB API - Enhanced Multi-Database Edition",
+        "version": "5.0.0",
+        "features": [
+            "Multi-Database Support",
+            "Smart Vectorization with Duplicate Prevention",
+            "Automatic Vector Lifecycle Management",
+            "Vector RAG (Semantic Search)",
+            "Hybrid Search",
+            "Cross-Database Queries",
+            "Dashboard Generation",
+            "File Upload & Export"
+        ],
+        "databases_configured": len(databases)
+    }
+
+@app.get("/health")
+async def health_check():
+    try:
+        db_statuses = {}
+        
+        # Check all MongoDB databases
+        for db_key, db_instance in databases.items():
+            try:
+                await mongo_clients[db_key].admin.command('ping')
+                collections = await db_instance.list_collection_names()
+                db_statuses[db_key] = {
+                    "status": "connected",
+                    "collections": len(collections)
+                }
+            except Exception as e:
+                db_statuses[db_key] = {
+                    "status": "error",
+                    "error": str(e)
+                }
+        
+        # Check Qdrant
+        try:
+            collection_info = qdrant_client.get_collection(QDRANT_COLLECTION_NAME)
+            vector_count = collection_info.points_count
+            qdrant_status = "connected"
+        except Exception as e:
+            vector_count = 0
+            qdrant_status = f"error: {str(e)}"
+        
+        return {
+            "status": "healthy",
+            "databases": db_statuses,
+            "qdrant": qdrant_status,
+            "qdrant_url": QDRANT_URL,
+            "vector_embeddings_stored": vector_count,
+            "quota_stats": quota_manager.stats(),
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Service unavailable: {str(e)}")
+
+# ============= FILE UPLOAD (Multi-DB Support) =============
+# ============= STREAMING UPLOADS =============
+UPLOAD_BATCH_SIZE = int(os.getenv("UPLOAD_BATCH_SIZE", "1000"))  # Records per insert_many
+UPLOAD_MAX_INFLIGHT = int(os.getenv("UPLOAD_MAX_INFLIGHT", "4"))  # Concurrent insert batches
+
+class BatchInserter:
+    """Unordered insert_many batches with bounded concurrency; add() waits while the window is full
+    
+    on_inserted, if given, is awaited with the records of each batch that were
+    actually inserted (their _id set) before the batch leaves the window.
+    """
+    def __init__(self, collection, max_inflight: int = UPLOAD_MAX_INFLIGHT, on_inserted=None):
+        self.collection = collection
+        self.max_inflight = max(1, max_inflight)
+        self.on_inserted = on_inserted
+        self.pending = set()
+        self.inserted = 0
+        self.write_errors = 0
+    
+    async def _insert(self, records: List[Dict]):
+        try:
+            await self.collection.insert_many(records, ordered=False)
+        except BulkWriteError as e:
+            # Unordered: the rest of the batch still went in
+            failed = {error["index"] for error in e.details.get("writeErrors", [])}
+            self.write_errors += len(failed)
+            records = [record for i, record in enumerate(records) if i not in failed]
+        self.inserted += len(records)
+        if self.on_inserted is not None and records:
+            await self.on_inserted(records)
+    
+    def _collect(self, done):
+        for task in done:
+            error = task.exception()
+            if error is not None:
+                raise error
+    
+    async def add(self, records: List[Dict]):
+        while len(self.pending) >= self.max_inflight:
+            done, self.pending = await asyncio.wait(self.pending, return_when=asyncio.FIRST_COMPLETED)
+            self._collect(done)
+        self.pending.add(asyncio.create_task(self._insert(records)))
+    
+    async def flush(self):
+        if self.pending:
+            done, self.pending = await asyncio.wait(self.pending)
+            self._collect(done)
+    
+    def cancel(self):
+        for task in self.pending:
+            task.cancel()
+        self.pending = set()
+
+def tag_upload_record(record: Dict, filename: Optional[str], db_key: str) -> Dict:
+    record['_upload_timestamp'] = datetime.utcnow()
+    record['_source_file'] = filename
+    record['_db_key'] = db_key
+    return record
+
+INGEST_UPSERT_BATCH = 256  # Points per vector upsert during ingest
+
+class IngestVectorizer:
+    """Embed and upsert uploaded records as soon as they are inserted, keyed by their _id
+    
+    Replaces the post-upload smart_vectorize pass, which re-read the whole
+    collection from MongoDB. Only used when the collection's vectors are
+    otherwise complete (empty or up to date), so the vector state can be
+    advanced without a rescan.
+    """
+    def __init__(self, db_key: str, collection_name: str, state: Optional[Dict]):
+        self.db_key = db_key
+        self.collection_name = collection_name
+        self.qdrant_collection = get_qdrant_collection_for_db(db_key)
+        state = state or {}
+        # Chunk like the earlier vectors of this collection; else chosen by the parser / defaults
+        self.text_fields = state.get("text_fields")
+        self.chunk_size = state.get("chunk_size") or CHUNK_SIZE
+        self.overlap = state.get("chunk_overlap")
+        if self.overlap is None:
+            self.overlap = CHUNK_OVERLAP  # State written before chunk_overlap was recorded
+        self.prior_vector_count = state.get("vector_count", 0)
+        self.documents_vectorized = 0
+        self.total_chunks = 0
+        self.upsert_lock = asyncio.Lock()
+    
+    @classmethod
+    async def for_upload(cls, db_key: str, collection_name: str) -> Optional["IngestVectorizer"]:
+        """Get a vectorizer, or None if existing documents still need a full smart_vectorize"""
+        check = await vector_state_manager.needs_vectorization(db_key, collection_name)
+        if check["reason"] not in ("empty_collection", "up_to_date"):
+            return None
+        state = await vector_state_manager.get_state(db_key, collection_name)
+        if check["reason"] == "empty_collection" and state:
+            # Collection was emptied since it was last vectorized: drop the orphaned vectors
+            await clear_collection_vectors(db_key, collection_name)
+            await vector_state_manager.clear_state(db_key, collection_name)
+            state = None
+        await initialize_qdrant_collection_for_db(db_key, get_qdrant_collection_for_db(db_key))
+        return cls(db_key, collection_name, state)
+    
+    async def __call__(self, records: List[Dict]):
+        if not self.text_fields:
+            return
+        texts = []
+        owners = []
+        for record in records:
+            combined_text = " ".join([
+                str(record.get(field, ""))
+                for field in self.text_fields
+                if field in record
+            ])
+            if not combined_text.strip():
+                continue
+            for idx, chunk in enumerate(chunk_text(combined_text, self.chunk_size, self.overlap)):
+                texts.append(chunk)
+                owners.append((str(record["_id"]), idx))
+            self.documents_vectorized += 1
+        if not texts:
+            return
+        
+        embeddings = await get_embeddings_batch(texts)
+        created_at = datetime.utcnow().isoformat()
+        points = [
+            PointStruct(
+                id=str(uuid.uuid4()),
+                vector=embedding,
+                payload={
+                    "db_key": self.db_key,
+                    "source_collection": self.collection_name,
+                    "source_doc_id": doc_id,
+                    "chunk_index": idx,
+                    "chunk_overlap": self.overlap,
+                    "text": chunk,
+                    "metadata": {
+                        "text_fields": self.text_fields,
+                        "db_name": MONGO_DATABASES[self.db_key]["name"]
+                    },
+                    "created_at": created_at
+                }
+            )
+            for chunk, embedding, (doc_id, idx) in zip(texts, embeddings, owners)
+        ]
+        async with self.upsert_lock:
+            for i in range(0, len(points), INGEST_UPSERT_BATCH):
+                await asyncio.to_thread(upsert_vector_points, self.qdrant_collection, points[i:i + INGEST_UPSERT_BATCH])
+        self.total_chunks += len(points)
+    
+    async def finish(self) -> Dict:
+        """Record the new vector state once the upload is complete"""
+        invalidate_vector_caches(self.db_key, self.collection_name)
+        document_count = await databases[self.db_key][self.collection_name].count_documents({})
+        content_hash = await vector_state_manager.compute_content_hash(self.db_key, self.collection_name)
+        await vector_state_manager.set_state(
+            db_key=self.db_key,
+            collection_name=self.collection_name,
+            document_count=document_count,
+            vector_count=self.prior_vector_count + self.total_chunks,
+            text_fields=self.text_fields,
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.overlap,
+            content_hash=content_hash
+        )
+        return {
+            "status": "success",
+            "action": "ingest",
+            "db_key": self.db_key,
+            "collection": self.collection_name,
+            "text_fields": self.text_fields,
+            "documents_vectorized": self.documents_vectorized,
+            "total_chunks": self.total_chunks,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+async def ingest_csv(
+    file: UploadFile,
+    db_instance,
+    db_key: str,
+    collection_name: str,
+    vectorizer: Optional[IngestVectorizer] = None
+):
+    """Parse the spooled CSV upload in chunks and insert each as it is parsed
+    
+    Yields progress events, then a final "inserted" summary. Only one chunk
+    and UPLOAD_MAX_INFLIGHT insert batches are in memory at a time.
+    """
+    file.file.seek(0)
+    total_bytes = getattr(file, "size", None)
+    reader = pd.read_csv(file.file, chunksize=UPLOAD_BATCH_SIZE)
+    inserter = BatchInserter(db_instance[collection_name], on_inserted=vectorizer)
+    columns = []
+    text_fields = {}
+    sample = []
+    rows_parsed = 0
+    try:
+        while True:
+            chunk = await asyncio.to_thread(next, reader, None)
+            if chunk is None:
+                break
+            columns.extend(col for col in chunk.columns if col not in columns)
+            text_fields.update((col, True) for col in chunk.columns if chunk[col].dtype == 'object')
+            if vectorizer is not None and vectorizer.text_fields is None:
+                vectorizer.text_fields = list(text_fields)[:3]
+            
+            records = [tag_upload_record(record, file.filename, db_key) for record in chunk.to_dict('records')]
+            if len(sample) < 3:
+                sample.extend(records[:3 - len(sample)])
+            await inserter.add(records)
+            rows_parsed += len(records)
+            
+            yield {
+                "stage": "inserting",
+                "rows_parsed": rows_parsed,
+                "records_inserted": inserter.inserted,
+                "bytes_read": file.file.tell(),
+                "total_bytes": total_bytes
+            }
+        await inserter.flush()
+    finally:
+        inserter.cancel()
+    
+    yield {
+        "stage": "inserted",
+        "records_inserted": inserter.inserted,
+        "write_errors": inserter.write_errors,
+        "columns": columns,
+        "text_fields": list(text_fields),
+        "sample": [serialize_document(record) for record in sample]
+    }
+
+async def run_upload(ingest, file: UploadFile, db_instance, db_key: str, collection_name: str, auto_vectorize: bool):
+    """Drive an ingest generator (vectorizing records as they are inserted when possible); ends with a "complete" event"""
+    vectorizer = await IngestVectorizer.for_upload(db_key, collection_name) if auto_vectorize else None
+    summary = None
+    async for event in ingest(file, db_instance, db_key, collection_name, vectorizer):
+        if event["stage"] == "inserted":
+            summary = event
+        else:
+            if vectorizer is not None:
+                event["chunks_vectorized"] = vectorizer.total_chunks
+            yield event
+    
+    response_data = {
+        "status": "success",
+        "db_key": db_key,
+        "collection": collection_name,
+        **{k: v for k, v in summary.items() if k not in ("stage", "text_fields")}
+    }
+    
+    if vectorizer is not None:
+        if vectorizer.text_fields:
+            response_data['vectorization'] = await vectorizer.finish()
+    elif auto_vectorize and summary["text_fields"]:
+        # Collection already held unvectorized or changed documents: full pass
+        yield {"stage": "vectorizing", "records_inserted": summary["records_inserted"]}
+        vectorize_request = SmartVectorizeRequest(
+            db_key=db_key,
+            collection_name=collection_name,
+            text_fields=summary["text_fields"][:3]
+        )
+        response_data['vectorization'] = await smart_vectorize(vectorize_request)
+    
+    database_catalog.invalidate(db_key)  # New collection and/or documents
+    yield {"stage": "complete", **response_data}
+
+async def upload_result(events) -> Dict:
+    """Run an upload to completion and return its final response"""
+    result = None
+    async for event in events:
+        result = event
+    result.pop("stage")
+    return result
+
+async def detach_upload(file: UploadFile) -> UploadFile:
+    """Copy an upload to a temp file that outlives the request handler (FastAPI closes
+    form files once the endpoint returns, before a StreamingResponse body runs)"""
+    def copy():
+        spool = tempfile.TemporaryFile()
+        file.file.seek(0)
+        shutil.copyfileobj(file.file, spool)
+        spool.seek(0)
+        return spool
+    spool = await asyncio.to_thread(copy)
+    return UploadFile(file=spool, filename=file.filename, size=getattr(file, "size", None))
+
+async def upload_with_progress(events, upload: Optional[UploadFile] = None):
+    """Generator that yields upload events as SSE"""
+    try:
+        async for event in events:
+            yield f"data: {dumps_json(event).decode('utf-8')}\n\n"
+    except HTTPException as e:
+        yield f"data: {json.dumps({'error': e.detail, 'stage': 'error'})}\n\n"
+    except Exception as e:
+        yield f"data: {json.dumps({'error': str(e), 'stage': 'error'})}\n\n"
+    finally:
+        if upload is not None:
+            upload.file.close()
+
+def get_upload_db(db_key: str):
+    db_instance = databases.get(db_key)
+    if db_instance is None:
+        raise HTTPException(status_code=404, detail=f"Database '{db_key}' not found")
+    return db_instance
+
+@app.post("/upload/csv")
+async def upload_csv(
+    file: UploadFile = File(...),
+    db_key: str = "primary",
+    collection_name: str = "uploaded_data",
+    auto_vectorize: bool = False
+):
+    """Upload CSV to specific database (parsed and inserted in chunks)"""
+    try:
+        db_instance = get_upload_db(db_key)
+        return await upload_result(run_upload(
+            ingest_csv,
+            file,
+            db_instance,
+            db_key,
+            collection_name,
+            auto_vectorize
+        ))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/upload/csv/stream")
+async def upload_csv_stream(
+    file: UploadFile = File(...),
+    db_key: str = "primary",
+    collection_name: str = "uploaded_data",
+    auto_vectorize: bool = False
+):
+    """Upload CSV with progress streamed as SSE"""
+    db_instance = get_upload_db(db_key)
+    upload = await detach_upload(file)
+    return StreamingResponse(
+        upload_with_progress(run_upload(
+            ingest_csv,
+            upload,
+            db_instance,
+            db_key,
+            collection_name,
+            auto_vectorize
+        ), upload),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+        }
+    )
+
+UPLOAD_READ_BLOCK = 1024 * 1024  # Bytes read from the spooled upload per parse step
+UPLOAD_MAX_RECORD_BYTES = int(os.getenv("UPLOAD_MAX_RECORD_BYTES", str(64 * 1024 * 1024)))  # Largest single JSON record
+JSON_WHITESPACE = re.compile(r"[ \t\n\r]*")
+JSON_NUMBER_TAIL = re.compile(r"[0-9eE+.\-]*")  # Characters that could still extend a number
+
+class JSONUploadError(ValueError):
+    """Malformed or oversized JSON upload (a client error, unlike other ValueErrors)"""
+
+class IncrementalJSONParser:
+    """Parse a JSON array, a single JSON value or NDJSON / concatenated JSON fed in pieces
+    
+    feed() returns every complete top-level value (or array element) seen so far
+    and keeps only the unparsed tail, so memory is bounded by the largest record.
+    A record that does not decode yet is retried only once the data behind it has
+    doubled, so a large record is re-decoded O(log n) times rather than per block.
+    """
+    def __init__(self, max_record_chars: int = UPLOAD_MAX_RECORD_BYTES):
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.chunks = []  # Text fed since the buffer was last assembled
+        self.chunk_chars = 0
+        self.pending_chars = 0  # Size of the incomplete record at the last failed decode
+        self.mode = None  # "array" or "stream"
+        self.expect_comma = False
+        self.array_closed = False
+        self.max_record_chars = max_record_chars
+    
+    def _skip_whitespace(self):
+        self.pos = JSON_WHITESPACE.match(self.buffer, self.pos).end()
+    
+    def _assemble(self):
+        self.buffer = self.buffer[self.pos:] + "".join(self.chunks)
+        self.pos = 0
+        self.chunks = []
+        self.chunk_chars = 0
+    
+    def feed(self, text: str) -> List[Any]:
+        self.chunks.append(text)
+        self.chunk_chars += len(text)
+        available = len(self.buffer) - self.pos + self.chunk_chars
+        if self.pending_chars and available < min(2 * self.pending_chars, self.max_record_chars + 1):
+            return []
+        self._assemble()
+        return self._parse(final=False)
+    
+    def _parse(self, final: bool) -> List[Any]:
+        values = []
+        while True:
+            self._skip_whitespace()
+            if self.pos >= len(self.buffer):
+                break
+            char = self.buffer[self.pos]
+            if self.mode is None:
+                self.mode = "array" if char == "[" else "stream"
+                if char == "[":
+                    self.pos += 1
+                continue
+            if self.mode == "array":
+                if self.array_closed:
+                    raise JSONUploadError(f"Unexpected data after JSON array: {self.buffer[self.pos:self.pos + 20]!r}")
+                if char == "]":
+                    self.array_closed = True
+                    self.pos += 1
+                    continue
+                if self.expect_comma:
+                    if char != ",":
+                        raise JSONUploadError(f"Expected ',' between array elements, got {char!r}")
+                    self.expect_comma = False
+                    self.pos += 1
+                    continue
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # Incomplete value: wait for more input
+                self.pending_chars = len(self.buffer) - self.pos
+                if self.pending_chars > self.max_record_chars:
+                    raise JSONUploadError(f"JSON record exceeds {self.max_record_chars} characters or is malformed")
+                break
+            if not final and char not in '{["' and JSON_NUMBER_TAIL.fullmatch(self.buffer, end):
+                # A number (or literal) reaching the buffer end may continue in the next block
+                self.pending_chars = 0
+                break
+            values.append(value)
+            self.pos = end
+            self.pending_chars = 0
+            self.expect_comma = self.mode == "array"
+        return values
+    
+    def close(self) -> List[Any]:
+        """Parse what is left and check that the input ended cleanly"""
+        self._assemble()
+        values = self._parse(final=True)
+        self._skip_whitespace()
+        if self.pos < len(self.buffer):
+            # Surface the decoder's error for the trailing fragment
+            self.decoder.raw_decode(self.buffer, self.pos)
+        if self.mode == "array" and not self.array_closed:
+            raise JSONUploadError("Unterminated JSON array")
+        return values
+
+async def ingest_json(
+    file: UploadFile,
+    db_instance,
+    db_key: str,
+    collection_name: str,
+    vectorizer: Optional[IngestVectorizer] = None
+):
+    """Incrementally parse a JSON array, JSON object or NDJSON upload and insert in batches
+    
+    Reading pauses while UPLOAD_MAX_INFLIGHT insert batches are outstanding.
+    """
+    file.file.seek(0)
+    total_bytes = getattr(file, "size", None)
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    parser = IncrementalJSONParser()
+    inserter = BatchInserter(db_instance[collection_name], on_inserted=vectorizer)
+    
+    def read_and_parse() -> Tuple[List[Any], bool]:
+        """Next parsed values and whether the input is exhausted"""
+        block = file.file.read(UPLOAD_READ_BLOCK)
+        if not block:
+            return parser.feed(utf8.decode(b"", final=True)) + parser.close(), True
+        return parser.feed(utf8.decode(block)), False
+    
+    batch = []
+    sample = []
+    text_fields = []
+    records_parsed = 0
+    skipped = 0
+    try:
+        while True:
+            values, exhausted = await asyncio.to_thread(read_and_parse)
+            for value in values:
+                if not isinstance(value, dict):
+                    skipped += 1
+                    continue
+                record = tag_upload_record(value, file.filename, db_key)
+                if not sample:
+                    text_fields = [k for k, v in value.items() if isinstance(v, str) and not k.startswith('_')]
+                    if vectorizer is not None and vectorizer.text_fields is None:
+                        vectorizer.text_fields = text_fields[:3]
+                if len(sample) < 3:
+                    sample.append(record)
+                batch.append(record)
+                records_parsed += 1
+                if len(batch) >= UPLOAD_BATCH_SIZE:
+                    await inserter.add(batch)
+                    batch = []
+            
+            yield {
+                "stage": "inserting",
+                "records_parsed": records_parsed,
+                "records_inserted": inserter.inserted,
+                "bytes_read": file.file.tell(),
+                "total_bytes": total_bytes
+            }
+            if exhausted:
+                break
+        if batch:
+            await inserter.add(batch)
+        await inserter.flush()
+    finally:
+        inserter.cancel()
+    
+    yield {
+        "stage": "inserted",
+        "format": "json_array" if parser.mode == "array" else "ndjson",
+        "records_inserted": inserter.inserted,
+        "write_errors": inserter.write_errors,
+        "skipped_non_objects": skipped,
+        "text_fields": text_fields,
+        "sample": [serialize_document(record) for record in sample]
+    }
+
+@app.post("/upload/json")
+async def upload_json(
+    file: UploadFile = File(...),
+    db_key: str = "primary",
+    collection_name: str = "uploaded_data",
+    auto_vectorize: bool = False
+):
+    """Upload a JSON array, JSON object or NDJSON file to specific database (parsed incrementally)"""
+    try:
+        db_instance = get_upload_db(db_key)
+        return await upload_result(run_upload(
+            ingest_json,
+            file,
+            db_instance,
+            db_key,
+            collection_name,
+            auto_vectorize
+        ))
+    except HTTPException:
+        raise
+    except (JSONUploadError, json.JSONDecodeError, UnicodeDecodeError) as e:
+        # Only parse errors are the client's fault; other ValueErrors fall through to 500
+        raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/upload/json/stream")
+async def upload_json_stream(
+    file: UploadFile = File(...),
+    db_key: str = "primary",
+    collection_name: str = "uploaded_data",
+    auto_vectorize: bool = False
+):
+    """Upload JSON/NDJSON with progress streamed as SSE"""
+    db_instance = get_upload_db(db_key)
+    upload = await detach_upload(file)
+    return StreamingResponse(
+        upload_with_progress(run_upload(
+            ingest_json,
+            upload,
+            db_instance,
+            db_key,
+            collection_name,
+            auto_vectorize
+        ), upload),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+        }
+    )
+
+# ============= EXPORT ENDPOINTS =============
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))  # Documents per cursor batch
+COLUMNAR_OVERFLOW_COLUMN = "_overflow"  # JSON object of values that do not fit the streamed columns (CSV, Parquet, Arrow)
+
+async def open_export_cursor(
+    db_key: str,
+    collection_name: str,
+    filter: Optional[str],
+    fields: Optional[str],
+    limit: Optional[int],
+    batch_size: int
+) -> Tuple[Any, List[Dict], Optional[List[str]]]:
+    """Open a filtered, projected cursor and read its first batch (404 if empty)"""
+    db_instance = databases.get(db_key)
+    if db_instance is None:
+        raise HTTPException(status_code=404, detail=f"Database '{db_key}' not found")
+    if batch_size <= 0:
+        raise HTTPException(status_code=400, detail="batch_size must be a positive integer")
+    try:
+        query = json_util.loads(filter) if filter else {}  # Extended JSON, e.g. {"_id": {"$oid": "..."}}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid filter: {e}")
+    if not isinstance(query, dict):
+        raise HTTPException(status_code=400, detail="Filter must be a JSON object")
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    projection = {field: 1 for field in field_list} if field_list else None
+    
+    cursor = db_instance[collection_name].find(query, projection).batch_size(batch_size)
+    if limit:
+        cursor = cursor.limit(limit)
+    first_batch = await cursor.to_list(batch_size)
+    if not first_batch:
+        raise HTTPException(status_code=404, detail="No data to export")
+    return cursor, first_batch, field_list
+
+async def stream_export(
+    cursor,
+    first_batch: List[Dict],
+    batch_size: int,
+    encode_batch,
+    header: str = "",
+    footer: str = "",
+    compress: bool = False
+):
+    """Encode cursor batches as they arrive, optionally gzip-compressing on the fly"""
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31: gzip container
+    
+    def output(text: str) -> bytes:
+        data = text.encode("utf-8")
+        return compressor.compress(data) if compressor else data
+    
+    chunks = [output(header)] if header else []
+    batch = first_batch
+    first = True
+    while batch:
+        chunks.append(output(encode_batch(batch, first)))
+        first = False
+        for chunk in chunks:
+            if chunk:
+                yield chunk
+        chunks = []
+        batch = await cursor.to_list(batch_size)
+    if footer:
+        yield output(footer)
+    if compressor:
+        yield compressor.flush()
+
+def export_response(body, db_key: str, collection_name: str, extension: str, media_type: str, compress: bool):
+    filename = f"{db_key}_{collection_name}.{extension}"
+    if compress:
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}"
+        }
+    )
+
+def csv_cell(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return dumps_json(value).decode("utf-8")
+    if value is None or isinstance(value, (str, int)):
+        return "" if value is None else value
+    try:
+        value = json_default(value)  # ObjectId, datetime, Decimal128, NaN -> text or None
+    except (TypeError, ValueError):
+        value = str(value)
+    if isinstance(value, (dict, list)):
+        return dumps_json(value).decode("utf-8")
+    return "" if value is None else value
+
+@app.get("/export/csv/{db_key}/{collection_name}")
+async def export_to_csv(
+    db_key: str,
+    collection_name: str,
+    limit: Optional[int] = None,
+    filter: Optional[str] = None,
+    fields: Optional[str] = None,
+    gzip: bool = False,
+    batch_size: int = EXPORT_BATCH_SIZE
+):
+    """Export collection to CSV, streamed from the cursor
+    
+    filter is a JSON (Extended JSON) query, fields a comma-separated projection.
+    Columns are the projected fields, or the keys seen in the first batch plus
+    a trailing COLUMNAR_OVERFLOW_COLUMN holding, as a JSON object, any keys
+    that only appear in later batches.
+    """
+    try:
+        cursor, first_batch, field_list = await open_export_cursor(db_key, collection_name, filter, fields, limit, batch_size)
+        
+        if field_list:
+            columns = field_list if "_id" in field_list else ["_id"] + field_list
+            header = columns
+        else:
+            columns = list(dict.fromkeys(key for doc in first_batch for key in doc))
+            header = columns + [COLUMNAR_OVERFLOW_COLUMN]
+        known = set(columns)
+        
+        def encode_batch(batch: List[Dict], first: bool) -> str:
+            output = io.StringIO()
+            writer = csv.writer(output)
+            if first:
+                writer.writerow(header)
+            for doc in batch:
+                row = [csv_cell(doc.get(column)) for column in columns]
+                if not field_list:
+                    overflow = {key: value for key, value in doc.items() if key not in known}
+                    row.append(dumps_json(overflow).decode("utf-8") if overflow else "")
+                writer.writerow(row)
+            return output.getvalue()
+        
+        return export_response(
+            stream_export(cursor, first_batch, batch_size, encode_batch, compress=gzip),
+            db_key, collection_name, "csv", "text/csv", gzip
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/export/json/{db_key}/{collection_name}")
+async def export_to_json(
+    db_key: str,
+    collection_name: str,
+    limit: Optional[int] = None,
+    filter: Optional[str] = None,
+    fields: Optional[str] = None,
+    gzip: bool = False,
+    batch_size: int = EXPORT_BATCH_SIZE
+):
+    """Export collection to a JSON array, streamed from the cursor"""
+    try:
+        cursor, first_batch, _ = await open_export_cursor(db_key, collection_name, filter, fields, limit, batch_size)
+        
+        def encode_batch(batch: List[Dict], first: bool) -> str:
+            return ("" if first else ",\n") + ",\n".join(
+                dumps_json(doc).decode("utf-8") for doc in batch
+            )
+        
+        return export_response(
+            stream_export(cursor, first_batch, batch_size, encode_batch, header="[\n", footer="\n]\n", compress=gzip),
+            db_key, collection_name, "json", "application/json", gzip
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/export/ndjson/{db_key}/{collection_name}")
+async def export_to_ndjson(
+    db_key: str,
+    collection_name: str,
+    limit: Optional[int] = None,
+    filter: Optional[str] = None,
+    fields: Optional[str] = None,
+    gzip: bool = False,
+    batch_size: int = EXPORT_BATCH_SIZE
+):
+    """Export collection as newline-delimited JSON, streamed from the cursor"""
+    try:
+        cursor, first_batch, _ = await open_export_cursor(db_key, collection_name, filter, fields, limit, batch_size)
+        
+        def encode_batch(batch: List[Dict], first: bool) -> str:
+            return "".join(dumps_json(doc).decode("utf-8") + "\n" for doc in batch)
+        
+        return export_response(
+            stream_export(cursor, first_batch, batch_size, encode_batch, compress=gzip),
+            db_key, collection_name, "ndjson", "application/x-ndjson", gzip
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ============= COLUMNAR EXPORT / IMPORT (PARQUET, ARROW) =============
+PARQUET_ROW_GROUP_SIZE = int(os.getenv("PARQUET_ROW_GROUP_SIZE", "50000"))  # Rows buffered per row group / record batch
+
+def require_pyarrow():
+    if pa is None:
+        raise HTTPException(status_code=501, detail="Parquet/Arrow support requires pyarrow (pip install pyarrow)")
+
+def arrow_value(value: Any) -> Any:
+    """Flatten a BSON value into something Arrow can type: nested values become JSON text"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal128):
+        return str(value.to_decimal())
+    if isinstance(value, (dict, list)):
+        return dumps_json(value).decode("utf-8")
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def infer_arrow_schema(rows: List[Dict]):
+    """Infer one Arrow type per column from sample rows; mixed columns fall back to string
+    
+    The schema always ends with COLUMNAR_OVERFLOW_COLUMN (see rows_to_arrow).
+    """
+    column_types = OrderedDict()
+    for row in rows:
+        for key, value in row.items():
+            types = column_types.setdefault(key, set())
+            if value is not None:
+                types.add(type(value))
+    column_types.pop(COLUMNAR_OVERFLOW_COLUMN, None)
+    
+    fields = []
+    for key, types in column_types.items():
+        if types and types <= {bool}:
+            arrow_type = pa.bool_()
+        elif types and types <= {int}:
+            arrow_type = pa.int64()
+        elif types and types <= {int, float}:
+            arrow_type = pa.float64()
+        elif types and types <= {datetime}:
+            arrow_type = pa.timestamp("ms")
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(key, arrow_type))
+    fields.append(pa.field(COLUMNAR_OVERFLOW_COLUMN, pa.string()))
+    return pa.schema(fields)
+
+def arrow_fits(arrow_type, value: Any) -> bool:
+    """Whether a value can be stored in a column of arrow_type without loss"""
+    if pa.types.is_string(arrow_type):
+        return True  # Stored as text
+    if isinstance(value, bool):
+        return pa.types.is_boolean(arrow_type)
+    if pa.types.is_integer(arrow_type):
+        return isinstance(value, int)
+    if pa.types.is_floating(arrow_type):
+        return isinstance(value, (int, float))
+    if pa.types.is_timestamp(arrow_type):
+        return isinstance(value, datetime)
+    return False
+
+def rows_to_arrow(rows: List[Dict], schema) -> Tuple[Any, int]:
+    """Build a table in the given (already streamed) schema
+    
+    Values that do not fit their column's type, and columns the schema does not
+    have, are kept as JSON in COLUMNAR_OVERFLOW_COLUMN rather than dropped.
+    Returns (table, number of overflowed values).
+    """
+    fields = [field for field in schema if field.name != COLUMNAR_OVERFLOW_COLUMN]
+    columns = {field.name: [] for field in schema}
+    overflowed = 0
+    for row in rows:
+        overflow = {}
+        for field in fields:
+            value = row.get(field.name)
+            if value is not None and not arrow_fits(field.type, value):
+                overflow[field.name] = value
+                value = None
+            elif value is not None and pa.types.is_string(field.type) and not isinstance(value, str):
+                value = value.isoformat() if isinstance(value, datetime) else str(value)
+            columns[field.name].append(value)
+        for key, value in row.items():
+            if key not in columns and value is not None:
+                overflow[key] = value
+        overflowed += len(overflow)
+        columns[COLUMNAR_OVERFLOW_COLUMN].append(dumps_json(overflow).decode("utf-8") if overflow else None)
+    return pa.Table.from_pydict(columns, schema=schema), overflowed
+
+class DrainableSink(io.RawIOBase):
+    """Write-only file that buffers output until drained, for streaming Arrow writers over HTTP"""
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+    
+    def tell(self) -> int:
+        return self.position
+    
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+async def stream_columnar_export(cursor, first_batch: List[Dict], batch_size: int, columnar_format: str):
+    """Buffer cursor batches into row groups and stream them as Parquet or an Arrow IPC stream
+    
+    The schema is inferred from the first row group. Later values that do not fit
+    it (type changes, new columns) go to the overflow column instead of being lost.
+    """
+    sink = DrainableSink()
+    writer = None
+    schema = None
+    rows = []
+    batch = first_batch
+    overflowed = 0
+    
+    def write_rows(rows: List[Dict]):
+        nonlocal writer, schema, overflowed
+        if schema is None:
+            schema = infer_arrow_schema(rows)
+            if columnar_format == "parquet":
+                writer = pq.ParquetWriter(sink, schema, compression="snappy")
+            else:
+                writer = pa_ipc.new_stream(sink, schema)
+        table, count = rows_to_arrow(rows, schema)
+        overflowed += count
+        if columnar_format == "parquet":
+            writer.write_table(table, row_group_size=len(rows))
+        else:
+            writer.write_table(table)
+        return sink.drain()
+    
+    while batch:
+        rows.extend({key: arrow_value(value) for key, value in doc.items()} for doc in batch)
+        if len(rows) >= PARQUET_ROW_GROUP_SIZE:
+            yield await asyncio.to_thread(write_rows, rows)
+            rows = []
+        batch = await cursor.to_list(batch_size)
+    if rows:
+        yield await asyncio.to_thread(write_rows, rows)
+    if writer is not None:
+        writer.close()
+        yield sink.drain()
+    if overflowed:
+        print(f"⚠️  Columnar export: {overflowed} value(s) did not fit the inferred schema; kept in '{COLUMNAR_OVERFLOW_COLUMN}'")
+
+async def columnar_export(
+    db_key: str,
+    collection_name: str,
+    columnar_format: str,
+    limit: Optional[int],
+    filter: Optional[str],
+    fields: Optional[str],
+    batch_size: int
+):
+    require_pyarrow()
+    cursor, first_batch, _ = await open_export_cursor(db_key, collection_name, filter, fields, limit, batch_size)
+    extension, media_type = {
+        "parquet": ("parquet", "application/vnd.apache.parquet"),
+        "arrow": ("arrows", "application/vnd.apache.arrow.stream"),
+    }[columnar_format]
+    return export_response(
+        stream_columnar_export(cursor, first_batch, batch_size, columnar_format),
+        db_key, collection_name, extension, media_type, False
+    )
+
+@app.get("/export/parquet/{db_key}/{collection_name}")
+async def export_to_parquet(
+    db_key: str,
+    collection_name: str,
+    limit: Optional[int] = None,
+    filter: Optional[str] = None,
+    fields: Optional[str] = None,
+    batch_size: int = EXPORT_BATCH_SIZE
+):
+    """Export collection to Parquet (snappy), one row group per PARQUET_ROW_GROUP_SIZE rows"""
+    try:
+        return await columnar_export(db_key, collection_name, "parquet", limit, filter, fields, batch_size)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/export/arrow/{db_key}/{collection_name}")
+async def export_to_arrow(
+    db_key: str,
+    collection_name: str,
+    limit: Optional[int] = None,
+    filter: Optional[str] = None,
+    fields: Optional[str] = None,
+    batch_size: int = EXPORT_BATCH_SIZE
+):
+    """Export collection as an Arrow IPC stream"""
+    try:
+        return await columnar_export(db_key, collection_name, "arrow", limit, filter, fields, batch_size)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/cache/stats")
-async def get_cache_stats():
-    """Get embedding cache statistics"""
-    return embedding_cache.stats()
+def bson_value(key: str, value: Any) -> Any:
+    """Convert a value read from Arrow back into something BSON can store"""
+    if key == "_id" and isinstance(value, str) and len(value) == 24 and ObjectId.is_valid(value):
+        return ObjectId(value)
+    if isinstance(value, decimal.Decimal):
+        return Decimal128(value)
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if isinstance(value, dict):
+        return {k: bson_value(k, v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [bson_value("", v) for v in value]
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, (dt_time, timedelta)):
+        return str(value)
+    return value
 
-@app.post("/cache/clear")
-async def clear_cache():
-    """Clear embedding cache"""
-    size_before = len(embedding_cache.cache)
-    embedding_cache.cache.clear()
-    embedding_cache.hits = 0
-    embedding_cache.misses = 0
-    return {
-        "status": "cleared",
-        "items_cleared": size_before,
-        "timestamp": datetime.utcnow().isoformat()
-    }
+def columnar_record(row: Dict) -> Dict:
+    """Document for one Arrow row, with values from our export's overflow column merged back"""
+    overflow = row.pop(COLUMNAR_OVERFLOW_COLUMN, None)
+    overflow = json.loads(overflow) if overflow else {}
+    record = {key: bson_value(key, value) for key, value in row.items() if key not in overflow}
+    record.update({key: bson_value(key, value) for key, value in overflow.items()})
+    return record
 
-# ============= HEALTH CHECK =============
-@app.get("/")
-async def root():
-    return {
-        "message": "Synapse DB API - Enhanced Multi-Database Edition",
-        "version": "5.0.0",
-        "features": [
-            "Multi-Database Support",
-            "Smart Vectorization with Duplicate Prevention",
-            "Automatic Vector Lifecycle Management",
-            "Vector RAG (Semantic Search)",
-            "Hybrid Search",
-            "Cross-Database Queries",
-            "Dashboard Generation",
-            "File Upload & Export"
-        ],
-        "databases_configured": len(databases)
-    }
+def open_columnar_batches(file_obj, batch_size: int):
+    """Detect Parquet / Arrow IPC file / Arrow IPC stream and return (format, schema, batch iterator)"""
+    magic = file_obj.read(6)
+    file_obj.seek(0)
+    if magic[:4] == b"PAR1":
+        parquet_file = pq.ParquetFile(file_obj)
+        return "parquet", parquet_file.schema_arrow, parquet_file.iter_batches(batch_size=batch_size)
+    if magic == b"ARROW1":
+        reader = pa_ipc.open_file(file_obj)
+        return "arrow_file", reader.schema, (reader.get_batch(i) for i in range(reader.num_record_batches))
+    reader = pa_ipc.open_stream(file_obj)
+    return "arrow_stream", reader.schema, iter(reader)
 
-@app.get("/health")
-async def health_check():
+async def ingest_columnar(
+    file: UploadFile,
+    db_instance,
+    db_key: str,
+    collection_name: str,
+    vectorizer: Optional[IngestVectorizer] = None
+):
+    """Read a Parquet or Arrow upload record batch by record batch and insert as it goes"""
+    require_pyarrow()
+    file.file.seek(0)
+    total_bytes = getattr(file, "size", None)
+    columnar_format, schema, batches = await asyncio.to_thread(open_columnar_batches, file.file, UPLOAD_BATCH_SIZE)
+    text_fields = [
+        field.name for field in schema
+        if (pa.types.is_string(field.type) or pa.types.is_large_string(field.type)) and not field.name.startswith('_')
+    ]
+    if vectorizer is not None and vectorizer.text_fields is None:
+        vectorizer.text_fields = text_fields[:3]
+    
+    inserter = BatchInserter(db_instance[collection_name], on_inserted=vectorizer)
+    sample = []
+    rows_read = 0
     try:
-        db_statuses = {}
-        
-        # Check all MongoDB databases
-        for db_key, db_instance in databases.items():
-            try:
-                await mongo_clients[db_key].admin.command('ping')
-                collections = await db_instance.list_collection_names()
-                db_statuses[db_key] = {
-                    "status": "connected",
-                    "collections": len(collections)
-                }
-            except Exception as e:
-                db_statuses[db_key] = {
-                    "status": "error",
-                    "error": str(e)
-                }
-        
-        # Check Qdrant
-        try:
-            collection_info = qdrant_client.get_collection(QDRANT_COLLECTION_NAME)
-            vector_count = collection_info.points_count
-            qdrant_status = "connected"
-        except Exception as e:
-            vector_count = 0
-            qdrant_status = f"error: {str(e)}"
-        
-        return {
-            "status": "healthy",
-            "databases": db_statuses,
-            "qdrant": qdrant_status,
-            "qdrant_url": QDRANT_URL,
-            "vector_embeddings_stored": vector_count,
-            "quota_stats": quota_manager.stats(),
-            "timestamp": datetime.utcnow().isoformat()
-        }
-    except Exception as e:
-        raise HTTPException(status_code=503, detail=f"Service unavailable: {str(e)}")
+        while True:
+            record_batch = await asyncio.to_thread(next, batches, None)
+            if record_batch is None:
+                break
+            records = [
+                tag_upload_record(columnar_record(row), file.filename, db_key)
+                for row in record_batch.to_pylist()
+            ]
+            if len(sample) < 3:
+                sample.extend(records[:3 - len(sample)])
+            await inserter.add(records)
+            rows_read += len(records)
+            
+            yield {
+                "stage": "inserting",
+                "rows_parsed": rows_read,
+                "records_inserted": inserter.inserted,
+                "total_bytes": total_bytes
+            }
+        await inserter.flush()
+    finally:
+        inserter.cancel()
+    
+    yield {
+        "stage": "inserted",
+        "format": columnar_format,
+        "records_inserted": inserter.inserted,
+        "write_errors": inserter.write_errors,
+        "columns": schema.names,
+        "text_fields": text_fields,
+        "sample": [serialize_document(record) for record in sample]
+    }
 
-# ============= FILE UPLOAD (Multi-DB Support) =============
-@app.post("/upload/csv")
-async def upload_csv(
+@app.post("/upload/parquet")
+async def upload_parquet(
     file: UploadFile = File(...),
     db_key: str = "primary",
     collection_name: str = "uploaded_data",
     auto_vectorize: bool = False
 ):
-    """Upload CSV to specific database"""
+    """Upload a Parquet file or Arrow IPC file/stream to specific database"""
     try:
-        db_instance = databases.get(db_key)
-        if db_instance is None:
-            raise HTTPException(status_code=404, detail=f"Database '{db_key}' not found")
-        
-        contents = await file.read()
-        df = pd.read_csv(io.BytesIO(contents))
-        
-        records = df.to_dict('records')
-        
-        for record in records:
-            record['_upload_timestamp'] = datetime.utcnow()
-            record['_source_file'] = file.filename
-            record['_db_key'] = db_key
-        
-        collection = db_instance[collection_name]
-        result = await collection.insert_many(records)
-        
-        response_data = {
-            "status": "success",
-            "db_key": db_key,
-            "collection": collection_name,
-            "records_inserted": len(result.inserted_ids),
-            "columns": list(df.columns),
-            "sample": records[:3]
-        }
-        
-        if auto_vectorize:
-            text_columns = [col for col in df.columns if df[col].dtype == 'object']
-            if text_columns:
-                vectorize_request = SmartVectorizeRequest(
-                    db_key=db_key,
-                    collection_name=collection_name,
-                    text_fields=text_columns[:3]
-                )
-                vectorize_result = await smart_vectorize(vectorize_request)
-                response_data['vectorization'] = vectorize_result
-        
-        return response_data
+        require_pyarrow()
+        db_instance = get_upload_db(db_key)
+        return await upload_result(run_upload(
+            ingest_columnar,
+            file,
+            db_instance,
+            db_key,
+            collection_name,
+            auto_vectorize
+        ))
+    except HTTPException:
+        raise
+    except ValueError as e:  # pa.ArrowInvalid: not a readable Parquet/Arrow file
+        raise HTTPException(status_code=400, detail=f"Invalid Parquet/Arrow file: {e}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/upload/json")
-async def upload_json(
+@app.post("/upload/parquet/stream")
+async def upload_parquet_stream(
     file: UploadFile = File(...),
     db_key: str = "primary",
     collection_name: str = "uploaded_data",
     auto_vectorize: bool = False
 ):
-    """Upload JSON to specific database"""
+    """Upload Parquet/Arrow with progress streamed as SSE"""
+    require_pyarrow()
+    db_instance = get_upload_db(db_key)
+    upload = await detach_upload(file)
     try:
-        db_instance = databases.get(db_key)
-        if db_instance is None:
-            raise HTTPException(status_code=404, detail=f"Database '{db_key}' not found")
-        
-        contents = await file.read()
-        data = json.loads(contents)
-        
-        if isinstance(data, dict):
-            data = [data]
-        
-        for record in data:
-            record['_upload_timestamp'] = datetime.utcnow()
-            record['_source_file'] = file.filename
-            record['_db_key'] = db_key
-        
-        collection = db_instance[collection_name]
-        result = await collection.insert_many(data)
-        
-        response_data = {
-            "status": "success",
-            "db_key": db_key,
-            "collection": collection_name,
-            "records_inserted": len(result.inserted_ids),
-            "sample": data[:3]
+        await asyncio.to_thread(open_columnar_batches, upload.file, UPLOAD_BATCH_SIZE)  # Reject unreadable files up front
+    except ValueError as e:
+        upload.file.close()
+        raise HTTPException(status_code=400, detail=f"Invalid Parquet/Arrow file: {e}")
+    return StreamingResponse(
+        upload_with_progress(run_upload(
+            ingest_columnar,
+            upload,
+            db_instance,
+            db_key,
+            collection_name,
+            auto_vectorize
+        ), upload),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
         }
-        
-        if auto_vectorize and data:
-            text_fields = [k for k, v in data[0].items() if isinstance(v, str)]
-            if text_fields:
-                vectorize_request = SmartVectorizeRequest(
-                    db_key=db_key,
-                    collection_name=collection_name,
-                    text_fields=text_fields[:3]
+    )
+
+# ============= VECTOR DUMP / RESTORE =============
+VECTOR_DUMP_DIR = os.getenv("VECTOR_DUMP_DIR", "vector_dumps")
+VECTOR_DUMP_BATCH = 1000  # Points per scroll page / restore batch
+VECTOR_RESTORE_PARALLELISM = int(os.getenv("VECTOR_RESTORE_PARALLELISM", "4"))  # Concurrent upserts
+VECTOR_DUMP_COLUMNS = ["id", "db_key", "source_collection", "source_doc_id", "chunk_index", "text", "created_at", "metadata", "extra"]
+
+def vector_dump_path(dump_name: str) -> str:
+    if not re.fullmatch(r"[\w.-]+", dump_name or ""):
+        raise HTTPException(status_code=400, detail=f"Invalid dump name '{dump_name}'")
+    return os.path.join(VECTOR_DUMP_DIR, dump_name)
+
+def payload_row(point_id, payload: Dict) -> Dict:
+    """Flatten a point payload into the dump's payload columns"""
+    extra = {k: v for k, v in payload.items() if k not in VECTOR_DUMP_COLUMNS}
+    return {
+        "id": str(point_id),
+        "db_key": payload.get("db_key"),
+        "source_collection": payload.get("source_collection"),
+        "source_doc_id": payload.get("source_doc_id"),
+        "chunk_index": payload.get("chunk_index"),
+        "text": payload.get("text"),
+        "created_at": payload.get("created_at"),
+        "metadata": json.dumps(payload["metadata"], default=str) if "metadata" in payload else None,
+        "extra": json.dumps(extra, default=str) if extra else None
+    }
+
+def payload_from_row(row: Dict) -> Dict:
+    payload = {
+        key: row[key]
+        for key in ("db_key", "source_collection", "source_doc_id", "chunk_index", "text", "created_at")
+        if row.get(key) is not None
+    }
+    if row.get("metadata"):
+        payload["metadata"] = json.loads(row["metadata"])
+    if row.get("extra"):
+        payload.update(json.loads(row["extra"]))
+    return payload
+
+class PayloadFileWriter:
+    """Columnar payload file: Parquet when pyarrow is installed, NDJSON otherwise"""
+    def __init__(self, directory: str):
+        if pa is not None:
+            self.filename = "payloads.parquet"
+            self.schema = pa.schema([
+                pa.field(name, pa.int64() if name == "chunk_index" else pa.string())
+                for name in VECTOR_DUMP_COLUMNS
+            ])
+            self.writer = pq.ParquetWriter(os.path.join(directory, self.filename), self.schema, compression="zstd")
+        else:
+            self.filename = "payloads.ndjson"
+            self.writer = open(os.path.join(directory, self.filename), "w")
+    
+    def write(self, rows: List[Dict]):
+        if pa is not None:
+            self.writer.write_table(pa.Table.from_pylist(rows, schema=self.schema))
+        else:
+            self.writer.write("".join(json.dumps(row) + "\n" for row in rows))
+    
+    def close(self):
+        self.writer.close()
+
+def read_payload_rows(path: str, batch_size: int):
+    """Yield lists of payload rows from a dump's payload file"""
+    if path.endswith(".parquet"):
+        require_pyarrow()
+        for record_batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            yield record_batch.to_pylist()
+        return
+    with open(path) as f:
+        rows = []
+        for line in f:
+            if line.strip():
+                rows.append(json.loads(line))
+            if len(rows) >= batch_size:
+                yield rows
+                rows = []
+        if rows:
+            yield rows
+
+def count_payload_rows(path: str) -> int:
+    if path.endswith(".parquet"):
+        require_pyarrow()
+        return pq.ParquetFile(path).metadata.num_rows
+    with open(path) as f:
+        return sum(1 for line in f if line.strip())
+
+def dump_cluster(db_key: str, qdrant_collection: str, directory: str) -> Dict:
+    """Scroll a cluster with vectors and write vectors.f32 + the payload file (blocking)"""
+    os.makedirs(directory)
+    payload_writer = PayloadFileWriter(directory)
+    count = 0
+    try:
+        with open(os.path.join(directory, "vectors.f32"), "wb") as vectors_file:
+            offset = None
+            while True:
+                points, offset = qdrant_client.scroll(
+                    collection_name=qdrant_collection,
+                    limit=VECTOR_DUMP_BATCH,
+                    offset=offset,
+                    with_payload=True,
+                    with_vectors=True
                 )
-                vectorize_result = await smart_vectorize(vectorize_request)
-                response_data['vectorization'] = vectorize_result
+                if points:
+                    vectors_file.write(np.asarray([point.vector for point in points], dtype=np.float32).tobytes())
+                    payload_writer.write([payload_row(point.id, point.payload or {}) for point in points])
+                    count += len(points)
+                if offset is None:
+                    break
+    finally:
+        payload_writer.close()
+    
+    manifest = {
+        "db_key": db_key,
+        "qdrant_collection": qdrant_collection,
+        "dimension": EMBEDDING_DIMENSION,
+        "distance": "cosine",
+        "points": count,
+        "payload_file": payload_writer.filename,
+        "created_at": datetime.utcnow().isoformat()
+    }
+    with open(os.path.join(directory, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def read_vector_dump_manifest(directory: str) -> Dict:
+    manifest_path = os.path.join(directory, "manifest.json")
+    if not os.path.exists(manifest_path):
+        raise HTTPException(status_code=404, detail=f"Vector dump '{os.path.basename(directory)}' not found")
+    with open(manifest_path) as f:
+        return json.load(f)
+
+@app.post("/vectors/dump")
+async def dump_vectors(request: VectorDumpRequest):
+    """Write a database's cluster to local files (float32 vectors + columnar payloads) for restore without re-embedding"""
+    try:
+        if request.db_key not in MONGO_DATABASES:
+            raise HTTPException(status_code=404, detail=f"Database '{request.db_key}' not found")
+        qdrant_collection = get_qdrant_collection_for_db(request.db_key)
+        if not qdrant_metadata_cache.exists(qdrant_collection):
+            raise HTTPException(status_code=404, detail=f"No vectors found for database '{request.db_key}'")
         
-        return response_data
+        dump_name = request.dump_name or f"{request.db_key}_{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}"
+        directory = vector_dump_path(dump_name)
+        if os.path.exists(directory):
+            raise HTTPException(status_code=409, detail=f"Vector dump '{dump_name}' already exists")
+        
+        start = time.perf_counter()
+        manifest = await asyncio.to_thread(dump_cluster, request.db_key, qdrant_collection, directory)
+        return {
+            "status": "dumped",
+            "dump_name": dump_name,
+            **manifest,
+            "seconds": round(time.perf_counter() - start, 2)
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# ============= EXPORT ENDPOINTS =============
-@app.get("/export/csv/{db_key}/{collection_name}")
-async def export_to_csv(db_key: str, collection_name: str, limit: int = 1000):
-    """Export collection to CSV"""
+@app.get("/vectors/dumps")
+async def list_vector_dumps():
+    """List local vector dumps"""
+    dumps = []
+    if os.path.isdir(VECTOR_DUMP_DIR):
+        for name in sorted(os.listdir(VECTOR_DUMP_DIR)):
+            manifest_path = os.path.join(VECTOR_DUMP_DIR, name, "manifest.json")
+            if os.path.exists(manifest_path):
+                with open(manifest_path) as f:
+                    dumps.append({"dump_name": name, **json.load(f)})
+    return {"dumps": dumps, "total_dumps": len(dumps)}
+
+@app.post("/vectors/restore")
+async def restore_vectors(request: VectorRestoreRequest):
+    """Load a vector dump into the database's cluster with batched, parallel upserts"""
     try:
-        db_instance = databases.get(db_key)
-        if db_instance is None:
-            raise HTTPException(status_code=404, detail=f"Database '{db_key}' not found")
+        directory = vector_dump_path(request.dump_name)
+        manifest = read_vector_dump_manifest(directory)
+        if manifest["dimension"] != EMBEDDING_DIMENSION:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Dump dimension {manifest['dimension']} does not match model dimension {EMBEDDING_DIMENSION}"
+            )
+        db_key = manifest["db_key"]
+        qdrant_collection = get_qdrant_collection_for_db(db_key)
         
-        collection = db_instance[collection_name]
-        documents = await collection.find().limit(limit).to_list(limit)
+        # Check the dump is complete before touching the cluster
+        vectors = np.memmap(os.path.join(directory, "vectors.f32"), dtype=np.float32, mode="r").reshape(-1, manifest["dimension"])
+        payload_count = await asyncio.to_thread(count_payload_rows, os.path.join(directory, manifest["payload_file"]))
+        if not len(vectors) == payload_count == manifest["points"]:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Dump '{request.dump_name}' is inconsistent: manifest lists {manifest['points']} points, "
+                       f"found {len(vectors)} vectors and {payload_count} payload rows"
+            )
         
-        if not documents:
-            raise HTTPException(status_code=404, detail="No data to export")
+        if request.recreate and qdrant_metadata_cache.exists(qdrant_collection):
+            qdrant_client.delete_collection(qdrant_collection)
+            qdrant_metadata_cache.mark_deleted(qdrant_collection)
+        await initialize_qdrant_collection_for_db(db_key, qdrant_collection)
         
-        serialized_docs = [serialize_document(doc) for doc in documents]
-        df = pd.DataFrame(serialized_docs)
+        start = time.perf_counter()
+        batch_size = request.batch_size or VECTOR_DUMP_BATCH
+        payload_batches = read_payload_rows(os.path.join(directory, manifest["payload_file"]), batch_size)
+        parallelism = max(1, request.parallelism or VECTOR_RESTORE_PARALLELISM)
+        pending = set()
+        next_row = 0
+        restored = 0
         
-        output = io.StringIO()
-        df.to_csv(output, index=False)
-        output.seek(0)
+        def upsert_batch(rows: List[Dict], first_row: int) -> int:
+            qdrant_client.upsert(
+                collection_name=qdrant_collection,
+                points=[
+                    PointStruct(id=row["id"], vector=vectors[first_row + i].tolist(), payload=payload_from_row(row))
+                    for i, row in enumerate(rows)
+                ]
+            )
+            return len(rows)
         
-        return StreamingResponse(
-            iter([output.getvalue()]),
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": f"attachment; filename={db_key}_{collection_name}.csv"
-            }
-        )
+        try:
+            while True:
+                rows = await asyncio.to_thread(next, payload_batches, None)
+                if rows is None:
+                    break
+                while len(pending) >= parallelism:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    restored += sum(task.result() for task in done)
+                pending.add(asyncio.create_task(asyncio.to_thread(upsert_batch, rows, next_row)))
+                next_row += len(rows)
+            if pending:
+                done, pending = await asyncio.wait(pending)
+                restored += sum(task.result() for task in done)
+        finally:
+            for task in pending:
+                task.cancel()
+            # Dropped only once the upserts stop, so a query during the restore
+            # cannot leave a BM25 index built from part of the points
+            lexical_index_manager.drop(qdrant_collection)
+            invalidate_vector_caches(db_key)
+        
+        if next_row != len(vectors) or restored != len(vectors):
+            raise HTTPException(
+                status_code=500,
+                detail=f"Restore of '{request.dump_name}' incomplete: {restored} of {len(vectors)} points written"
+            )
+        
+        return {
+            "status": "restored",
+            "dump_name": request.dump_name,
+            "db_key": db_key,
+            "qdrant_collection": qdrant_collection,
+            "points_restored": restored,
+            "seconds": round(time.perf_counter() - start, 2)
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/export/json/{db_key}/{collection_name}")
-async def export_to_json(db_key: str, collection_name: str, limit: int = 1000):
-    """Export collection to JSON"""
+# ============= SNAPSHOTS =============
+SNAPSHOT_RETENTION = int(os.getenv("SNAPSHOT_RETENTION", "3"))  # Snapshots kept per cluster (0 = keep all)
+SNAPSHOT_PARALLELISM = int(os.getenv("SNAPSHOT_PARALLELISM", "2"))  # Clusters snapshotted at once
+# Where Qdrant fetches a snapshot from on recovery; defaults to its own snapshot storage
+QDRANT_SNAPSHOT_LOCATION = os.getenv("QDRANT_SNAPSHOT_LOCATION", "file:///qdrant/snapshots/{collection}/{snapshot}")
+
+def snapshot_info(snapshot) -> Dict:
+    return {
+        "name": snapshot.name,
+        "creation_time": snapshot.creation_time,
+        "size": snapshot.size
+    }
+
+def snapshot_clusters(db_keys: Optional[List[str]] = None) -> Dict[str, str]:
+    """Map db_key -> Qdrant collection for the requested (or all) clusters"""
+    clusters = load_qdrant_clusters().get("clusters", {})
+    if db_keys is None:
+        db_keys = list(clusters.keys())
+    unknown = [db_key for db_key in db_keys if db_key not in clusters]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"No vector cluster for database(s): {', '.join(unknown)}")
+    return {db_key: clusters[db_key]["collection_name"] for db_key in db_keys}
+
+def sorted_snapshots(qdrant_collection: str) -> List:
+    """Snapshots of a collection, newest first"""
+    snapshots = qdrant_client.list_snapshots(collection_name=qdrant_collection)
+    return sorted(snapshots, key=lambda snap: (snap.creation_time or "", snap.name), reverse=True)
+
+def snapshot_cluster(qdrant_collection: str, retention: int) -> Dict:
+    """Snapshot one collection, then prune its oldest snapshots beyond the retention count"""
+    start = time.perf_counter()
+    snapshot = qdrant_client.create_snapshot(collection_name=qdrant_collection, wait=True)
+    pruned = []
+    if retention > 0:
+        for old in sorted_snapshots(qdrant_collection)[retention:]:
+            if old.name == snapshot.name:
+                continue
+            qdrant_client.delete_snapshot(collection_name=qdrant_collection, snapshot_name=old.name)
+            pruned.append(old.name)
+    return {
+        **snapshot_info(snapshot),
+        "qdrant_collection": qdrant_collection,
+        "pruned": pruned,
+        "seconds": round(time.perf_counter() - start, 2)
+    }
+
+@app.post("/vectors/snapshot")
+async def create_snapshot(request: Optional[SnapshotRequest] = None):
+    """Snapshot every vector cluster (or the requested ones) concurrently, with retention"""
     try:
-        db_instance = databases.get(db_key)
-        if db_instance is None:
-            raise HTTPException(status_code=404, detail=f"Database '{db_key}' not found")
-        
-        collection = db_instance[collection_name]
-        documents = await collection.find().limit(limit).to_list(limit)
-        
-        if not documents:
-            raise HTTPException(status_code=404, detail="No data to export")
+        request = request or SnapshotRequest()
+        clusters = snapshot_clusters(request.db_keys)
+        retention = SNAPSHOT_RETENTION if request.retention is None else request.retention
+        existing = {
+            db_key: qdrant_collection
+            for db_key, qdrant_collection in clusters.items()
+            if qdrant_metadata_cache.exists(qdrant_collection)
+        }
+        semaphore = asyncio.Semaphore(max(1, SNAPSHOT_PARALLELISM))
         
-        serialized_docs = [serialize_document(doc) for doc in documents]
+        async def run(qdrant_collection: str):
+            async with semaphore:
+                return await asyncio.to_thread(snapshot_cluster, qdrant_collection, retention)
         
-        return StreamingResponse(
-            iter([json.dumps(serialized_docs, indent=2)]),
-            media_type="application/json",
-            headers={
-                "Content-Disposition": f"attachment; filename={db_key}_{collection_name}.json"
-            }
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(run(qdrant_collection) for qdrant_collection in existing.values()),
+            return_exceptions=True
         )
+        snapshots, failed = {}, {}
+        for db_key, result in zip(existing, results):
+            if isinstance(result, Exception):
+                failed[db_key] = str(result)
+            else:
+                snapshots[db_key] = result
+        
+        return {
+            "status": "snapshot_created" if snapshots else "no_snapshots",
+            "snapshots": snapshots,
+            "failed": failed,
+            "skipped": [db_key for db_key in clusters if db_key not in existing],  # Never vectorized
+            "retention": retention,
+            "seconds": round(time.perf_counter() - start, 2)
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# ============= SNAPSHOTS =============
-@app.post("/vectors/snapshot")
-async def create_snapshot():
-    """Create a snapshot of the vector collection"""
+@app.get("/vectors/list-snapshots")
+async def list_snapshots(db_key: Optional[str] = None):
+    """List snapshots of every vector cluster (or one database's), newest first"""
     try:
-        snapshot_info = qdrant_client.create_snapshot(
-            collection_name=QDRANT_COLLECTION_NAME
+        clusters = snapshot_clusters([db_key] if db_key else None)
+        clusters = {k: c for k, c in clusters.items() if qdrant_metadata_cache.exists(c)}
+        listed = await asyncio.gather(
+            *(asyncio.to_thread(sorted_snapshots, qdrant_collection) for qdrant_collection in clusters.values())
         )
+        result = {
+            db_key: {
+                "qdrant_collection": qdrant_collection,
+                "snapshots": [snapshot_info(snap) for snap in snapshots]
+            }
+            for (db_key, qdrant_collection), snapshots in zip(clusters.items(), listed)
+        }
         
         return {
-            "status": "snapshot_created",
-            "snapshot_name": snapshot_info.name,
-            "creation_time": snapshot_info.creation_time,
-            "size": snapshot_info.size
+            "clusters": result,
+            "total_snapshots": sum(len(cluster["snapshots"]) for cluster in result.values())
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/vectors/list-snapshots")
-async def list_snapshots():
-    """List all available snapshots"""
+@app.post("/vectors/restore-snapshot")
+async def restore_snapshot(request: SnapshotRestoreRequest):
+    """Recover a database's vector cluster from a snapshot instead of re-vectorizing"""
     try:
-        snapshots = qdrant_client.list_snapshots(
-            collection_name=QDRANT_COLLECTION_NAME
+        qdrant_collection = snapshot_clusters([request.db_key])[request.db_key]
+        location = request.location
+        snapshot_name = request.snapshot_name
+        if location is None:
+            if snapshot_name is None:
+                snapshots = await asyncio.to_thread(sorted_snapshots, qdrant_collection)
+                if not snapshots:
+                    raise HTTPException(status_code=404, detail=f"No snapshots for cluster '{qdrant_collection}'")
+                snapshot_name = snapshots[0].name
+            if isinstance(qdrant_client, NumpyVectorStore):
+                location = os.path.join(qdrant_client._snapshot_dir(qdrant_collection), os.path.basename(snapshot_name))
+            else:
+                location = QDRANT_SNAPSHOT_LOCATION.format(collection=qdrant_collection, snapshot=snapshot_name)
+        
+        start = time.perf_counter()
+        await asyncio.to_thread(
+            qdrant_client.recover_snapshot,
+            collection_name=qdrant_collection,
+            location=location,
+            wait=True
         )
+        qdrant_metadata_cache.mark_created(qdrant_collection)
+        lexical_index_manager.drop(qdrant_collection)  # Rebuilt lazily from the recovered points
+        invalidate_vector_caches(request.db_key)
         
         return {
-            "snapshots": [
-                {
-                    "name": snap.name,
-                    "creation_time": snap.creation_time,
-                    "size": snap.size
-                }
-                for snap in snapshots
-            ],
-            "total_snapshots": len(snapshots)
+            "status": "restored",
+            "db_key": request.db_key,
+            "qdrant_collection": qdrant_collection,
+            "snapshot_name": snapshot_name,
+            "location": location,
+            "points_count": qdrant_metadata_cache.get_info(qdrant_collection).points_count,
+            "seconds": round(time.perf_counter() - start, 2)
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
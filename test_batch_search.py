@@ -0,0 +1,76 @@
+"""
+Regression check: batch search must not register clusters for unknown db_keys
+
+Run against a live server (python main.py). An unknown request-level db_key
+must be rejected with 400, an unknown per-query db_key must come back as an
+error line, and neither may appear in /qdrant/clusters afterwards.
+"""
+import requests
+import json
+import uuid
+
+BASE_URL = "http://localhost:8000"
+
+def cluster_keys():
+    response = requests.get(f"{BASE_URL}/qdrant/clusters")
+    return set(response.json().get("clusters", {}))
+
+def test_unknown_request_db_key():
+    """An unknown request-level db_key is a 400 before any NDJSON is streamed"""
+    print("\n" + "="*60)
+    print("Testing unknown request-level db_key")
+    print("="*60)
+
+    bogus = f"bogus_{uuid.uuid4().hex[:8]}"
+    response = requests.post(f"{BASE_URL}/query/batch-search", json={
+        "queries": ["customer accounts"],
+        "db_key": bogus
+    })
+    print(f"\n  Status: {response.status_code}")
+    print(f"  Detail: {response.json().get('detail')}")
+    assert response.status_code == 400, f"expected 400, got {response.status_code}"
+    assert bogus not in cluster_keys(), f"cluster registered for '{bogus}'"
+
+def test_unknown_item_db_key():
+    """An unknown per-query db_key yields an error line and no cluster"""
+    print("\n" + "="*60)
+    print("Testing unknown per-query db_key")
+    print("="*60)
+
+    bogus = f"bogus_{uuid.uuid4().hex[:8]}"
+    response = requests.post(f"{BASE_URL}/query/batch-search", json={
+        "queries": [
+            {"query": "customer accounts", "db_key": bogus},
+            {"query": "transactions above 10000"}
+        ]
+    })
+    assert response.status_code == 200, f"expected 200, got {response.status_code}"
+    lines = {line["index"]: line for line in map(json.loads, response.text.splitlines())}
+    for index, line in sorted(lines.items()):
+        print(f"\n  [{index}] db_key={line['db_key']} error={line.get('error')} results={line.get('total_results')}")
+
+    assert len(lines) == 2, f"expected 2 lines, got {len(lines)}"
+    assert "not found" in lines[0].get("error", ""), "unknown db_key was not reported"
+    assert bogus not in cluster_keys(), f"cluster registered for '{bogus}'"
+
+def main():
+    print("\n" + "="*60)
+    print("BATCH SEARCH DB_KEY REGRESSION CHECK")
+    print("="*60)
+
+    try:
+        test_unknown_request_db_key()
+        test_unknown_item_db_key()
+
+        print("\n" + "="*60)
+        print("✓ All checks passed!")
+        print("="*60 + "\n")
+
+    except requests.exceptions.ConnectionError:
+        print("\n❌ Error: Could not connect to the server.")
+        print("Make sure the server is running on http://localhost:8000\n")
+    except AssertionError as e:
+        print(f"\n❌ Check failed: {e}\n")
+
+if __name__ == "__main__":
+    main()